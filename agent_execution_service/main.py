@@ -11,6 +11,7 @@ import uvicorn
 from fastapi import FastAPI
 
 from common.clients.redis.redis_manager import RedisManager
+from common.clients.reply_listener import ReplyListener
 from common.utils.logging import init_logging
 from common.config.service_settings import ExecutionServiceSettings
 from .workers.execution_worker import ExecutionWorker
@@ -103,6 +104,9 @@ async def lifespan(app: FastAPI):
                     except asyncio.CancelledError:
                         pass
             
+            # Detener el canal de respuestas pseudo-síncronas antes de cerrar Redis
+            await ReplyListener.shutdown_all()
+
             # Cerrar Redis
             if redis_manager:
                 await redis_manager.close()
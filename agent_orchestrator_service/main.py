@@ -13,6 +13,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from common.utils.logging import init_logging
 from common.clients.redis.redis_manager import RedisManager
 from common.clients.base_redis_client import BaseRedisClient
+from common.clients.reply_listener import ReplyListener
 from agent_orchestrator_service.workers.orchestrator_worker import OrchestratorWorker
 from agent_orchestrator_service.routes import chat_router, websocket_router, health_router
 from agent_orchestrator_service.routes.chat_routes import set_orchestration_service as set_chat_service
@@ -92,6 +93,11 @@ async def lifespan(app: FastAPI):
         await asyncio.gather(*worker_tasks, return_exceptions=True)
         logger.info("Todos los workers detenidos")
         
+        # Detener el canal de respuestas pseudo-síncronas y la lectura de tokens antes de cerrar Redis
+        await ReplyListener.shutdown_all()
+        if orchestration_service and orchestration_service.token_streams:
+            await orchestration_service.token_streams.close()
+
         # Cerrar Redis
         if redis_manager:
             await redis_manager.close()
@@ -1,6 +1,7 @@
 """
 Rutas WebSocket para comunicación en tiempo real.
 """
+import asyncio
 import json
 import logging
 from typing import Optional
@@ -95,6 +96,12 @@ async def websocket_endpoint(
                 ).model_dump()
             )
             
+            # Reenviar fragmentos de la respuesta mientras se genera (solo si se publican)
+            token_reader = service.open_token_stream(task_id, chat_request.metadata)
+            relay_task = asyncio.create_task(
+                service.relay_token_stream(task_id, token_reader, _chunk_sender(websocket, task_id))
+            ) if token_reader else None
+            
             try:
                 # Procesar mensaje
                 response = await service.process_chat_message(
@@ -105,6 +112,11 @@ async def websocket_endpoint(
                     metadata=chat_request.metadata
                 )
                 
+                # Reenviar lo ya publicado para que la respuesta completa llegue la última
+                if relay_task:
+                    token_reader.stop()
+                    await _finish_relay(relay_task, service.app_settings.token_stream_drain_timeout_seconds)
+                
                 # Enviar respuesta
                 await websocket.send_json(
                     WebSocketMessage(
@@ -124,6 +136,8 @@ async def websocket_endpoint(
                 )
                 
             except Exception as e:
+                if relay_task:
+                    await _finish_relay(relay_task, 0)
                 logger.error(f"Error procesando mensaje: {e}", exc_info=True)
                 await websocket.send_json(
                     WebSocketMessage(
@@ -146,4 +160,30 @@ async def websocket_endpoint(
             pass
     finally:
         # Limpiar conexión
-        await service.unregister_websocket_connection(session_id, connection_id)
\ No newline at end of file
+        await service.unregister_websocket_connection(session_id, connection_id)
+
+
+def _chunk_sender(websocket: WebSocket, task_id: uuid.UUID):
+    """Crea el callback que envía cada fragmento como STREAM_CHUNK."""
+    async def send_chunk(content: str):
+        await websocket.send_json(
+            WebSocketMessage(
+                type=WebSocketMessageType.STREAM_CHUNK,
+                task_id=task_id,
+                data={"content": content}
+            ).model_dump(mode="json")
+        )
+    return send_chunk
+
+
+async def _finish_relay(relay_task: asyncio.Task, timeout: float):
+    """Espera a que termine el reenvío de fragmentos o lo cancela tras `timeout`."""
+    if not timeout:
+        relay_task.cancel()
+        return
+    try:
+        await asyncio.wait_for(relay_task, timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    except Exception as e:
+        logger.warning(f"Error reenviando fragmentos de respuesta: {e}")
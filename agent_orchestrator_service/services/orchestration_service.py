@@ -2,7 +2,7 @@
 Servicio principal de orquestación refactorizado.
 """
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
 from datetime import datetime, timedelta
 import uuid
 
@@ -13,6 +13,7 @@ from common.models.actions import DomainAction, DomainActionResponse
 from common.models.config_models import ExecutionConfig, QueryConfig, RAGConfig
 from common.errors.exceptions import InvalidActionError, ExternalServiceError
 from common.clients.base_redis_client import BaseRedisClient
+from common.clients.token_stream import TokenStreamMultiplexer, TokenStreamReader, EVENT_DELTA, EVENT_ERROR
 from common.config.service_settings import OrchestratorSettings
 
 from ..clients import ExecutionClient, ManagementClient
@@ -57,6 +58,9 @@ class OrchestrationService(BaseService):
         # Configuración
         self.config_cache_ttl = 300  # 5 minutos
         
+        # Un único XREAD para los streams de tokens de todos los chats del proceso
+        self.token_streams = TokenStreamMultiplexer(direct_redis_conn) if direct_redis_conn else None
+        
         self._logger.info("OrchestrationService inicializado")
     
     async def create_session(
@@ -261,6 +265,42 @@ class OrchestrationService(BaseService):
             session_state.active_task_id = None
             raise
     
+    def open_token_stream(
+        self,
+        task_id: uuid.UUID,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[TokenStreamReader]:
+        """
+        Lector del stream de tokens de la tarea, o None si la respuesta no se
+        publica en streaming (relay deshabilitado o modo advance, que no emite
+        fragmentos).
+        """
+        mode = metadata.get("mode", "simple") if metadata else "simple"
+        if not self.token_streams or not self.app_settings.token_stream_relay_enabled or mode != "simple":
+            return None
+        stream_name = self.service_redis_client.queue_manager.get_task_token_stream("query", str(task_id))
+        return TokenStreamReader(self.token_streams, stream_name)
+    
+    async def relay_token_stream(
+        self,
+        task_id: uuid.UUID,
+        reader: TokenStreamReader,
+        send_chunk: Callable[[str], Awaitable[None]]
+    ):
+        """
+        Reenvía los fragmentos que Query Service publica para `task_id` mientras
+        la respuesta final recorre el camino pseudo-síncrono habitual.
+        
+        Termina al recibir el evento final del stream, cuando se llama a
+        `reader.stop()` al llegar la respuesta, o tras
+        `token_stream_idle_timeout_seconds` sin fragmentos.
+        """
+        async for event in reader.events(idle_timeout_seconds=self.app_settings.token_stream_idle_timeout_seconds):
+            if event.get("type") == EVENT_DELTA:
+                await send_chunk(event.get("content", ""))
+            elif event.get("type") == EVENT_ERROR:
+                self._logger.warning(f"Streaming interrumpido para task {task_id}: {event.get('error')}")
+    
     async def cleanup_inactive_sessions(self, inactive_minutes: int = 30):
         """Limpia sesiones inactivas."""
         now = datetime.utcnow()
@@ -4,6 +4,8 @@ Este módulo exporta los clientes comunes utilizados para la comunicación entre
 """
 
 from .base_redis_client import BaseRedisClient # Correct, as base_redis_client.py is in common/clients/
+from .reply_listener import ReplyListener
+from .token_stream import TokenStreamPublisher, TokenStreamMultiplexer, TokenStreamReader
 from .queue_manager.queue_manager import QueueManager
 from .redis.redis_manager import RedisManager
 from .redis.redis_state_manager import RedisStateManager
@@ -12,6 +14,10 @@ from .redis.cache_manager import CacheManager
 
 __all__ = [
     "BaseRedisClient",
+    "ReplyListener",
+    "TokenStreamPublisher",
+    "TokenStreamMultiplexer",
+    "TokenStreamReader",
     "QueueManager",
     "RedisManager",
     "RedisStateManager",
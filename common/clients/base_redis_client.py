@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import uuid
@@ -8,6 +9,8 @@ from pydantic import ValidationError
 
 from common.models.actions import DomainAction, DomainActionResponse
 from common.clients.queue_manager import QueueManager
+from common.clients.reply_listener import ReplyListener
+from common.clients.envelope_codec import EnvelopeCodec, assign_trusted
 from common.config.base_settings import CommonAppSettings
 
 # logging.basicConfig(level=logging.INFO) #basicConfig is usually called once at app start
@@ -34,6 +37,7 @@ class BaseRedisClient:
         # Initialize QueueManager with environment from settings. Assuming default prefix "nooble4" is okay.
         self.queue_manager = QueueManager(environment=settings.environment)
         self.settings = settings # Store settings if needed for other parts, e.g. logging
+        self.codec = EnvelopeCodec.from_settings(settings)
 
     # _get_connection is no longer needed as we have a direct client
 
@@ -50,9 +54,9 @@ class BaseRedisClient:
             # Use instance method of QueueManager to get stream name
             stream_name = self.queue_manager.get_service_action_stream(service_name=target_service) # MODIFIED
             
-            action.origin_service = self.service_name
+            assign_trusted(action, origin_service=self.service_name)
             
-            message_payload = {'data': action.model_dump_json()} # MODIFIED: Payload for XADD
+            message_payload = self.codec.encode(action) # MODIFIED: Payload for XADD
 
             # Use the async client to add to stream
             message_id = await self.redis_client.xadd(stream_name, message_payload) # MODIFIED: XADD
@@ -80,8 +84,11 @@ class BaseRedisClient:
         """
         # Generar un correlation_id si no existe. Es crucial para el patrón síncrono.
         if not action.correlation_id:
-            action.correlation_id = uuid.uuid4()
+            assign_trusted(action, correlation_id=uuid.uuid4())
         
+        if self.settings.pseudo_sync_reply_mode == "stream":
+            return await self._send_action_pseudo_sync_multiplexed(action, timeout)
+
         # La cola de respuesta es única para esta solicitud específica.
         response_queue = self.queue_manager.get_response_queue(
             client_service_name=self.service_name, 
@@ -89,14 +96,13 @@ class BaseRedisClient:
             correlation_id=str(action.correlation_id)
         )
 
-        action.callback_queue_name = response_queue
-        action.origin_service = self.service_name
+        assign_trusted(action, callback_queue_name=response_queue, origin_service=self.service_name)
 
         try:
             target_service = action.action_type.split('.')[0]
             action_stream_name = self.queue_manager.get_service_action_stream(service_name=target_service) # MODIFIED
             
-            message_payload = {'data': action.model_dump_json()} # MODIFIED: Payload for XADD
+            message_payload = self.codec.encode(action) # MODIFIED: Payload for XADD
 
             message_id = await self.redis_client.xadd(action_stream_name, message_payload) # MODIFIED: XADD
             logger.info(f"Acción pseudo-síncrona {action.action_id} enviada al stream {action_stream_name} con ID de mensaje Redis: {message_id}. Esperando respuesta en {response_queue}.") # MODIFIED, Issue 9
@@ -128,6 +134,49 @@ class BaseRedisClient:
             # Example: return DomainActionResponse(success=False, error_message=str(e), error_type="TimeoutError", correlation_id=action.correlation_id, trace_id=action.trace_id)
             raise
 
+    async def _send_action_pseudo_sync_multiplexed(
+        self,
+        action: DomainAction,
+        timeout: int
+    ) -> DomainActionResponse:
+        """
+        Variante pseudo-síncrona sobre el stream de respuestas compartido del proceso.
+
+        No crea una cola por llamada ni retiene una conexión del pool durante la espera:
+        la respuesta llega al stream del `ReplyListener` y resuelve un futuro por correlation_id.
+        """
+        listener = ReplyListener.get_instance(self.redis_client, self.service_name, self.queue_manager, self.codec)
+        correlation_key = str(action.correlation_id)
+
+        assign_trusted(action, callback_queue_name=listener.reply_stream, origin_service=self.service_name)
+
+        future = listener.register(correlation_key)
+        try:
+            target_service = action.action_type.split('.')[0]
+            action_stream_name = self.queue_manager.get_service_action_stream(service_name=target_service)
+
+            message_payload = self.codec.encode(action)
+
+            message_id = await self.redis_client.xadd(action_stream_name, message_payload)
+            logger.info(f"Acción pseudo-síncrona {action.action_id} enviada al stream {action_stream_name} con ID de mensaje Redis: {message_id}. Esperando respuesta en {listener.reply_stream}.")
+
+            try:
+                response = await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No se recibió respuesta para la acción {action.action_id} en {timeout}s.")
+
+            logger.info(f"Respuesta recibida para la acción {action.action_id}.")
+            return response
+
+        except (redis.RedisError, ValidationError) as e:
+            logger.error(f"Error en el flujo pseudo-síncrono para la acción {action.action_id}: {e}")
+            raise
+        except TimeoutError as e:
+            logger.error(str(e))
+            raise
+        finally:
+            listener.discard(correlation_key)
+
     async def send_action_async_with_callback(
         self,
         action: DomainAction,
@@ -146,22 +195,24 @@ class BaseRedisClient:
             # callback_action_type (Optional[str], optional): Tipo de acción esperada en el callback.
         """
         try:
-            action.callback_action_type = callback_event_name # Asignar el tipo de acción del callback
+            assign_trusted(action, callback_action_type=callback_event_name) # Asignar el tipo de acción del callback
 
             if not action.correlation_id: # Asegurar correlation_id
-                action.correlation_id = uuid.uuid4()
-
-            action.callback_queue_name = self.queue_manager.get_callback_queue(
-                client_service_name=self.service_name,
-                action_type=action.callback_action_type, # Usar el action_type del callback
-                correlation_id=str(action.correlation_id)
+                assign_trusted(action, correlation_id=uuid.uuid4())
+
+            assign_trusted(
+                action,
+                callback_queue_name=self.queue_manager.get_callback_queue(
+                    client_service_name=self.service_name,
+                    action_type=action.callback_action_type, # Usar el action_type del callback
+                    correlation_id=str(action.correlation_id)
+                ),
+                origin_service=self.service_name # Asegurar que el servicio origen esté establecido
             )
-
-            action.origin_service = self.service_name # Asegurar que el servicio origen esté establecido
             target_service = action.action_type.split('.')[0]
             action_stream_name = self.queue_manager.get_service_action_stream(service_name=target_service)
             
-            message_payload = {'data': action.model_dump_json()}
+            message_payload = self.codec.encode(action)
 
             logger.info(f"Enviando acción asíncrona con callback {action.action_id} al stream {action_stream_name}. Callback en {action.callback_queue_name}")
             message_id = await self.redis_client.xadd(action_stream_name, message_payload)
@@ -0,0 +1,223 @@
+"""
+Codec de sobre (envelope) para DomainAction y DomainActionResponse en streams Redis.
+
+Clases:
+- EnvelopeCodec: Serializa/deserializa los modelos de acción a los campos de una
+  entrada de stream (`data` + `codec`).
+
+El codec usado viaja en el campo `codec` de la entrada, de modo que cada lector
+decodifica según lo que escribió el emisor. Las entradas sin campo `codec` son
+JSON de Pydantic (formato previo), por lo que el cambio es retrocompatible.
+
+Formatos soportados:
+- "json": `model_dump_json` / `model_validate_json` (por defecto).
+- "orjson": dict de Python serializado con orjson (texto UTF-8).
+- "msgpack": binario compacto; los vectores de embedding ocupan bastante menos.
+Cualquiera de ellos puede ir seguido de "+zstd" si el payload supera el umbral
+de compresión. Los formatos binarios requieren `redis_decode_responses=False`.
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from common.errors.exceptions import ConfigurationError
+from common.models.actions import DomainAction, DomainActionResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+TModel = TypeVar("TModel", bound=BaseModel)
+
+SUPPORTED_CODECS = ("json", "orjson", "msgpack")
+BINARY_CODECS = ("msgpack",)
+COMPRESSION_SUFFIX = "+zstd"
+
+# Campos con el payload pesado; el fast path de confianza no los revalida.
+_PAYLOAD_FIELDS = ("data", "metadata")
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Tipo no serializable con msgpack: {type(obj)!r}")
+
+
+class EnvelopeCodec:
+    """
+    Codifica modelos de acción como campos de una entrada de stream y los decodifica.
+
+    Args:
+        codec: Formato de escritura ("json", "orjson" o "msgpack").
+        compression_threshold_bytes: Tamaño a partir del cual se comprime con zstd.
+            0 o None desactiva la compresión.
+        trusted: Si es True, al decodificar solo se valida el sobre (IDs, tipos,
+            configuraciones); `data` y `metadata` se asignan sin revalidación.
+            Pensado para streams internos entre servicios propios.
+        binary_safe: False si la conexión Redis decodifica respuestas a str; en ese
+            caso no se escriben formatos binarios (se usa "orjson" sin compresión).
+    """
+
+    def __init__(
+        self,
+        codec: str = "json",
+        compression_threshold_bytes: Optional[int] = None,
+        trusted: bool = False,
+        binary_safe: bool = True
+    ):
+        if codec not in SUPPORTED_CODECS:
+            raise ConfigurationError(f"Codec de sobre no soportado: '{codec}'. Opciones: {SUPPORTED_CODECS}")
+
+        if not binary_safe and (codec in BINARY_CODECS or compression_threshold_bytes):
+            logger.warning(
+                f"Codec '{codec}' con compresión={bool(compression_threshold_bytes)} requiere "
+                "redis_decode_responses=False. Se usará 'orjson' sin compresión."
+            )
+            codec = "orjson"
+            compression_threshold_bytes = None
+
+        self._require(codec)
+        if compression_threshold_bytes:
+            self._require("zstd")
+
+        self.codec = codec
+        self.compression_threshold_bytes = compression_threshold_bytes or 0
+        self.trusted = trusted
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.compression_threshold_bytes else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "EnvelopeCodec":
+        """Construye el codec a partir de `CommonAppSettings`."""
+        return cls(
+            codec=getattr(settings, "envelope_codec", "json"),
+            compression_threshold_bytes=getattr(settings, "envelope_compression_threshold_bytes", 0),
+            trusted=getattr(settings, "envelope_trusted_decode", False),
+            binary_safe=not getattr(settings, "redis_decode_responses", True)
+        )
+
+    @staticmethod
+    def _require(name: str):
+        missing = {
+            "orjson": orjson is None,
+            "msgpack": msgpack is None,
+            "zstd": zstandard is None,
+        }.get(name, False)
+        if missing:
+            raise ConfigurationError(f"El codec de sobre '{name}' requiere instalar su dependencia opcional.")
+
+    # --- Codificación ---
+
+    def encode(self, model: BaseModel) -> Dict[str, Union[str, bytes]]:
+        """Devuelve los campos de la entrada de stream para `model`."""
+        if self.codec == "json":
+            body: Union[str, bytes] = model.model_dump_json()
+        elif self.codec == "orjson":
+            body = orjson.dumps(model.model_dump())
+        else:
+            body = msgpack.packb(model.model_dump(), default=_msgpack_default, use_bin_type=True)
+
+        codec_name = self.codec
+        if self._compressor and len(body) >= self.compression_threshold_bytes:
+            raw = body.encode("utf-8") if isinstance(body, str) else body
+            body = self._compressor.compress(raw)
+            codec_name += COMPRESSION_SUFFIX
+
+        if codec_name == "json":
+            # Formato previo: sin campo `codec` para lectores antiguos
+            return {"data": body}
+        return {"data": body, "codec": codec_name}
+
+    # --- Decodificación ---
+
+    def decode_action(self, fields: Dict[Any, Any]) -> DomainAction:
+        return self.decode(fields, DomainAction)
+
+    def decode_response(self, fields: Dict[Any, Any]) -> DomainActionResponse:
+        return self.decode(fields, DomainActionResponse)
+
+    def decode(self, fields: Dict[Any, Any], model_cls: Type[TModel]) -> TModel:
+        """
+        Decodifica una entrada de stream. Lanza `KeyError` si falta `data` y
+        `ValidationError` si el contenido no es válido para `model_cls`.
+        """
+        body = fields.get(b"data", fields.get("data"))
+        if body is None:
+            raise KeyError("data")
+        codec_name = fields.get(b"codec", fields.get("codec")) or "json"
+        if isinstance(codec_name, bytes):
+            codec_name = codec_name.decode("utf-8")
+
+        if codec_name.endswith(COMPRESSION_SUFFIX):
+            self._require("zstd")
+            raw = body.encode("utf-8") if isinstance(body, str) else body
+            body = self._decompressor.decompress(raw)
+            codec_name = codec_name[:-len(COMPRESSION_SUFFIX)]
+
+        if codec_name == "json" and not self.trusted:
+            return model_cls.model_validate_json(body)
+
+        if codec_name == "json":
+            payload = orjson.loads(body) if orjson else json.loads(body)
+        elif codec_name == "orjson":
+            self._require("orjson")
+            payload = orjson.loads(body)
+        elif codec_name == "msgpack":
+            self._require("msgpack")
+            payload = msgpack.unpackb(body, raw=False)
+        else:
+            raise ValueError(f"Codec de sobre desconocido en la entrada: '{codec_name}'")
+
+        if self.trusted:
+            return self._construct_trusted(model_cls, payload)
+        return model_cls.model_validate(payload)
+
+    @staticmethod
+    def _construct_trusted(model_cls: Type[TModel], payload: Dict[str, Any]) -> TModel:
+        """
+        Valida solo el sobre y asigna `data`/`metadata` tal cual, evitando recorrer
+        listas de embeddings o lotes de chunks que ya validó el emisor.
+        """
+        envelope = {k: v for k, v in payload.items() if k not in _PAYLOAD_FIELDS}
+        heavy = {k: payload[k] for k in _PAYLOAD_FIELDS if k in payload}
+        if "data" in heavy:
+            # Marcador ligero para satisfacer campos obligatorios y validadores
+            envelope["data"] = {} if heavy["data"] is not None else None
+        instance = model_cls.model_validate(envelope)
+        instance.__dict__.update(heavy)
+        return instance
+
+
+def assign_trusted(model: BaseModel, **values: Any) -> None:
+    """
+    Asigna campos de un modelo sin disparar `validate_assignment`.
+
+    Para valores que el propio código genera (origin_service, callback_queue_name,
+    correlation_id), la revalidación del modelo completo en cada asignación es
+    coste puro.
+    """
+    model.__dict__.update(values)
+    model.__pydantic_fields_set__.update(values.keys())
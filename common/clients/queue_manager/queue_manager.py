@@ -29,6 +29,22 @@ class QueueManager:
         """
         return self._build_queue_name(service_name, "streams", "main")
 
+    def get_dead_letter_stream(self, service_name: str) -> str:
+        """
+        Obtiene el nombre del stream de dead-letter de un servicio, donde terminan
+        las acciones que agotaron sus reintentos de entrega.
+        Ej: nooble4:dev:embedding_service:streams:dead_letter
+        """
+        return self._build_queue_name(service_name, "streams", "dead_letter")
+
+    def get_task_token_stream(self, service_name: str, task_id: str) -> str:
+        """
+        Obtiene el nombre del stream de tokens incrementales de una tarea. El servicio
+        que genera la respuesta publica aquí los fragmentos a medida que los recibe.
+        Ej: nooble4:dev:query:streams:tokens:uuid-1234
+        """
+        return self._build_queue_name(service_name, "streams", f"tokens:{task_id}")
+
     def get_response_queue(self, client_service_name: str, action_type: str, correlation_id: str) -> str:
         """
         Obtiene el nombre de una cola de respuesta para una solicitud pseudo-síncrona.
@@ -38,6 +54,19 @@ class QueueManager:
         context = f"{action_type_short}:{correlation_id}"
         return self._build_queue_name(client_service_name, "responses", context)
 
+    def get_reply_stream(self, client_service_name: str, instance_id: str) -> str:
+        """
+        Obtiene el nombre del stream de respuestas compartido por un proceso cliente.
+        Todas las respuestas pseudo-síncronas dirigidas a ese proceso llegan aquí
+        y se enrutan por correlation_id.
+        Ej: nooble4:dev:agent_execution_service:replies:3f2a9c1b7d4e
+        """
+        return self._build_queue_name(client_service_name, "replies", instance_id)
+
+    def is_reply_stream(self, queue_name: str) -> bool:
+        """Indica si un nombre de cola corresponde a un stream de respuestas multiplexado."""
+        return ":replies:" in queue_name
+
     def get_callback_queue(self, client_service_name: str, action_type: str, correlation_id: str) -> str:
         """
         Obtiene el nombre de una cola de callback para una solicitud asíncrona.
@@ -0,0 +1,170 @@
+"""
+Canal de respuestas multiplexado para el patrón pseudo-síncrono.
+
+Clases:
+- ReplyListener: Escucha un único stream de respuestas por proceso y resuelve
+  futuros asyncio por correlation_id.
+
+En lugar de una lista Redis única por llamada (con un BRPOP que retiene una
+conexión del pool durante toda la espera), todas las llamadas pseudo-síncronas
+de un proceso comparten un stream de respuestas y una sola conexión bloqueante.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Dict, Optional, Tuple
+
+import redis.asyncio as redis_async
+from pydantic import ValidationError
+
+from common.clients.queue_manager import QueueManager
+from common.clients.envelope_codec import EnvelopeCodec
+
+logger = logging.getLogger(__name__)
+
+
+class ReplyListener:
+    """
+    Listener de respuestas compartido por todos los `BaseRedisClient` de un proceso.
+
+    Se obtiene con `ReplyListener.get_instance()`, que devuelve una única instancia
+    por (conexión Redis, servicio). La tarea de lectura se arranca de forma perezosa
+    en el primer `register()`.
+    """
+
+    _instances: Dict[Tuple[int, str], "ReplyListener"] = {}
+
+    def __init__(
+        self,
+        redis_client: redis_async.Redis,
+        service_name: str,
+        queue_manager: QueueManager,
+        codec: Optional[EnvelopeCodec] = None,
+        read_count: int = 100,
+        block_ms: int = 1000
+    ):
+        self.redis_client = redis_client
+        self.service_name = service_name
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.reply_stream = queue_manager.get_reply_stream(service_name, self.instance_id)
+        self.codec = codec or EnvelopeCodec()
+        self.read_count = read_count
+        self.block_ms = block_ms
+
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    @classmethod
+    def get_instance(
+        cls,
+        redis_client: redis_async.Redis,
+        service_name: str,
+        queue_manager: QueueManager,
+        codec: Optional[EnvelopeCodec] = None
+    ) -> "ReplyListener":
+        """Devuelve el listener del proceso para esta conexión y servicio, creándolo si no existe."""
+        key = (id(redis_client), service_name)
+        listener = cls._instances.get(key)
+        if listener is None:
+            listener = cls(redis_client, service_name, queue_manager, codec)
+            cls._instances[key] = listener
+        return listener
+
+    @classmethod
+    async def shutdown_all(cls):
+        """Detiene todos los listeners del proceso. Llamar en el apagado del servicio."""
+        for listener in list(cls._instances.values()):
+            await listener.stop()
+        cls._instances.clear()
+
+    def register(self, correlation_id: str) -> asyncio.Future:
+        """
+        Registra una espera para `correlation_id` y devuelve el futuro que se
+        resolverá con la `DomainActionResponse`. Debe llamarse ANTES de enviar la
+        acción para que una respuesta inmediata no se pierda.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[correlation_id] = future
+        return future
+
+    def discard(self, correlation_id: str):
+        """Elimina una espera (timeout o error de envío)."""
+        self._pending.pop(correlation_id, None)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.create_task(self._listen_loop())
+            logger.info(f"[{self.service_name}] ReplyListener iniciado en el stream {self.reply_stream}")
+
+    async def stop(self):
+        """Detiene la tarea de lectura y cancela las esperas pendientes."""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        try:
+            await self.redis_client.delete(self.reply_stream)
+        except redis_async.RedisError as e:
+            logger.warning(f"[{self.service_name}] No se pudo eliminar el stream de respuestas {self.reply_stream}: {e}")
+
+    async def _listen_loop(self):
+        # El stream es exclusivo de esta instancia, así que se lee desde el principio.
+        last_id = "0-0"
+        while self._running:
+            try:
+                entries = await self.redis_client.xread(
+                    streams={self.reply_stream: last_id},
+                    count=self.read_count,
+                    block=self.block_ms
+                )
+                if not entries:
+                    continue
+
+                _stream, messages = entries[0]
+                read_ids = []
+                for message_id, fields in messages:
+                    last_id = message_id
+                    read_ids.append(message_id)
+                    self._dispatch(fields)
+
+                # Las respuestas ya entregadas no se vuelven a leer: liberar memoria en Redis
+                await self.redis_client.xdel(self.reply_stream, *read_ids)
+
+            except asyncio.CancelledError:
+                raise
+            except redis_async.RedisError as e:
+                logger.error(f"[{self.service_name}] Error de Redis en ReplyListener ({self.reply_stream}): {e}. Reintentando en 1s...")
+                await asyncio.sleep(1)
+            except Exception as e:
+                logger.error(f"[{self.service_name}] Error inesperado en ReplyListener: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    def _dispatch(self, fields: Dict):
+        try:
+            response = self.codec.decode_response(fields)
+        except KeyError:
+            logger.error(f"[{self.service_name}] Respuesta sin campo 'data' en {self.reply_stream}. Descartada.")
+            return
+        except (ValidationError, ValueError) as e:
+            logger.error(f"[{self.service_name}] Respuesta malformada en {self.reply_stream}: {e}")
+            return
+
+        future = self._pending.pop(str(response.correlation_id), None)
+        if future is None:
+            # Llegó después del timeout o pertenece a una espera ya descartada
+            logger.warning(f"[{self.service_name}] Respuesta sin espera registrada para correlation_id {response.correlation_id}. Descartada.")
+            return
+        if not future.done():
+            future.set_result(response)
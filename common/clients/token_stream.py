@@ -0,0 +1,265 @@
+"""
+Streams de tokens por tarea para respuestas incrementales.
+
+Clases:
+- TokenStreamPublisher: Publica fragmentos de texto de una generación en curso.
+- TokenStreamMultiplexer: Lee los streams de todas las tareas del proceso con un solo XREAD.
+- TokenStreamReader: Lee los fragmentos de una tarea hasta el evento final.
+
+La respuesta completa sigue viajando por el canal pseudo-síncrono habitual; este
+stream solo adelanta los fragmentos para que el cliente vea el primer token sin
+esperar a que termine la generación. Cada entrada tiene un campo `type`:
+- "delta": `content` con el texto nuevo.
+- "done": `usage` (JSON) con el uso de tokens final.
+- "error": `error` con el mensaje.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis_async
+
+logger = logging.getLogger(__name__)
+
+EVENT_DELTA = "delta"
+EVENT_DONE = "done"
+EVENT_ERROR = "error"
+_FINAL_EVENTS = (EVENT_DONE, EVENT_ERROR)
+# Marca en la cola de un lector: la respuesta final llegó por el canal pseudo-síncrono
+_STOP = object()
+
+
+def _decode(value: Any) -> Any:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class TokenStreamPublisher:
+    """
+    Publica fragmentos agrupándolos por intervalo para no hacer un XADD por token.
+
+    Los errores de Redis se registran y desactivan el publisher: el streaming es
+    una optimización de latencia y nunca debe romper la generación.
+    """
+
+    def __init__(
+        self,
+        redis_conn: redis_async.Redis,
+        stream_name: str,
+        flush_interval_ms: int = 50,
+        ttl_seconds: int = 300,
+        maxlen: int = 2000
+    ):
+        self.redis_conn = redis_conn
+        self.stream_name = stream_name
+        self.flush_interval_seconds = flush_interval_ms / 1000.0
+        self.ttl_seconds = ttl_seconds
+        self.maxlen = maxlen
+        self._buffer: list = []
+        self._last_flush = 0.0
+        self._expiry_set = False
+        self._failed = False
+
+    async def publish(self, delta: str):
+        """Añade un fragmento; se envía si ha pasado el intervalo desde el último envío."""
+        if not delta or self._failed:
+            return
+        self._buffer.append(delta)
+        if time.monotonic() - self._last_flush >= self.flush_interval_seconds:
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer or self._failed:
+            return
+        content = "".join(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        await self._add({"type": EVENT_DELTA, "content": content})
+
+    async def close(self, usage: Optional[Dict[str, int]] = None, error: Optional[str] = None):
+        """Envía lo pendiente y el evento final (`done` o `error`)."""
+        await self.flush()
+        if error is not None:
+            await self._add({"type": EVENT_ERROR, "error": error})
+        else:
+            await self._add({"type": EVENT_DONE, "usage": json.dumps(usage or {})})
+
+    async def _add(self, fields: Dict[str, str]):
+        if self._failed:
+            return
+        try:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.xadd(self.stream_name, fields, maxlen=self.maxlen, approximate=True)
+            if not self._expiry_set:
+                # Si nadie lo lee (p. ej. peticiones REST), el stream caduca solo
+                pipe.expire(self.stream_name, self.ttl_seconds)
+            await pipe.execute()
+            self._expiry_set = True
+        except Exception as e:
+            self._failed = True
+            logger.warning(f"Streaming de tokens desactivado para {self.stream_name}: {e}")
+
+
+class TokenStreamMultiplexer:
+    """
+    Lee los streams de tokens de todas las tareas en curso del proceso con un
+    único XREAD bloqueante, en lugar de un XREAD por conversación: el proceso
+    ocupa una sola conexión del pool sin importar cuántos chats haya activos.
+
+    Cada stream suscrito recibe sus eventos en una cola propia. Las
+    suscripciones nuevas entran en la siguiente lectura (a lo sumo `block_ms`
+    después), y como se leen desde el principio del stream no se pierde nada.
+    """
+
+    def __init__(self, redis_conn: redis_async.Redis, block_ms: int = 100, count: int = 100):
+        self.redis_conn = redis_conn
+        self.block_ms = block_ms
+        self.count = count
+        self._subscriptions: Dict[str, List[Any]] = {}  # stream -> [último id leído, cola]
+        self._poll_waiters: List[Tuple[str, asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, stream_name: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscriptions[stream_name] = ["0-0", queue]
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, stream_name: str):
+        self._subscriptions.pop(stream_name, None)
+
+    async def wait_for_poll(self, stream_name: str) -> bool:
+        """
+        Espera a la siguiente lectura que empiece después de la llamada (sin
+        bloqueo, porque hay alguien esperando) y devuelve si trajo entradas del
+        stream. Una lectura está limitada a `count` entradas y un XREAD bloqueado
+        puede volver solo con las de otro stream, así que para vaciar un stream
+        hay que repetir hasta que devuelva False.
+        """
+        if self._task is None or self._task.done():
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self._poll_waiters.append((stream_name, future))
+        self._wakeup.set()
+        return await future
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._release_poll_waiters()
+
+    def _release_poll_waiters(self):
+        waiters, self._poll_waiters = self._poll_waiters, []
+        for _, future in waiters:
+            if not future.done():
+                future.set_result(False)
+
+    async def _run(self):
+        while True:
+            if not self._subscriptions:
+                self._release_poll_waiters()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Las esperas registradas durante esta lectura se atienden en la siguiente
+            waiters, self._poll_waiters = self._poll_waiters, []
+            streams = {name: subscription[0] for name, subscription in self._subscriptions.items()}
+            try:
+                entries = await self.redis_conn.xread(
+                    streams, count=self.count, block=None if waiters else self.block_ms
+                )
+            except Exception as e:
+                logger.warning(f"Error leyendo streams de tokens: {e}")
+                entries = None
+                await asyncio.sleep(1)
+
+            received = set()
+            for stream, messages in entries or []:
+                stream_name = _decode(stream)
+                subscription = self._subscriptions.get(stream_name)
+                if subscription is None or not messages:
+                    continue
+                received.add(stream_name)
+                for message_id, fields in messages:
+                    subscription[0] = _decode(message_id)
+                    subscription[1].put_nowait({_decode(k): _decode(v) for k, v in fields.items()})
+
+            for stream_name, future in waiters:
+                if not future.done():
+                    future.set_result(stream_name in received)
+
+
+class TokenStreamReader:
+    """
+    Lee un stream de tokens, a través del multiplexor del proceso, desde el
+    principio hasta su evento final.
+    """
+
+    def __init__(self, multiplexer: TokenStreamMultiplexer, stream_name: str):
+        self.multiplexer = multiplexer
+        self.stream_name = stream_name
+        self._queue: Optional[asyncio.Queue] = None
+        self._stopped = False
+
+    def stop(self):
+        """
+        La respuesta final ya llegó por otro canal: reenviar lo ya publicado y
+        terminar sin esperar más eventos.
+        """
+        self._stopped = True
+        if self._queue is not None:
+            self._queue.put_nowait(_STOP)
+
+    async def events(self, idle_timeout_seconds: float = 60.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Itera los eventos en orden. Termina tras `done`/`error`, tras `stop()` o
+        si no llega nada durante `idle_timeout_seconds`. Al terminar elimina el stream.
+        """
+        self._queue = self.multiplexer.subscribe(self.stream_name)
+        if self._stopped:
+            self._queue.put_nowait(_STOP)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout=idle_timeout_seconds)
+                except asyncio.TimeoutError:
+                    return
+
+                if event is _STOP:
+                    # Se vacía el stream: lecturas hasta el evento final o hasta
+                    # una que no traiga entradas nuevas
+                    while True:
+                        received = await self.multiplexer.wait_for_poll(self.stream_name)
+                        while not self._queue.empty():
+                            event = self._queue.get_nowait()
+                            if event is _STOP:
+                                continue
+                            yield self._parse(event)
+                            if event.get("type") in _FINAL_EVENTS:
+                                return
+                        if not received:
+                            return
+
+                yield self._parse(event)
+                if event.get("type") in _FINAL_EVENTS:
+                    return
+        finally:
+            self.multiplexer.unsubscribe(self.stream_name)
+            try:
+                await self.multiplexer.redis_conn.delete(self.stream_name)
+            except Exception as e:
+                logger.debug(f"No se pudo eliminar el stream de tokens {self.stream_name}: {e}")
+
+    @staticmethod
+    def _parse(event: Dict[str, Any]) -> Dict[str, Any]:
+        if event.get("type") == EVENT_DONE:
+            event["usage"] = json.loads(event.get("usage") or "{}")
+        return event
@@ -21,7 +21,29 @@ class CommonAppSettings(BaseSettings):
     redis_socket_keepalive_options: Optional[Dict[str, int]] = Field(None, description="Opciones de keepalive para el socket de Redis.")
     redis_max_connections: int = Field(10, description="Número máximo de conexiones en el pool de Redis.")
     redis_health_check_interval: int = Field(30, description="Intervalo en segundos para el health check de Redis.")
-    
+
+    # Consumo de streams en BaseWorker (con ambos valores en 1 se usa el bucle secuencial)
+    worker_batch_size: int = Field(1, ge=1, description="Máximo de mensajes leídos por cada XREADGROUP del worker.")
+    worker_max_concurrency: int = Field(1, ge=1, description="Máximo de acciones procesándose simultáneamente por worker.")
+    worker_ack_flush_interval_ms: int = Field(50, ge=1, description="Bloqueo máximo de XREADGROUP (ms) mientras hay acciones en vuelo, para confirmar ACKs en lote sin demora.")
+
+    # Recuperación de mensajes pendientes (PEL) y dead-letter
+    worker_reclaim_enabled: bool = Field(True, description="Reclamar con XAUTOCLAIM mensajes pendientes de consumidores caídos.")
+    worker_reclaim_min_idle_ms: int = Field(600000, ge=1, description="Tiempo mínimo (ms) sin ACK antes de reclamar un mensaje pendiente. Debe superar la duración del handler más lento y los timeouts pseudo-síncronos, o se reprocesarán acciones aún en curso.")
+    worker_reclaim_interval_seconds: float = Field(15.0, gt=0, description="Intervalo entre pasadas del reclamador.")
+    worker_reclaim_batch_size: int = Field(50, ge=1, description="Máximo de mensajes reclamados por pasada.")
+    worker_max_deliveries: int = Field(3, ge=1, description="Entregas máximas de un mensaje antes de moverlo al stream de dead-letter.")
+    dead_letter_maxlen: int = Field(10000, ge=1, description="Longitud máxima aproximada del stream de dead-letter por servicio.")
+
+    # Respuestas pseudo-síncronas: "stream" (stream compartido por proceso) o "list" (cola BRPOP por llamada)
+    pseudo_sync_reply_mode: str = Field("stream", description="Canal de respuesta para llamadas pseudo-síncronas: 'stream' (multiplexado por proceso) o 'list' (una cola por llamada).")
+    reply_stream_ttl_seconds: int = Field(300, ge=1, description="TTL del stream de respuestas de un proceso; se renueva con cada respuesta y limpia streams de procesos caídos.")
+
+    # Codec del sobre de acciones en streams (ver common/clients/envelope_codec.py)
+    envelope_codec: str = Field("json", description="Formato de escritura de DomainAction/DomainActionResponse en streams: 'json', 'orjson' o 'msgpack' ('msgpack' requiere redis_decode_responses=False).")
+    envelope_compression_threshold_bytes: int = Field(0, ge=0, description="Comprimir con zstd los sobres mayores a este tamaño (bytes). 0 desactiva la compresión. Requiere redis_decode_responses=False.")
+    envelope_trusted_decode: bool = Field(False, description="Fast path interno: validar solo el sobre y no el contenido de 'data'/'metadata' al decodificar.")
+
     # Puertos de servicios (configurables desde .env)
     agent_orchestrator_port: int = Field(8001, description="Puerto para Agent Orchestrator Service.")
     query_service_port: int = Field(8000, description="Puerto para Query Service.")
@@ -72,6 +72,19 @@ class OrchestratorSettings(CommonAppSettings):
         description="Habilitar tracking de performance para operaciones clave"
     )
 
+    token_stream_relay_enabled: bool = Field(
+        True,
+        description="Reenviar por WebSocket los fragmentos de respuesta publicados por Query Service"
+    )
+    token_stream_idle_timeout_seconds: float = Field(
+        60.0,
+        description="Tiempo sin fragmentos tras el cual se deja de leer el stream de tokens de una tarea"
+    )
+    token_stream_drain_timeout_seconds: float = Field(
+        2.0,
+        description="Espera máxima, tras recibir la respuesta final, para reenviar los fragmentos pendientes"
+    )
+
     active_tenants: List[str] = Field(
         default_factory=lambda: ["*"],
         description="Lista de IDs de tenants activos para los cuales el worker procesará callbacks. Ejemplo: ['tenant1', 'tenant2']. '*' para todos."
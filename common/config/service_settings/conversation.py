@@ -67,3 +67,31 @@ class ConversationSettings(CommonAppSettings):
         300,  # 5 minutos
         description="Intervalo en segundos para actualizar las estadísticas cacheadas."
     )
+    stats_bucket_retention_days: int = Field(
+        90,
+        description="Días que se conservan los rollups diarios de estadísticas (conversaciones, mensajes, tokens)."
+    )
+
+    # Migración Redis -> PostgreSQL
+    migration_batch_size: int = Field(
+        100,
+        description="Conversaciones cerradas reclamadas y escritas en PostgreSQL por lote."
+    )
+    migration_max_conversations_per_second: float = Field(
+        50.0,
+        description="Tope de conversaciones migradas por segundo y worker (0 = sin límite)."
+    )
+    migration_claim_timeout_seconds: int = Field(
+        300,
+        description="Segundos que una conversación reclamada queda oculta a otros workers antes de reintentarse."
+    )
+    migration_max_attempts: int = Field(
+        5,
+        description="Intentos de migración de una conversación antes de moverla al índice de fallidas."
+    )
+    migration_pending_ttl_seconds: int = Field(
+        7 * 86400,
+        description="TTL de una conversación cerrada en Redis mientras espera su migración."
+    )
+    migration_db_pool_min_size: int = Field(1, description="Conexiones mínimas del pool asyncpg de migración.")
+    migration_db_pool_max_size: int = Field(4, description="Conexiones máximas del pool asyncpg de migración.")
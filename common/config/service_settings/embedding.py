@@ -29,10 +29,18 @@ class EmbeddingServiceSettings(CommonAppSettings):
     worker_count: int = Field(default=5, description="Número de workers para procesar embeddings.")
     callback_queue_prefix: str = Field("embedding", description="Prefijo para colas de callback.")
     worker_sleep_seconds: float = Field(0.1, description="Tiempo de espera para workers de procesamiento.")
+    worker_batch_size: int = Field(default=10, ge=1, description="Mensajes leídos por XREADGROUP (consumo concurrente, I/O-bound con OpenAI).")
+    worker_max_concurrency: int = Field(default=20, ge=1, description="Acciones procesándose simultáneamente por worker.")
 
     # --- Configuración del Cliente OpenAI ---
     openai_timeout_seconds: int = Field(default=30, description="Timeout en segundos para las llamadas a la API de OpenAI.")
     openai_max_retries: int = Field(default=3, description="Número máximo de reintentos para las llamadas a la API de OpenAI.")
 
+    # --- Caché de embeddings (hash de modelo, dimensiones y texto normalizado) ---
+    embedding_cache_enabled: bool = Field(default=True, description="Consultar/guardar embeddings en Redis antes de llamar a OpenAI.")
+    embedding_cache_ttl_seconds: int = Field(default=604800, ge=1, description="TTL de cada embedding cacheado (segundos). Por defecto 7 días.")
 
-    
\ No newline at end of file
+    # --- Micro-batching de consultas (embedding.generate_query concurrentes) ---
+    query_coalescing_enabled: bool = Field(default=True, description="Agrupar consultas concurrentes con el mismo modelo/dimensiones en una sola llamada a OpenAI.")
+    query_coalescing_max_batch_size: int = Field(default=64, ge=1, le=2048, description="Máximo de consultas por lote; al alcanzarlo se envía sin esperar.")
+    query_coalescing_max_wait_ms: int = Field(default=5, ge=0, description="Ventana máxima (ms) que espera la primera consulta de un lote.")
@@ -57,24 +57,53 @@ class IngestionServiceSettings(CommonAppSettings):
     max_concurrent_tasks: int = Field(default=5, description="Máximo de tareas de ingestión concurrentes")
     job_timeout_seconds: int = Field(default=3600, description="Timeout de trabajos de ingestión (segundos)")
     redis_lock_timeout_seconds: int = Field(default=600, description="Timeout de bloqueos Redis para ingestión")
+    ingestion_task_timeout_hours: int = Field(default=2, ge=1, description="Duración máxima de una tarea de ingestión (expires_at)")
+    ingestion_task_stall_timeout_seconds: int = Field(default=900, ge=60, description="Una tarea sin progreso durante este tiempo se marca como fallida")
+    ingestion_sweeper_interval_seconds: int = Field(default=60, ge=1, description="Intervalo del sweeper de tareas estancadas")
+    ingestion_task_lease_seconds: int = Field(default=60, ge=5, description="TTL del lease con el que un worker reclama una tarea; se renueva mientras la tarea está en cola o en proceso")
+    ingestion_max_resume_attempts: int = Field(default=3, ge=0, description="Veces que se reanuda desde su checkpoint una tarea cuyo worker se perdió antes de marcarla como fallida")
     worker_sleep_time_seconds: float = Field(default=0.1, description="Tiempo de espera entre polls para workers de ingestión (segundos)")
 
     # Límites de tamaño y procesamiento
     max_file_size_bytes: int = Field(default=10485760, description="Tamaño máximo de archivo subido (bytes) - 10MB")
     max_document_content_size_bytes: int = Field(default=1048576, description="Tamaño máximo de contenido de documento extraído para texto (bytes) - 1MB")
     max_url_content_size_bytes: int = Field(default=10485760, description="Tamaño máximo de contenido descargado de URL (bytes) - 10MB")
+    url_fetch_timeout_seconds: int = Field(default=60, ge=1, description="Tiempo máximo total para descargar un documento desde URL (segundos)")
+    upload_dir: str = Field(default="/tmp/ingestion_uploads", description="Directorio temporal de archivos subidos; se borran cuando su tarea termina")
+    upload_chunk_size_bytes: int = Field(default=1048576, ge=4096, description="Tamaño de los bloques con que se escribe a disco un archivo subido (bytes)")
     max_chunks_per_document: int = Field(default=1000, description="Máximo número de fragmentos por documento")
 
+    # Pipeline de ingestión (parse -> chunk -> enrich -> embed con colas acotadas)
+    pipeline_cpu_workers: int = Field(default=2, ge=0, description="Procesos del pool para parsing, chunking y enriquecimiento (0 = hilos del event loop, sin pool de procesos)")
+    pipeline_queue_size: int = Field(default=4, ge=1, description="Capacidad de las colas entre etapas del pipeline (backpressure)")
+    pipeline_section_chars: int = Field(default=20000, ge=1000, description="Caracteres por sección del documento; cada sección se fragmenta y embebe por separado")
+    pipeline_batch_size: int = Field(default=32, ge=1, description="Chunks por lote entre las etapas del pipeline (unidad de enriquecimiento)")
+    progress_broadcast_interval_seconds: float = Field(default=0.5, ge=0, description="Intervalo mínimo entre notificaciones de progreso por WebSocket de una misma tarea")
+    chunk_staging_ttl_seconds: int = Field(default=3600, ge=60, description="TTL del hash de staging de chunks pendientes de embedding (por tarea)")
+
     # Chunking y procesamiento de documentos
     default_chunk_size: int = Field(default=512, description="Tamaño predeterminado de fragmentos (en tokens o caracteres según estrategia)")
     default_chunk_overlap: int = Field(default=50, description="Superposición predeterminada entre fragmentos")
     default_chunking_strategy: ChunkingStrategies = Field(default=ChunkingStrategies.SENTENCE, description="Estrategia de fragmentación predeterminada")
 
     # Integración con Embedding Service
+    embedding_max_batch_inputs: int = Field(default=2048, ge=1, le=2048, description="Máximo de textos por petición embedding.batch_process (límite de OpenAI); el tier del tenant puede reducirlo")
+    embedding_max_batch_tokens: int = Field(default=250000, ge=1, description="Máximo de tokens estimados por petición (OpenAI admite 300k por petición)")
+    embedding_max_in_flight_batches: int = Field(default=4, ge=1, description="Lotes de embedding pendientes de resultado por tarea")
+    embedding_in_flight_timeout_seconds: int = Field(default=300, ge=1, description="Espera máxima por un hueco en la ventana de lotes antes de fallar la tarea")
     embedding_model_default: str = Field(default="text-embedding-ada-002", description="Modelo de embedding a solicitar por defecto")
     embedding_service_url: Optional[str] = Field(default=None, description="URL base del Embedding Service (e.g., http://embedding-service:8001)")
     embedding_service_timeout_seconds: int = Field(default=60, description="Timeout para llamadas al Embedding Service")
 
+    # Escritura en Qdrant
+    qdrant_upsert_batch_size: int = Field(default=256, ge=1, description="Puntos por upsert; se acumulan puntos de varios callbacks de embedding")
+    qdrant_upsert_parallelism: int = Field(default=4, ge=1, description="Upserts concurrentes hacia Qdrant")
+    qdrant_upsert_linger_ms: int = Field(default=50, ge=0, description="Espera máxima para completar un lote de upsert antes de enviarlo")
+    qdrant_confirm_timeout_seconds: int = Field(default=60, ge=1, description="Espera máxima para confirmar que los puntos de un documento están aplicados")
+
+    # Búsqueda híbrida
+    sparse_vectors_enabled: bool = Field(default=True, description="Guardar un vector disperso (keywords, estilo BM25) junto al denso para búsqueda híbrida")
+
     # Storage
     storage_type: StorageTypes = Field(default=StorageTypes.LOCAL, description="Tipo de almacenamiento para archivos subidos/temporales (local, s3, azure)")
     local_storage_path: str = Field(default="/tmp/nooble4_ingestion_storage", description="Ruta base para almacenamiento local si storage_type es 'local'")
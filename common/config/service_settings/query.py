@@ -27,5 +27,24 @@ class QueryServiceSettings(CommonAppSettings):
     # Worker Settings
     worker_count: int = Field(default=5,description="Número de workers para procesar queries")
     worker_sleep_seconds: float = Field(1.0, description="Tiempo de espera entre polls para los workers de ejecución")
+    worker_batch_size: int = Field(default=10, ge=1, description="Mensajes leídos por XREADGROUP (consumo concurrente, I/O-bound con Groq)")
+    worker_max_concurrency: int = Field(default=20, ge=1, description="Acciones procesándose simultáneamente por worker")
 
-    
\ No newline at end of file
+    
+    # Streaming de tokens hacia el orquestador
+    token_streaming_enabled: bool = Field(default=True, description="Consumir Groq en modo streaming y publicar fragmentos en el stream de tokens de la tarea")
+    token_stream_flush_interval_ms: int = Field(default=50, ge=0, description="Intervalo mínimo entre publicaciones de fragmentos (agrupa tokens por XADD)")
+    token_stream_ttl_seconds: int = Field(default=300, ge=1, description="TTL del stream de tokens si nadie lo consume")
+
+    # Búsqueda híbrida (densa + dispersa por keywords, fusionadas con RRF)
+    hybrid_search_enabled: bool = Field(default=True, description="Combinar búsqueda densa y dispersa (keywords) con reciprocal-rank fusion")
+    hybrid_rrf_k: int = Field(default=60, ge=1, description="Constante k de reciprocal-rank fusion")
+    hybrid_candidate_multiplier: int = Field(default=3, ge=1, description="Candidatos por rama de búsqueda = top_k * multiplicador")
+
+    # Empaquetado de contexto (QueryConfig.max_context_tokens)
+    context_tokenizer_encoding: str = Field(default="cl100k_base", description="Encoding de tiktoken para contar tokens del contexto RAG")
+    rag_max_context_tokens: int = Field(default=4000, gt=0, description="Presupuesto de tokens de query.rag cuando la acción no trae query_config")
+    
+    # Búsqueda paralela (QueryConfig.enable_parallel_search)
+    parallel_search_default: bool = Field(default=True, description="Valor de enable_parallel_search cuando la acción no trae query_config (p. ej. query.rag)")
+    parallel_search_max_variants: int = Field(default=2, ge=1, description="Variantes de consulta por búsqueda paralela (la original más reformulaciones con el turno previo)")
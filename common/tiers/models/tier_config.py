@@ -50,6 +50,7 @@ class TierLimits(BaseModel):
     # Ingestion Service
     max_file_size_mb: int = Field(..., description="Tamaño máximo de archivo para ingesta (MB).")
     max_daily_documents: int = Field(..., description="Número máximo de documentos a ingestar por día.")
+    ingestion_scheduling_weight: int = Field(1, description="Peso del tenant en el reparto justo de slots de ingestión.")
 
     # General
     rate_limit_per_minute: int = Field(..., description="Límite de peticiones por minuto.")
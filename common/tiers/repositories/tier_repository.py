@@ -20,6 +20,7 @@ TIERS_CONFIG_DATA = {
             "max_daily_embedding_tokens": 10000,
             "max_file_size_mb": 5,
             "max_daily_documents": 5,
+            "ingestion_scheduling_weight": 1,
             "rate_limit_per_minute": 20,
         },
         "pro": {
@@ -33,6 +34,7 @@ TIERS_CONFIG_DATA = {
             "max_daily_embedding_tokens": 500000,
             "max_file_size_mb": 50,
             "max_daily_documents": 100,
+            "ingestion_scheduling_weight": 4,
             "rate_limit_per_minute": 120,
         },
     }
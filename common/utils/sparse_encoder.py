@@ -0,0 +1,75 @@
+"""
+Codificación de vectores dispersos (sparse) estilo BM25 para búsqueda híbrida.
+
+Ingestion Service codifica cada chunk a partir de sus keywords y Query Service
+codifica la consulta con la misma tokenización, de modo que ambos lados producen
+los mismos índices. Los índices son un hash estable del término; la ponderación
+IDF la aplica Qdrant (`Modifier.IDF`) sobre la colección.
+"""
+
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Nombre del vector disperso en la colección de Qdrant
+SPARSE_VECTOR_NAME = "keywords"
+
+# Conserva códigos como "xj-200", "v2.1" o "snake_case" como un único término
+_TOKEN_RE = re.compile(r"\w+(?:[-_.]\w+)*")
+
+SparseVector = Tuple[List[int], List[float]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza en minúsculas; los términos compuestos aportan también sus partes."""
+    tokens = []
+    for term in _TOKEN_RE.findall(text.lower()):
+        tokens.append(term)
+        parts = re.split(r"[-_.]", term)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def term_index(term: str) -> int:
+    """Índice estable (uint32) de un término."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: Dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return indices, [weights[i] for i in indices]
+
+
+def encode_document(
+    content: str,
+    keywords: Iterable[str],
+    k1: float = 1.2,
+    b: float = 0.75,
+    avg_doc_length: float = 256.0
+) -> SparseVector:
+    """
+    Vector disperso de un chunk: un término por token de sus keywords, ponderado
+    con la saturación de frecuencia y normalización de longitud de BM25.
+    """
+    content_counts = Counter(tokenize(content))
+    doc_length = sum(content_counts.values()) or 1
+    norm = k1 * (1 - b + b * doc_length / avg_doc_length)
+
+    weights: Dict[int, float] = {}
+    for term in {token for keyword in keywords for token in tokenize(keyword)}:
+        tf = max(content_counts.get(term, 0), 1)
+        index = term_index(term)
+        # Las colisiones de hash se acumulan en el mismo índice
+        weights[index] = weights.get(index, 0.0) + tf * (k1 + 1) / (tf + norm)
+    return _to_sparse(weights)
+
+
+def encode_query(text: str) -> SparseVector:
+    """Vector disperso de una consulta: peso 1 por término único."""
+    weights: Dict[int, float] = {}
+    for term in set(tokenize(text)):
+        index = term_index(term)
+        weights[index] = weights.get(index, 0.0) + 1.0
+    return _to_sparse(weights)
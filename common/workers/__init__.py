@@ -1,7 +1,9 @@
 """Workers common module."""
 
 from .base_worker import BaseWorker
+from .dead_letter import DeadLetterManager
 
 __all__ = [
     "BaseWorker",
+    "DeadLetterManager",
 ]
@@ -5,9 +5,8 @@ import threading
 import traceback
 import uuid
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Union
 
-from pydantic import ValidationError
 import redis.asyncio as redis_async
 import redis.exceptions
 
@@ -15,6 +14,8 @@ from common.models.actions import DomainAction, DomainActionResponse, ErrorDetai
 from common.clients.queue_manager import QueueManager
 from common.config import CommonAppSettings
 from common.clients import BaseRedisClient
+from common.clients.envelope_codec import EnvelopeCodec
+from .dead_letter import DeadLetterManager
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,7 @@ class BaseWorker(ABC):
         
         # Corregir inicialización de QueueManager y usar settings para environment
         self.queue_manager = QueueManager(environment=self.app_settings.environment)
+        self.codec = EnvelopeCodec.from_settings(self.app_settings)
         self.action_stream_name = self.queue_manager.get_service_action_stream(self.service_name) # MODIFIED: stream name
 
         # Nombres para el grupo de consumidores y el consumidor
@@ -63,9 +65,29 @@ class BaseWorker(ABC):
             settings=self.app_settings
         )
 
+        # Consumo concurrente: mensajes por XREADGROUP y handlers simultáneos por worker.
+        # Con ambos en 1 se mantiene el bucle secuencial clásico.
+        self.batch_size = max(1, getattr(app_settings, "worker_batch_size", 1))
+        self.max_concurrency = max(1, getattr(app_settings, "worker_max_concurrency", 1))
+        self.ack_flush_interval_ms = max(1, getattr(app_settings, "worker_ack_flush_interval_ms", 50))
+
+        # Recuperación de pendientes (XAUTOCLAIM) y dead-letter
+        self.reclaim_enabled = getattr(app_settings, "worker_reclaim_enabled", True)
+        self.reclaim_min_idle_ms = getattr(app_settings, "worker_reclaim_min_idle_ms", 600000)
+        self.reclaim_interval_seconds = getattr(app_settings, "worker_reclaim_interval_seconds", 15.0)
+        self.reclaim_batch_size = getattr(app_settings, "worker_reclaim_batch_size", 50)
+        self.max_deliveries = getattr(app_settings, "worker_max_deliveries", 3)
+        self.dead_letter = DeadLetterManager(
+            redis_conn=self.async_redis_conn,
+            service_name=self.service_name,
+            queue_manager=self.queue_manager,
+            maxlen=getattr(app_settings, "dead_letter_maxlen", 10000)
+        )
+
         self._running = False
         self.initialized = False
         self._worker_task: Optional[asyncio.Task] = None
+        self._reclaim_task: Optional[asyncio.Task] = None
 
     @abstractmethod
     async def _handle_action(self, action: DomainAction) -> Optional[Dict[str, Any]]:
@@ -150,10 +172,27 @@ class BaseWorker(ABC):
         logger.info(f"[WORKER_READY] Worker {self.consumer_name} listo para procesar mensajes del stream: {self.action_stream_name}, grupo: {self.consumer_group_name}")
 
         self._running = True
-        message_id_to_ack = None # Para asegurar el ACK incluso si hay error post-procesamiento
+        if self.reclaim_enabled:
+            self._reclaim_task = asyncio.create_task(self._reclaim_loop())
 
+        try:
+            # Modo concurrente: lotes de XREADGROUP + handlers en paralelo + XACK agrupado
+            if self.batch_size > 1 or self.max_concurrency > 1:
+                await self._process_batched_action_loop()
+            else:
+                await self._process_sequential_action_loop()
+        finally:
+            if self._reclaim_task:
+                self._reclaim_task.cancel()
+                try:
+                    await self._reclaim_task
+                except asyncio.CancelledError:
+                    pass
+                self._reclaim_task = None
+
+    async def _process_sequential_action_loop(self):
+        """Bucle clásico: un mensaje por XREADGROUP, procesado y confirmado antes de leer el siguiente."""
         while self._running:
-            action = None # Asegurar que action está definida para el logging en caso de error temprano
             try:
                 # Leer hasta 1 mensaje, bloquear por 1000ms (1 segundo)
                 # '>' significa solo nuevos mensajes no aún entregados a ningún consumidor en este grupo
@@ -174,99 +213,316 @@ class BaseWorker(ABC):
                 if not message_list:
                     continue
                 
-                message_id_bytes, message_payload_dict = message_list[0]
-                message_id_to_ack = message_id_bytes.decode('utf-8')
-
-                message_json_bytes = message_payload_dict.get(b'data')
-                if message_json_bytes is None:
-                    logger.error(f"[{self.service_name}][{self.consumer_name}] Mensaje {message_id_to_ack} del stream {self.action_stream_name} no tiene campo 'data'. Descartando y ACK.")
-                    await self.async_redis_conn.xack(self.action_stream_name, self.consumer_group_name, message_id_to_ack)
-                    message_id_to_ack = None
-                    continue
-                
-                message_json = message_json_bytes.decode('utf-8')
-                action = DomainAction.model_validate_json(message_json)
-                logger.info(f"[{self.service_name}][{self.consumer_name}] Acción {action.action_id} ({action.action_type}) recibida del stream (MsgID: {message_id_to_ack})", extra=action.get_log_extra())
+                message_id, message_payload_dict = message_list[0]
+                message_id_to_ack = self._decode(message_id)
 
-                try:
-                    handler_result = await self._handle_action(action)
-
-                    # CORRECCIÓN 5: Manejar DomainActionResponse correctamente
-                    # Normalizar handler_result para que siempre sea dict o None
-                    if isinstance(handler_result, DomainActionResponse):
-                        # Si es DomainActionResponse, extraer los datos
-                        if handler_result.success:
-                            normalized_result = handler_result.data or {}
-                        else:
-                            # Si es un error, crear una excepción para que se maneje en el catch
-                            error_msg = handler_result.error.message if handler_result.error else "Error desconocido"
-                            raise Exception(f"Handler devolvió error: {error_msg}")
-                    else:
-                        # Si es dict o None, usar tal como está
-                        normalized_result = handler_result
-
-                    # Procesamiento de respuesta/callback se mantiene igual
-                    if normalized_result is None and not action.callback_queue_name:
-                        logger.debug(f"[{self.service_name}][{self.consumer_name}] Acción fire-and-forget {action.action_id} completada.")
-                        # No hay más que hacer para fire-and-forget, se hará ACK abajo
-                    else:
-                        is_pseudo_sync = action.callback_queue_name and not action.callback_action_type
-                        is_async_callback = action.callback_queue_name and action.callback_action_type
-
-                        if is_pseudo_sync:
-                            if action.correlation_id is None:
-                                logger.error(f"[{self.service_name}][{self.consumer_name}] Error crítico: Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id. No se enviará respuesta.")
-                                raise ValueError(f"Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id.")
-                            response = self._create_success_response(action, normalized_result or {})
-                            await self._send_response(response, action.callback_queue_name)
-                        elif is_async_callback:
-                            await self._send_callback(action, normalized_result or {})
-                        # Si normalized_result no es None pero no es ni pseudo-sync ni async_callback, es un fire-and-forget que devolvió algo. Se hace ACK.
-
-                    # Si todo fue bien, ACK el mensaje
+                if await self._process_message(message_id_to_ack, message_payload_dict):
                     await self.async_redis_conn.xack(self.action_stream_name, self.consumer_group_name, message_id_to_ack)
                     logger.debug(f"[{self.service_name}][{self.consumer_name}] Mensaje {message_id_to_ack} ACKed.")
-                    message_id_to_ack = None # Reseteado después de ACK exitoso
-
-                except Exception as e:
-                    # Error durante _handle_action o envío de respuesta/callback
-                    # NO HACER ACK. El mensaje permanecerá en PEL para ser reprocesado o reclamado.
-                    logger.error(f"[{self.service_name}][{self.consumer_name}] Error en handler para '{action.action_type}' (MsgID: {message_id_to_ack}): {e}", extra=action.get_log_extra() if action else None)
-                    traceback.print_exc()
-                    if action and action.callback_queue_name: # Solo intentar enviar error si es posible
-                        error_code = "HANDLER_EXECUTION_ERROR"
-                        error_response = self._create_error_response(action, str(e), error_code)
-                        # Solo enviar respuesta de error si hay una cola de callback definida para respuestas pseudo-síncronas
-                        if action.callback_queue_name and not action.callback_action_type: # Es pseudo-síncrono
-                            if action.correlation_id is None:
-                                logger.error(f"[{self.service_name}][{self.consumer_name}] Error crítico al intentar enviar respuesta de error: Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id. No se enviará respuesta de error.")
-                                # La excepción original 'e' ya está en curso y causará que el mensaje no sea ACKed.
-                                # No es necesario levantar otra excepción aquí, solo evitar el intento de _send_response.
-                            else:
-                                await self._send_response(error_response, action.callback_queue_name)
-                        else:
-                            logger.warning(f"[{self.service_name}][{self.consumer_name}] No se envió respuesta de error para {action.action_id} ({action.action_type}) porque no es pseudo-síncrona o no tiene callback_queue_name.")
-                    # No ACK aquí. message_id_to_ack no se resetea.
-            
-            except ValidationError as e:
-                logger.error(f"[{self.service_name}][{self.consumer_name}] Error de validación de DomainAction (MsgID: {message_id_to_ack}): {e}. Mensaje original: {message_json_bytes.decode('utf-8') if message_json_bytes else 'N/A'}")
-                if message_id_to_ack: # Si tenemos un ID, ACK para no reprocesar mensaje malformado
-                    await self.async_redis_conn.xack(self.action_stream_name, self.consumer_group_name, message_id_to_ack)
-                    logger.warning(f"[{self.service_name}][{self.consumer_name}] Mensaje malformado {message_id_to_ack} ACKed para evitar bucle.")
-                    message_id_to_ack = None
             
             except redis_async.RedisError as e:
                 # Errores de Redis como conexión perdida durante XREADGROUP o XACK
-                logger.error(f"[{self.service_name}][{self.consumer_name}] Error de conexión con Redis (MsgID: {message_id_to_ack}): {e}. Reintentando en 5s...")
+                logger.error(f"[{self.service_name}][{self.consumer_name}] Error de conexión con Redis: {e}. Reintentando en 5s...")
                 await asyncio.sleep(5) # El mensaje (si se leyó) no será ACKed y debería ser reprocesado
             
             except Exception as e:
-                logger.critical(f"[{self.service_name}][{self.consumer_name}] Error crítico en el bucle del worker (MsgID: {message_id_to_ack}): {e}")
+                logger.critical(f"[{self.service_name}][{self.consumer_name}] Error crítico en el bucle del worker: {e}")
                 traceback.print_exc()
                 self._running = False # Detener el worker en caso de error muy grave
 
         logger.info(f"[{self.service_name}][{self.consumer_name}] Worker detenido.")
 
+    async def _process_batched_action_loop(self):
+        """
+        Bucle de consumo concurrente.
+
+        Lee hasta `batch_size` mensajes por XREADGROUP (nunca más que los slots libres),
+        ejecuta cada `_handle_action` como una tarea independiente con un máximo de
+        `max_concurrency` en vuelo, y confirma los mensajes terminados con un único
+        XACK multi-ID por iteración. Un handler lento ya no bloquea al resto.
+        """
+        in_flight: Set[asyncio.Task] = set()
+        acks_pending: List[str] = []
+
+        def _on_done(task: asyncio.Task, message_id: str):
+            in_flight.discard(task)
+            if not task.cancelled() and task.exception() is None and task.result():
+                acks_pending.append(message_id)
+
+        logger.info(
+            f"[{self.service_name}][{self.consumer_name}] Modo concurrente activo "
+            f"(batch_size={self.batch_size}, max_concurrency={self.max_concurrency})"
+        )
+
+        while self._running:
+            try:
+                await self._flush_acks(acks_pending)
+
+                free_slots = self.max_concurrency - len(in_flight)
+                if free_slots <= 0:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                stream_messages = await self.async_redis_conn.xreadgroup(
+                    groupname=self.consumer_group_name,
+                    consumername=self.consumer_name,
+                    streams={self.action_stream_name: '>'},
+                    count=min(self.batch_size, free_slots),
+                    # Con tareas en vuelo se bloquea menos para confirmar (ACK) sin demora
+                    block=self.ack_flush_interval_ms if in_flight else 1000
+                )
+
+                if not stream_messages:
+                    continue
+
+                _stream_key_name, message_list = stream_messages[0]
+                for message_id, message_payload_dict in message_list:
+                    message_id_str = self._decode(message_id)
+                    task = asyncio.create_task(self._process_message(message_id_str, message_payload_dict))
+                    in_flight.add(task)
+                    task.add_done_callback(lambda t, mid=message_id_str: _on_done(t, mid))
+
+            except redis_async.RedisError as e:
+                logger.error(f"[{self.service_name}][{self.consumer_name}] Error de conexión con Redis: {e}. Reintentando en 5s...")
+                await asyncio.sleep(5)
+
+            except Exception as e:
+                logger.critical(f"[{self.service_name}][{self.consumer_name}] Error crítico en el bucle concurrente del worker: {e}")
+                traceback.print_exc()
+                self._running = False
+
+        # Drenar las tareas en vuelo antes de salir para no dejar mensajes sin ACK innecesariamente
+        if in_flight:
+            logger.info(f"[{self.service_name}][{self.consumer_name}] Esperando {len(in_flight)} acciones en vuelo antes de detener.")
+            await asyncio.gather(*list(in_flight), return_exceptions=True)
+        try:
+            await self._flush_acks(acks_pending)
+        except redis_async.RedisError as e:
+            logger.error(f"[{self.service_name}][{self.consumer_name}] No se pudieron confirmar {len(acks_pending)} mensajes al detener: {e}")
+
+        logger.info(f"[{self.service_name}][{self.consumer_name}] Worker detenido.")
+
+    async def _reclaim_loop(self):
+        """
+        Tarea en segundo plano que recupera mensajes del PEL del grupo que llevan
+        más de `reclaim_min_idle_ms` sin ACK (consumidor caído, despliegue, error).
+        """
+        while self._running:
+            try:
+                await asyncio.sleep(self.reclaim_interval_seconds)
+                if not self._running:
+                    break
+                reclaimed = await self._reclaim_pending()
+                if reclaimed:
+                    logger.info(f"[{self.service_name}][{self.consumer_name}] {reclaimed} mensajes pendientes reclamados.")
+            except asyncio.CancelledError:
+                raise
+            except redis_async.RedisError as e:
+                logger.error(f"[{self.service_name}][{self.consumer_name}] Error de Redis en el reclamador de pendientes: {e}")
+            except Exception as e:
+                logger.error(f"[{self.service_name}][{self.consumer_name}] Error inesperado en el reclamador de pendientes: {e}", exc_info=True)
+
+    async def _reclaim_pending(self) -> int:
+        """
+        Una pasada de XAUTOCLAIM sobre el PEL. Los mensajes que superan
+        `max_deliveries` se mueven al stream de dead-letter; el resto se reprocesa
+        y se confirma en lote.
+
+        Returns:
+            Número de mensajes reclamados.
+        """
+        total = 0
+        start_id = '0-0'
+        while self._running:
+            result = await self.async_redis_conn.xautoclaim(
+                name=self.action_stream_name,
+                groupname=self.consumer_group_name,
+                consumername=self.consumer_name,
+                min_idle_time=self.reclaim_min_idle_ms,
+                start_id=start_id,
+                count=self.reclaim_batch_size
+            )
+            start_id = self._decode(result[0])
+            claimed = result[1]
+            if not claimed:
+                break
+            total += len(claimed)
+
+            # XAUTOCLAIM no devuelve el contador de entregas: se consulta ID a ID en un
+            # pipeline, porque un rango podría llenarse con otras entradas en vuelo
+            claimed_ids = [self._decode(message_id) for message_id, _ in claimed]
+            async with self.async_redis_conn.pipeline(transaction=False) as pipe:
+                for message_id in claimed_ids:
+                    pipe.xpending_range(
+                        name=self.action_stream_name,
+                        groupname=self.consumer_group_name,
+                        min=message_id,
+                        max=message_id,
+                        count=1
+                    )
+                pending_info = await pipe.execute()
+            deliveries = {
+                self._decode(info[0]['message_id']): info[0]['times_delivered']
+                for info in pending_info if info
+            }
+
+            to_process = []
+            to_ack = []
+            for message_id, (_raw_id, fields) in zip(claimed_ids, claimed):
+                if not fields:
+                    # La entrada ya no existe en el stream (XDEL/XTRIM): solo limpiar el PEL
+                    to_ack.append(message_id)
+                    continue
+                delivery_count = deliveries.get(message_id, 1)
+                if delivery_count > self.max_deliveries:
+                    await self.dead_letter.move(
+                        message_id=message_id,
+                        fields=fields,
+                        consumer_group=self.consumer_group_name,
+                        delivery_count=delivery_count,
+                        consumer_name=self.consumer_name,
+                        reason="MAX_DELIVERIES_EXCEEDED"
+                    )
+                    await self._notify_dead_letter(message_id, fields, delivery_count)
+                else:
+                    to_process.append((message_id, fields))
+
+            results = await asyncio.gather(
+                *(
+                    self._process_message(message_id, fields, deliveries.get(message_id, 1))
+                    for message_id, fields in to_process
+                ),
+                return_exceptions=True
+            )
+            to_ack.extend(message_id for (message_id, _), ok in zip(to_process, results) if ok is True)
+            await self._flush_acks(to_ack)
+
+            if start_id == '0-0':
+                break
+        return total
+
+    async def _notify_dead_letter(self, message_id: str, fields: Dict[Any, Any], delivery_count: int):
+        """Si la acción muerta era pseudo-síncrona, responde con error para que el llamante no espere al timeout."""
+        try:
+            action = self.codec.decode_action(fields)
+        except (KeyError, ValueError):
+            return
+        if action.callback_queue_name and not action.callback_action_type and action.correlation_id:
+            error_response = self._create_error_response(
+                action,
+                f"Acción descartada tras {delivery_count} entregas fallidas (MsgID: {message_id}).",
+                "MAX_DELIVERIES_EXCEEDED"
+            )
+            await self._send_response(error_response, action.callback_queue_name)
+
+    async def _flush_acks(self, acks_pending: List[str]):
+        """Confirma en una sola llamada XACK todos los mensajes terminados pendientes."""
+        if not acks_pending:
+            return
+        message_ids = list(acks_pending)
+        await self.async_redis_conn.xack(self.action_stream_name, self.consumer_group_name, *message_ids)
+        del acks_pending[:len(message_ids)]
+        logger.debug(f"[{self.service_name}][{self.consumer_name}] {len(message_ids)} mensajes ACKed en lote.")
+
+    @staticmethod
+    def _decode(value: Union[bytes, str]) -> str:
+        """Normaliza valores de Redis independientemente de `decode_responses`."""
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    async def _process_message(
+        self,
+        message_id: str,
+        message_payload_dict: Dict[Any, Any],
+        delivery_count: int = 1
+    ) -> bool:
+        """
+        Deserializa y procesa un único mensaje del stream.
+
+        Returns:
+            True si el mensaje debe confirmarse (ACK): procesado correctamente,
+            malformado o pseudo-síncrono ya respondido con error (se mueve a
+            dead-letter). False si el handler falló y el mensaje debe quedarse en
+            el PEL para reintentarse.
+        """
+        try:
+            action = self.codec.decode_action(message_payload_dict)
+        except KeyError:
+            logger.error(f"[{self.service_name}][{self.consumer_name}] Mensaje {message_id} del stream {self.action_stream_name} no tiene campo 'data'. Descartando y ACK.")
+            return True
+        except ValueError as e:
+            # ValidationError (Pydantic) o payload/codec no decodificable
+            logger.error(f"[{self.service_name}][{self.consumer_name}] Error de validación de DomainAction (MsgID: {message_id}): {e}. Codec: {self._decode(message_payload_dict.get(b'codec', message_payload_dict.get('codec')) or 'json')}")
+            logger.warning(f"[{self.service_name}][{self.consumer_name}] Mensaje malformado {message_id} ACKed para evitar bucle.")
+            return True
+
+        logger.info(f"[{self.service_name}][{self.consumer_name}] Acción {action.action_id} ({action.action_type}) recibida del stream (MsgID: {message_id})", extra=action.get_log_extra())
+
+        try:
+            handler_result = await self._handle_action(action)
+
+            # CORRECCIÓN 5: Manejar DomainActionResponse correctamente
+            # Normalizar handler_result para que siempre sea dict o None
+            if isinstance(handler_result, DomainActionResponse):
+                # Si es DomainActionResponse, extraer los datos
+                if handler_result.success:
+                    normalized_result = handler_result.data or {}
+                else:
+                    # Si es un error, crear una excepción para que se maneje en el catch
+                    error_msg = handler_result.error.message if handler_result.error else "Error desconocido"
+                    raise Exception(f"Handler devolvió error: {error_msg}")
+            else:
+                # Si es dict o None, usar tal como está
+                normalized_result = handler_result
+
+            # Procesamiento de respuesta/callback se mantiene igual
+            if normalized_result is None and not action.callback_queue_name:
+                logger.debug(f"[{self.service_name}][{self.consumer_name}] Acción fire-and-forget {action.action_id} completada.")
+                # No hay más que hacer para fire-and-forget, se hará ACK
+            else:
+                is_pseudo_sync = action.callback_queue_name and not action.callback_action_type
+                is_async_callback = action.callback_queue_name and action.callback_action_type
+
+                if is_pseudo_sync:
+                    if action.correlation_id is None:
+                        logger.error(f"[{self.service_name}][{self.consumer_name}] Error crítico: Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id. No se enviará respuesta.")
+                        raise ValueError(f"Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id.")
+                    response = self._create_success_response(action, normalized_result or {})
+                    await self._send_response(response, action.callback_queue_name)
+                elif is_async_callback:
+                    await self._send_callback(action, normalized_result or {})
+                # Si normalized_result no es None pero no es ni pseudo-sync ni async_callback, es un fire-and-forget que devolvió algo. Se hace ACK.
+
+            return True
+
+        except Exception as e:
+            # Error durante _handle_action o envío de respuesta/callback
+            # NO HACER ACK. El mensaje permanecerá en PEL para ser reprocesado o reclamado.
+            logger.error(f"[{self.service_name}][{self.consumer_name}] Error en handler para '{action.action_type}' (MsgID: {message_id}): {e}", extra=action.get_log_extra())
+            traceback.print_exc()
+            if action.callback_queue_name: # Solo intentar enviar error si es posible
+                error_code = "HANDLER_EXECUTION_ERROR"
+                error_response = self._create_error_response(action, str(e), error_code)
+                # Solo enviar respuesta de error si hay una cola de callback definida para respuestas pseudo-síncronas
+                if not action.callback_action_type: # Es pseudo-síncrono
+                    if action.correlation_id is None:
+                        logger.error(f"[{self.service_name}][{self.consumer_name}] Error crítico al intentar enviar respuesta de error: Acción {action.action_id} ({action.action_type}) requiere respuesta pseudo-síncrona pero no tiene correlation_id. No se enviará respuesta de error.")
+                    else:
+                        await self._send_response(error_response, action.callback_queue_name)
+                        # El llamante ya tiene su respuesta: reintentar repetiría efectos y
+                        # respuestas. Se conserva en dead-letter para inspección/replay.
+                        await self.dead_letter.move(
+                            message_id=message_id,
+                            fields=message_payload_dict,
+                            consumer_group=self.consumer_group_name,
+                            delivery_count=delivery_count,
+                            consumer_name=self.consumer_name,
+                            reason=error_code
+                        )
+                        return True
+                else:
+                    logger.warning(f"[{self.service_name}][{self.consumer_name}] No se envió respuesta de error para {action.action_id} ({action.action_type}) porque no es pseudo-síncrona o no tiene callback_queue_name.")
+            return False
+
     def _create_success_response(self, action: DomainAction, data: Optional[Dict[str, Any]]) -> DomainActionResponse:
         """Crea una DomainActionResponse de éxito."""
         return DomainActionResponse(
@@ -315,7 +571,14 @@ class BaseWorker(ABC):
         }
 
         try:
-            await self.async_redis_conn.lpush(target_queue_name, response.model_dump_json())
+            if self.queue_manager.is_reply_stream(target_queue_name):
+                # Stream de respuestas multiplexado del proceso cliente (ReplyListener)
+                pipe = self.async_redis_conn.pipeline(transaction=False)
+                pipe.xadd(target_queue_name, self.codec.encode(response))
+                pipe.expire(target_queue_name, self.app_settings.reply_stream_ttl_seconds)
+                await pipe.execute()
+            else:
+                await self.async_redis_conn.lpush(target_queue_name, response.model_dump_json())
             logger.info(f"[{self.service_name}] Respuesta {response.action_id} para {response.correlation_id} enviada a {target_queue_name}.", extra=log_extra)
         except redis_async.RedisError as e:
             logger.error(f"[{self.service_name}] Error de Redis al enviar respuesta a {target_queue_name}: {e}", extra=log_extra)
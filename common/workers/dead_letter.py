@@ -0,0 +1,140 @@
+"""
+Gestión del stream de dead-letter de un servicio.
+
+Clases:
+- DeadLetterManager: Mueve mensajes agotados al stream de dead-letter del servicio
+  y permite inspeccionarlos, re-encolarlos (replay) o descartarlos.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+import redis.asyncio as redis_async
+
+from common.clients.queue_manager import QueueManager
+
+logger = logging.getLogger(__name__)
+
+# Campos de la entrada original que forman el sobre de la acción
+_PAYLOAD_FIELDS = ('data', 'codec')
+
+
+def _decode(value: Union[bytes, str, None]) -> Optional[str]:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class DeadLetterManager:
+    """
+    Stream de dead-letter por servicio.
+
+    Cada entrada conserva el payload original (`data`) más los metadatos del fallo:
+    ID original en el stream de acciones, número de entregas, último consumidor,
+    motivo y fecha. Puede usarse desde un worker o desde rutas de administración.
+    """
+
+    def __init__(
+        self,
+        redis_conn: redis_async.Redis,
+        service_name: str,
+        queue_manager: QueueManager,
+        maxlen: int = 10000
+    ):
+        self.redis_conn = redis_conn
+        self.service_name = service_name
+        self.queue_manager = queue_manager
+        self.action_stream_name = queue_manager.get_service_action_stream(service_name)
+        self.dead_letter_stream_name = queue_manager.get_dead_letter_stream(service_name)
+        self.maxlen = maxlen
+
+    async def move(
+        self,
+        message_id: str,
+        fields: Dict[Any, Any],
+        consumer_group: str,
+        delivery_count: int,
+        consumer_name: str,
+        reason: str
+    ) -> str:
+        """
+        Copia el mensaje al stream de dead-letter y lo confirma (XACK) en el grupo
+        original en la misma transacción, para que no vuelva a reclamarse.
+
+        Returns:
+            El ID de la entrada en el stream de dead-letter.
+        """
+        # Se conserva el payload tal cual (incluido el campo `codec` si es binario)
+        entry = {_decode(k): v for k, v in fields.items()}
+        entry.update({
+            'original_id': message_id,
+            'delivery_count': str(delivery_count),
+            'consumer': consumer_name,
+            'reason': reason,
+            'failed_at': datetime.now(timezone.utc).isoformat()
+        })
+        pipe = self.redis_conn.pipeline(transaction=True)
+        pipe.xadd(self.dead_letter_stream_name, entry, maxlen=self.maxlen, approximate=True)
+        pipe.xack(self.action_stream_name, consumer_group, message_id)
+        results = await pipe.execute()
+        dead_letter_id = _decode(results[0])
+        logger.warning(
+            f"[{self.service_name}] Mensaje {message_id} movido a dead-letter ({self.dead_letter_stream_name}) "
+            f"como {dead_letter_id} tras {delivery_count} entregas. Motivo: {reason}"
+        )
+        return dead_letter_id
+
+    async def list(self, count: int = 50, start: str = '-', end: str = '+') -> List[Dict[str, Any]]:
+        """Lista entradas de dead-letter (orden cronológico) con sus metadatos."""
+        entries = await self.redis_conn.xrange(self.dead_letter_stream_name, min=start, max=end, count=count)
+        result = []
+        for entry_id, fields in entries:
+            entry = {"dead_letter_id": _decode(entry_id)}
+            for key, value in fields.items():
+                key = _decode(key)
+                if key == 'data' and isinstance(value, bytes):
+                    # Payload binario (msgpack/zstd): solo se informa el tamaño
+                    entry['data_size_bytes'] = len(value)
+                    continue
+                entry[key] = _decode(value)
+            result.append(entry)
+        return result
+
+    async def count(self) -> int:
+        """Número de entradas en el stream de dead-letter."""
+        return await self.redis_conn.xlen(self.dead_letter_stream_name)
+
+    async def replay(self, dead_letter_id: str) -> Optional[str]:
+        """
+        Re-encola una entrada en el stream de acciones del servicio y la elimina
+        del dead-letter. La acción vuelve a entregarse con un contador de entregas nuevo.
+
+        Returns:
+            El nuevo ID en el stream de acciones, o None si la entrada no existe.
+        """
+        entries = await self.redis_conn.xrange(self.dead_letter_stream_name, min=dead_letter_id, max=dead_letter_id)
+        if not entries:
+            logger.warning(f"[{self.service_name}] Entrada de dead-letter {dead_letter_id} no encontrada.")
+            return None
+
+        _entry_id, fields = entries[0]
+        payload = {k: v for k, v in fields.items() if _decode(k) in _PAYLOAD_FIELDS}
+        pipe = self.redis_conn.pipeline(transaction=True)
+        pipe.xadd(self.action_stream_name, payload)
+        pipe.xdel(self.dead_letter_stream_name, dead_letter_id)
+        results = await pipe.execute()
+        new_id = _decode(results[0])
+        logger.info(f"[{self.service_name}] Entrada de dead-letter {dead_letter_id} re-encolada como {new_id}.")
+        return new_id
+
+    async def replay_all(self, count: int = 100) -> List[str]:
+        """Re-encola hasta `count` entradas (las más antiguas primero)."""
+        replayed = []
+        for entry in await self.list(count=count):
+            new_id = await self.replay(entry["dead_letter_id"])
+            if new_id:
+                replayed.append(new_id)
+        return replayed
+
+    async def discard(self, dead_letter_id: str) -> bool:
+        """Elimina definitivamente una entrada de dead-letter."""
+        return await self.redis_conn.xdel(self.dead_letter_stream_name, dead_letter_id) > 0
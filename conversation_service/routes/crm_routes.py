@@ -21,20 +21,23 @@ async def list_conversations(
     tenant_id: str,
     agent_id: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     conversation_service: ConversationService = Depends(get_conversation_service)
 ):
-    """Lista conversaciones para CRM."""
-    conversations = await conversation_service.get_conversation_list(
+    """Lista conversaciones para CRM, más recientes primero."""
+    result = await conversation_service.get_conversation_list(
         tenant_id=tenant_id,
         agent_id=agent_id,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
     
     return {
         "success": True,
         "tenant_id": tenant_id,
-        "conversations": conversations,
-        "total": len(conversations)
+        "conversations": result["conversations"],
+        "next_cursor": result["next_cursor"],
+        "total": result["total"]
     }
 
 @router.get("/conversations/{tenant_id}/{conversation_id}")
@@ -33,6 +33,22 @@ class AgentPerformanceResponse(BaseModel):
     metrics: Dict[str, Any]
 
 # Dependencias
+def _period_days(period: str) -> int:
+    """Convierte 'today' o 'last_N_days' en número de días (limitado a la retención de rollups)."""
+    if period == "today":
+        return 1
+    if period.startswith("last_") and period.endswith("_days"):
+        try:
+            days = int(period[len("last_"):-len("_days")])
+        except ValueError:
+            days = 0
+        if 0 < days <= settings.stats_bucket_retention_days:
+            return days
+    raise HTTPException(
+        status_code=400,
+        detail=f"Período no válido: {period}. Use 'today' o 'last_N_days' (N <= {settings.stats_bucket_retention_days})"
+    )
+
 async def get_conversation_service():
     """Dependency para obtener ConversationService."""
     redis_client = await get_redis_client()
@@ -45,23 +61,8 @@ async def get_conversations_summary(
     period: str = Query("last_30_days", description="Período de análisis"),
     conversation_service: ConversationService = Depends(get_conversation_service)
 ):
-    """Obtiene resumen de analytics de conversaciones."""
-    # TODO: Implementar analytics reales
-    # Por ahora retorna datos mock
-    
-    metrics = {
-        "total_conversations": 150,
-        "active_conversations": 12,
-        "avg_satisfaction": 4.2,
-        "resolution_rate": 0.85,
-        "avg_response_time_seconds": 3.5,
-        "total_messages": 1250,
-        "top_topics": [
-            {"topic": "billing", "count": 45},
-            {"topic": "support", "count": 38},
-            {"topic": "product", "count": 27}
-        ]
-    }
+    """Obtiene resumen de analytics de conversaciones desde los rollups diarios."""
+    metrics = await conversation_service.get_period_stats(tenant_id, _period_days(period))
     
     return ConversationSummaryResponse(
         success=True,
@@ -76,27 +77,8 @@ async def get_agent_performance(
     period: str = Query("last_7_days", description="Período de análisis"),
     conversation_service: ConversationService = Depends(get_conversation_service)
 ):
-    """Obtiene métricas de performance de un agente."""
-    # TODO: Implementar analytics reales
-    # Por ahora retorna datos mock
-    
-    metrics = {
-        "total_conversations": 45,
-        "avg_satisfaction": 4.5,
-        "resolution_rate": 0.9,
-        "avg_response_time_seconds": 2.8,
-        "total_messages": 380,
-        "sentiment_distribution": {
-            "positive": 0.7,
-            "neutral": 0.2,
-            "negative": 0.1
-        },
-        "busiest_hours": [
-            {"hour": 10, "conversations": 8},
-            {"hour": 14, "conversations": 12},
-            {"hour": 16, "conversations": 10}
-        ]
-    }
+    """Obtiene métricas de un agente desde los rollups diarios."""
+    metrics = await conversation_service.get_period_stats(tenant_id, _period_days(period), agent_id=agent_id)
     
     return AgentPerformanceResponse(
         success=True,
@@ -3,7 +3,7 @@ Servicio principal integrado con MemoryManager y PersistenceManager.
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
 from datetime import datetime
 
 from conversation_service.models.conversation_model import (
@@ -47,16 +47,9 @@ class ConversationService:
             conversation = await self.persistence.get_conversation_by_session(session_id, tenant_id)
             
             if not conversation:
-                # Crear nueva conversación
-                conversation = Conversation(
-                    tenant_id=tenant_id,
-                    session_id=session_id,
-                    agent_id=agent_id,
-                    user_id=user_id,
-                    model_name=model_name
+                conversation = await self._create_conversation(
+                    tenant_id, session_id, agent_id, user_id, model_name
                 )
-                await self.persistence.save_conversation_to_redis(conversation)
-                logger.info(f"Nueva conversación creada: {conversation.id}")
             
             # Crear mensaje
             message = Message(
@@ -70,7 +63,13 @@ class ConversationService:
             )
             
             # Guardar en Redis
-            await self.persistence.save_message_to_redis(message)
+            if await self.persistence.save_message_to_redis(message, conversation) < 0:
+                # Se migró entre la lectura y el append: el mensaje abre conversación nueva
+                conversation = await self._create_conversation(
+                    tenant_id, session_id, agent_id, user_id, model_name
+                )
+                message.conversation_id = conversation.id
+                await self.persistence.save_message_to_redis(message, conversation)
             
             # La gestión de memoria ahora es más simple y no requiere una actualización explícita aquí.
             # El contexto se construye directamente desde los mensajes guardados cuando se solicita.
@@ -91,6 +90,26 @@ class ConversationService:
                 "error": str(e)
             }
     
+    async def _create_conversation(
+        self,
+        tenant_id: str,
+        session_id: str,
+        agent_id: str,
+        user_id: Optional[str],
+        model_name: str
+    ) -> Conversation:
+        """Crea una conversación nueva para la sesión y la guarda en Redis."""
+        conversation = Conversation(
+            tenant_id=tenant_id,
+            session_id=session_id,
+            agent_id=agent_id,
+            user_id=user_id,
+            model_name=model_name
+        )
+        await self.persistence.save_conversation_to_redis(conversation, created=True)
+        logger.info(f"Nueva conversación creada: {conversation.id}")
+        return conversation
+    
     async def get_context_for_query(
         self,
         tenant_id: str,
@@ -147,7 +166,7 @@ class ConversationService:
             conversation = await self.persistence.get_conversation_by_session(session_id, tenant_id)
             
             if conversation:
-                await self.persistence.mark_conversation_for_migration(conversation.id)
+                await self.persistence.mark_conversation_for_migration(conversation.id, tenant_id)
                 logger.info(f"Sesión marcada para migración: {session_id}")
                 return True
                 
@@ -163,61 +182,63 @@ class ConversationService:
         """Obtiene estadísticas del tenant."""
         return await self.persistence.get_basic_stats(tenant_id)
     
+    async def get_period_stats(
+        self,
+        tenant_id: str,
+        days: int,
+        agent_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Obtiene estadísticas por día del tenant o de un agente."""
+        return await self.persistence.get_period_stats(tenant_id, days, agent_id)
+    
     async def get_conversation_list(
         self,
         tenant_id: str,
         agent_id: Optional[str] = None,
-        limit: int = 50
-    ) -> List[Dict[str, Any]]:
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Lista conversaciones para CRM/Dashboard.
+        Lista conversaciones para CRM/Dashboard, por última actividad y paginadas
+        con cursor.
         """
         try:
-            # TODO: Implementar cuando esté PostgreSQL
-            # Por ahora, buscar en Redis (solo activas)
-            pattern = f"conversation:{tenant_id}:*"
-            keys = await self.persistence.redis.keys(pattern)
-            
-            conversations = []
-            for key in keys[:limit]:
-                data = await self.persistence.redis.get(key)
-                if data:
-                    try:
-                        conv = Conversation.parse_raw(data)
-                        
-                        # Filtrar por agente si se especifica
-                        if agent_id and conv.agent_id != agent_id:
-                            continue
-                        
-                        conversations.append({
-                            "id": conv.id,
-                            "session_id": conv.session_id,
-                            "agent_id": conv.agent_id,
-                            "status": conv.status.value,
-                            "message_count": conv.message_count,
-                            "total_tokens": conv.total_tokens,
-                            "created_at": conv.created_at.isoformat(),
-                            "last_message_at": conv.last_message_at.isoformat() if conv.last_message_at else None
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"Error parseando conversación: {str(e)}")
-            
-            # Ordenar por fecha de creación (más reciente primero)
-            conversations.sort(key=lambda x: x["created_at"], reverse=True)
+            # Solo conversaciones activas en Redis
+            conversations, next_cursor, total = await self.persistence.list_conversations_by_activity(
+                tenant_id=tenant_id,
+                agent_id=agent_id,
+                limit=limit,
+                cursor=cursor
+            )
             
-            return conversations
+            return {
+                "conversations": [
+                    {
+                        "id": conv.id,
+                        "session_id": conv.session_id,
+                        "agent_id": conv.agent_id,
+                        "status": conv.status.value,
+                        "message_count": conv.message_count,
+                        "total_tokens": conv.total_tokens,
+                        "created_at": conv.created_at.isoformat(),
+                        "last_message_at": conv.last_message_at.isoformat() if conv.last_message_at else None
+                    }
+                    for conv in conversations
+                ],
+                "next_cursor": next_cursor,
+                "total": total
+            }
             
         except Exception as e:
             logger.error(f"Error listando conversaciones: {str(e)}")
-            return []
+            return {"conversations": [], "next_cursor": None, "total": 0}
     
     async def get_conversation_full(self, conversation_id: str, tenant_id: str) -> Dict[str, Any]:
         """
         Obtiene conversación completa con mensajes para CRM.
         """
         try:
-            conversation = await self.persistence.get_conversation_from_redis(conversation_id)
+            conversation = await self.persistence.get_conversation_from_redis(conversation_id, tenant_id)
             
             # Verificar pertenencia al tenant
             if not conversation or conversation.tenant_id != tenant_id:
@@ -4,7 +4,8 @@ Gestor de persistencia Redis y PostgreSQL.
 
 import json
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import redis.asyncio as redis
 
@@ -14,6 +15,139 @@ from conversation_service.config.settings import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Append atómico de un mensaje en un solo round trip.
+# KEYS: messages, conversation_stats, conversation, conversation_index,
+#       session_conversation, active_conversations,
+#       índice de actividad del tenant, índice de actividad del agente,
+#       rollup del tenant, rollup del agente, rollup diario del tenant,
+#       rollup diario del agente, índice de pendientes de migración
+# ARGV: mensaje JSON, TTL, tokens del mensaje, timestamp ISO, conversation_id,
+#       timestamp epoch (score de actividad), TTL de los rollups diarios,
+#       miembro "tenant_id:conversation_id" del índice de pendientes
+# Si la conversación está pendiente de migración no se renueva el TTL de sus
+# claves (1-4): conservan el TTL de migración fijado al cerrarla. Si ya no
+# existe (migrada o caducada) no se escribe nada y se devuelve -1.
+APPEND_MESSAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return -1
+end
+local ttl = tonumber(ARGV[2])
+local tokens = tonumber(ARGV[3])
+local now = tonumber(ARGV[6])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+local count = redis.call('HINCRBY', KEYS[2], 'message_count', 1)
+redis.call('HINCRBY', KEYS[2], 'total_tokens', tokens)
+redis.call('HSET', KEYS[2], 'last_message_at', ARGV[4], 'updated_at', ARGV[4])
+redis.call('SADD', KEYS[6], ARGV[5])
+for i = 7, 8 do
+    redis.call('ZADD', KEYS[i], now, ARGV[5])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', '(' .. (now - ttl))
+end
+local first = 1
+if redis.call('ZSCORE', KEYS[13], ARGV[8]) then
+    first = 5
+end
+for i = first, 8 do
+    redis.call('EXPIRE', KEYS[i], ttl)
+end
+for i = 9, 12 do
+    redis.call('HINCRBY', KEYS[i], 'messages', 1)
+    redis.call('HINCRBY', KEYS[i], 'tokens', tokens)
+end
+for i = 11, 12 do
+    redis.call('EXPIRE', KEYS[i], tonumber(ARGV[7]))
+end
+return count
+"""
+
+# Reclamo atómico de un lote de conversaciones pendientes de migración: las
+# devuelve y las oculta (score futuro) hasta que venza el plazo del reclamo.
+# KEYS: índice de pendientes
+# ARGV: score máximo elegible (cierre + gracia), tamaño del lote, score del reclamo
+CLAIM_MIGRATION_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(members) do
+    redis.call('ZADD', KEYS[1], ARGV[3], member)
+end
+return members
+"""
+
+# Borrado de una conversación ya archivada en PostgreSQL. Si recibió mensajes
+# mientras se migraba (la lista ya no tiene los archivados) no se borra nada y
+# se vuelve a encolar para archivarlos en el siguiente lote.
+# KEYS: conversation, messages, conversation_stats, conversation_index,
+#       active_conversations, índice de actividad del tenant,
+#       índice de actividad del agente, índice de pendientes, intentos de migración
+# ARGV: nº de mensajes archivados, conversation_id, miembro del índice,
+#       score de reencolado
+TRIM_MIGRATED_SCRIPT = """
+if redis.call('LLEN', KEYS[2]) ~= tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[8], ARGV[4], ARGV[3])
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+redis.call('SREM', KEYS[5], ARGV[2])
+redis.call('ZREM', KEYS[6], ARGV[2])
+redis.call('ZREM', KEYS[7], ARGV[2])
+redis.call('ZREM', KEYS[8], ARGV[3])
+redis.call('HDEL', KEYS[9], ARGV[3])
+return 1
+"""
+
+# Desvincula una sesión de su conversación solo si sigue apuntando a ella.
+# KEYS: session_conversation
+# ARGV: conversation_id
+DETACH_SESSION_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Índices y métricas de la migración Redis -> PostgreSQL (miembros "tenant_id:conversation_id")
+MIGRATION_PENDING_KEY = "conversations_pending_migration"
+MIGRATION_FAILED_KEY = "conversations_failed_migration"
+MIGRATION_ATTEMPTS_KEY = "conversation_migration_attempts"
+MIGRATION_METRICS_KEY = "conversation_migration_metrics"
+
+# Inserciones multi-fila: un statement por tabla y lote, con arrays por columna
+INSERT_CONVERSATIONS_SQL = """
+INSERT INTO conversations (
+    id, tenant_id, session_id, agent_id, user_id, status, model_name,
+    message_count, total_tokens, created_at, updated_at, last_message_at, closed_at
+)
+SELECT * FROM unnest(
+    $1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[], $7::text[],
+    $8::int[], $9::int[], $10::timestamp[], $11::timestamp[], $12::timestamp[], $13::timestamp[]
+)
+ON CONFLICT (id) DO UPDATE SET
+    status = EXCLUDED.status,
+    message_count = EXCLUDED.message_count,
+    total_tokens = EXCLUDED.total_tokens,
+    updated_at = EXCLUDED.updated_at,
+    last_message_at = EXCLUDED.last_message_at,
+    closed_at = EXCLUDED.closed_at,
+    migrated_at = now() AT TIME ZONE 'utc'
+"""
+
+INSERT_MESSAGES_SQL = """
+INSERT INTO messages (
+    id, conversation_id, role, content, tokens_estimate, processing_time_ms,
+    agent_id, model_used, created_at, metadata
+)
+SELECT id, conversation_id, role, content, tokens_estimate, processing_time_ms,
+       agent_id, model_used, created_at, metadata::jsonb
+FROM unnest(
+    $1::text[], $2::text[], $3::text[], $4::text[], $5::int[], $6::int[],
+    $7::text[], $8::text[], $9::timestamp[], $10::text[]
+) AS t(id, conversation_id, role, content, tokens_estimate, processing_time_ms,
+       agent_id, model_used, created_at, metadata)
+ON CONFLICT (id) DO NOTHING
+"""
+
+# Holgura al paginar para saltar las conversaciones empatadas en el score del cursor
+_CURSOR_TIE_SLACK = 16
+
 class PersistenceManager:
     """
     Gestor unificado de persistencia Redis + PostgreSQL.
@@ -21,64 +155,239 @@ class PersistenceManager:
     
     def __init__(self, redis_client: redis.Redis, db_client=None):
         self.redis = redis_client
-        self.db = db_client  # Para cuando esté implementado Supabase
+        self.db = db_client  # Pool asyncpg; sin él no se migra a PostgreSQL
+        self._append_message = self.redis.register_script(APPEND_MESSAGE_SCRIPT)
+        self._claim_migration = self.redis.register_script(CLAIM_MIGRATION_SCRIPT)
+        self._trim_migrated = self.redis.register_script(TRIM_MIGRATED_SCRIPT)
+        self._detach_session = self.redis.register_script(DETACH_SESSION_SCRIPT)
         
     # === REDIS OPERATIONS ===
     
-    async def save_conversation_to_redis(self, conversation: Conversation):
-        """Guarda conversación en Redis."""
-        key = f"conversation:{conversation.tenant_id}:{conversation.id}"
-        
-        await self.redis.setex(
-            key,
-            settings.conversation_active_ttl,
-            conversation.json()
+    @staticmethod
+    def _conversation_key(tenant_id: str, conversation_id: str) -> str:
+        return f"conversation:{tenant_id}:{conversation_id}"
+    
+    @staticmethod
+    def _index_key(conversation_id: str) -> str:
+        """Índice conversation_id -> tenant_id, con el mismo TTL que la conversación."""
+        return f"conversation_index:{conversation_id}"
+    
+    @staticmethod
+    def _activity_keys(tenant_id: str, agent_id: str) -> Tuple[str, str]:
+        """Índices (sorted sets) de conversaciones por última actividad: del tenant y del agente."""
+        return (
+            f"conversations_by_activity:{tenant_id}",
+            f"conversations_by_activity:{tenant_id}:{agent_id}"
         )
-        
-        # Mapeo session -> conversation
-        session_key = f"session_conversation:{conversation.tenant_id}:{conversation.session_id}"
-        await self.redis.setex(
-            session_key,
-            settings.conversation_active_ttl,
-            conversation.id
+    
+    @staticmethod
+    def _rollup_keys(tenant_id: str, agent_id: str, day: Optional[str] = None) -> Tuple[str, str]:
+        """Rollups de estadísticas (hashes de contadores) del tenant y del agente; diarios si se da `day` (YYYYMMDD)."""
+        suffix = f":day:{day}" if day else ""
+        return (
+            f"conversation_rollup:{tenant_id}{suffix}",
+            f"conversation_rollup:{tenant_id}:agent:{agent_id}{suffix}"
         )
-        
-        # Lista de conversaciones activas por tenant
-        active_key = f"active_conversations:{conversation.tenant_id}"
-        await self.redis.sadd(active_key, conversation.id)
-        await self.redis.expire(active_key, settings.conversation_active_ttl)
     
-    async def save_message_to_redis(self, message: Message):
-        """Guarda mensaje en Redis."""
-        messages_key = f"messages:{message.conversation_id}"
+    @staticmethod
+    def _rollup_agents_key(tenant_id: str) -> str:
+        return f"conversation_rollup:{tenant_id}:agents"
+    
+    @staticmethod
+    def _stats_key(conversation_id: str) -> str:
+        """Métricas en tiempo real de la conversación (campos de hash actualizados por el append)."""
+        return f"conversation_stats:{conversation_id}"
+    
+    async def save_conversation_to_redis(self, conversation: Conversation, created: bool = False):
+        """Guarda conversación en Redis (un solo round trip). Con `created` la cuenta en los rollups."""
+        ttl = settings.conversation_active_ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if created:
+                day = datetime.utcnow().strftime("%Y%m%d")
+                for rollup_key in (
+                    *self._rollup_keys(conversation.tenant_id, conversation.agent_id),
+                    *self._rollup_keys(conversation.tenant_id, conversation.agent_id, day)
+                ):
+                    pipe.hincrby(rollup_key, "conversations", 1)
+                for rollup_key in self._rollup_keys(conversation.tenant_id, conversation.agent_id, day):
+                    pipe.expire(rollup_key, settings.stats_bucket_retention_days * 86400)
+                pipe.sadd(self._rollup_agents_key(conversation.tenant_id), conversation.agent_id)
+            
+
+            pipe.setex(
+                self._conversation_key(conversation.tenant_id, conversation.id),
+                ttl,
+                conversation.json()
+            )
+            
+            # Índice id -> tenant y métricas: caducan junto con la conversación
+            pipe.setex(self._index_key(conversation.id), ttl, conversation.tenant_id)
+            pipe.expire(self._stats_key(conversation.id), ttl)
+            
+            # Mapeo session -> conversation
+            session_key = f"session_conversation:{conversation.tenant_id}:{conversation.session_id}"
+            pipe.setex(session_key, ttl, conversation.id)
+            
+            # Lista de conversaciones activas por tenant
+            active_key = f"active_conversations:{conversation.tenant_id}"
+            pipe.sadd(active_key, conversation.id)
+            pipe.expire(active_key, ttl)
+            
+            # Índices por última actividad; se descartan las conversaciones ya caducadas
+            now = time.time()
+            for activity_key in self._activity_keys(conversation.tenant_id, conversation.agent_id):
+                pipe.zadd(activity_key, {conversation.id: now})
+                pipe.zremrangebyscore(activity_key, "-inf", f"({now - ttl}")
+                pipe.expire(activity_key, ttl)
+            await pipe.execute()
+    
+    async def save_message_to_redis(self, message: Message, conversation: Conversation) -> int:
+        """
+        Guarda mensaje en Redis con un script atómico: añade el mensaje, actualiza
+        las métricas de la conversación como campos de hash y renueva TTLs e
+        índices en un solo round trip, sin reescribir el JSON de la conversación.
+        Devuelve el número de mensajes de la conversación, o -1 si la conversación
+        ya no está en Redis (migrada o caducada) y el mensaje no se guardó.
+        """
+        now = datetime.utcnow()
+        return await self._append_message(
+            keys=[
+                f"messages:{message.conversation_id}",
+                self._stats_key(message.conversation_id),
+                self._conversation_key(conversation.tenant_id, conversation.id),
+                self._index_key(conversation.id),
+                f"session_conversation:{conversation.tenant_id}:{conversation.session_id}",
+                f"active_conversations:{conversation.tenant_id}",
+                *self._activity_keys(conversation.tenant_id, conversation.agent_id),
+                *self._rollup_keys(conversation.tenant_id, conversation.agent_id),
+                *self._rollup_keys(conversation.tenant_id, conversation.agent_id, now.strftime("%Y%m%d")),
+                MIGRATION_PENDING_KEY
+            ],
+            args=[
+                message.json(),
+                settings.conversation_active_ttl,
+                message.tokens_estimate or 0,
+                now.isoformat(),
+                conversation.id,
+                time.time(),
+                settings.stats_bucket_retention_days * 86400,
+                f"{conversation.tenant_id}:{conversation.id}"
+            ]
+        )
+    
+    async def list_conversations_by_activity(
+        self,
+        tenant_id: str,
+        agent_id: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str], int]:
+        """
+        Página de conversaciones del tenant (o de un agente) por última actividad,
+        más reciente primero. Un ZREVRANGEBYSCORE desde el cursor y un pipeline
+        con las conversaciones de la página: el coste depende del tamaño de
+        página, no del número de conversaciones del tenant.
         
-        # Agregar mensaje a lista
-        await self.redis.lpush(messages_key, message.json())
+        Returns:
+            (conversaciones, cursor de la página siguiente o None, total indexado)
+        """
+        tenant_key, agent_key = self._activity_keys(tenant_id, agent_id or "")
+        index_key = agent_key if agent_id else tenant_key
         
-        # Mantener TTL
-        await self.redis.expire(messages_key, settings.conversation_active_ttl)
+        max_score, last_id = "+inf", None
+        if cursor:
+            score, _, last_id = cursor.partition(":")
+            max_score = score
         
-        # Actualizar contador de mensajes en conversación
-        conversation = await self.get_conversation_from_redis(message.conversation_id)
-        if conversation:
-            conversation.message_count += 1
-            conversation.last_message_at = datetime.utcnow()
-            conversation.updated_at = datetime.utcnow()
-            if message.tokens_estimate:
-                conversation.total_tokens += message.tokens_estimate
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrangebyscore(
+                index_key, max_score, "-inf",
+                start=0, num=limit + 1 + (_CURSOR_TIE_SLACK if cursor else 0),
+                withscores=True
+            )
+            pipe.zcard(index_key)
+            entries, total = await pipe.execute()
+        
+        page = []
+        for member, score in entries:
+            conversation_id = member.decode() if isinstance(member, bytes) else member
+            # Empates con el score del cursor ya devueltos (orden descendente por miembro)
+            if last_id is not None and repr(score) == max_score and conversation_id >= last_id:
+                continue
+            page.append((conversation_id, score))
+        has_more = len(page) > limit
+        page = page[:limit]
+        
+        conversations = []
+        if page:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for conversation_id, _ in page:
+                    pipe.get(self._conversation_key(tenant_id, conversation_id))
+                    pipe.hgetall(self._stats_key(conversation_id))
+                results = await pipe.execute()
             
-            await self.save_conversation_to_redis(conversation)
+            expired = []
+            for (conversation_id, _), data, stats in zip(page, results[::2], results[1::2]):
+                if not data:
+                    expired.append(conversation_id)
+                    continue
+                try:
+                    conversation = Conversation.parse_raw(data)
+                    self._apply_stats(conversation, stats)
+                    conversations.append(conversation)
+                except Exception as e:
+                    logger.error(f"Error parseando conversación {conversation_id}: {str(e)}")
+            if expired:
+                # La conversación caducó antes de que el índice la descartara
+                await self.redis.zrem(index_key, *expired)
+        
+        next_cursor = None
+        if has_more and page:
+            conversation_id, score = page[-1]
+            next_cursor = f"{score!r}:{conversation_id}"
+        return conversations, next_cursor, total
     
-    async def get_conversation_from_redis(self, conversation_id: str) -> Optional[Conversation]:
-        """Obtiene conversación desde Redis."""
-        # Buscar en todas las claves posibles (no tenemos tenant_id aquí)
-        pattern = f"conversation:*:{conversation_id}"
-        keys = await self.redis.keys(pattern)
+    @staticmethod
+    def _apply_stats(conversation: Conversation, stats: Dict) -> None:
+        if not stats:
+            return
+        stats = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in stats.items()
+        }
+        if "message_count" in stats:
+            conversation.message_count = int(stats["message_count"])
+        if "total_tokens" in stats:
+            conversation.total_tokens = int(stats["total_tokens"])
+        if "last_message_at" in stats:
+            conversation.last_message_at = datetime.fromisoformat(stats["last_message_at"])
+        if "updated_at" in stats:
+            conversation.updated_at = max(conversation.updated_at, datetime.fromisoformat(stats["updated_at"]))
+    
+    async def get_conversation_from_redis(
+        self,
+        conversation_id: str,
+        tenant_id: Optional[str] = None
+    ) -> Optional[Conversation]:
+        """
+        Obtiene conversación desde Redis por clave directa. Sin tenant_id, el
+        tenant se resuelve con el índice de conversaciones (GET, sin KEYS).
+        """
+        if not tenant_id:
+            tenant_id = await self.redis.get(self._index_key(conversation_id))
+            if not tenant_id:
+                return None
+            if isinstance(tenant_id, bytes):
+                tenant_id = tenant_id.decode()
         
-        if keys:
-            data = await self.redis.get(keys[0])
-            if data:
-                return Conversation.parse_raw(data)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self._conversation_key(tenant_id, conversation_id))
+            pipe.hgetall(self._stats_key(conversation_id))
+            data, stats = await pipe.execute()
+        if data:
+            conversation = Conversation.parse_raw(data)
+            self._apply_stats(conversation, stats)
+            return conversation
         
         return None
     
@@ -92,7 +401,9 @@ class PersistenceManager:
         conversation_id = await self.redis.get(session_key)
         
         if conversation_id:
-            return await self.get_conversation_from_redis(conversation_id)
+            if isinstance(conversation_id, bytes):
+                conversation_id = conversation_id.decode()
+            return await self.get_conversation_from_redis(conversation_id, tenant_id)
         
         return None
     
@@ -118,124 +429,366 @@ class PersistenceManager:
         
         return messages
     
-    async def mark_conversation_for_migration(self, conversation_id: str):
-        """Marca conversación para migración a PostgreSQL."""
-        conversation = await self.get_conversation_from_redis(conversation_id)
+    async def mark_conversation_for_migration(self, conversation_id: str, tenant_id: Optional[str] = None):
+        """
+        Marca conversación para migración a PostgreSQL: la indexa por momento de
+        cierre y extiende el TTL de sus claves para que no caduquen antes de
+        migrarse.
+        """
+        conversation = await self.get_conversation_from_redis(conversation_id, tenant_id)
         if conversation:
             conversation.needs_migration = True
             conversation.websocket_closed_at = datetime.utcnow()
             conversation.status = ConversationStatus.COMPLETED
             await self.save_conversation_to_redis(conversation)
+            
+            pending_ttl = settings.migration_pending_ttl_seconds
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in (
+                    self._conversation_key(conversation.tenant_id, conversation.id),
+                    f"messages:{conversation.id}",
+                    self._stats_key(conversation.id),
+                    self._index_key(conversation.id)
+                ):
+                    pipe.expire(key, pending_ttl)
+                pipe.zadd(MIGRATION_PENDING_KEY, {f"{conversation.tenant_id}:{conversation.id}": time.time()})
+                await pipe.execute()
     
-    async def get_conversations_needing_migration(self) -> List[str]:
-        """Obtiene conversaciones que necesitan migración."""
-        # Buscar conversaciones marcadas para migración
-        pattern = "conversation:*:*"
-        keys = await self.redis.keys(pattern)
-        
-        migration_candidates = []
-        grace_period = timedelta(seconds=settings.websocket_grace_period)
+    @staticmethod
+    def _split_member(member) -> Tuple[str, str]:
+        """Miembro del índice de migración -> (tenant_id, conversation_id)."""
+        if isinstance(member, bytes):
+            member = member.decode()
+        tenant_id, _, conversation_id = member.rpartition(":")
+        return tenant_id, conversation_id
+    
+    # === POSTGRESQL OPERATIONS ===
+    
+    async def migrate_pending_batch(self, limit: int) -> Dict[str, Any]:
+        """
+        Reclama hasta `limit` conversaciones cerradas fuera del periodo de gracia,
+        las escribe en PostgreSQL y elimina sus claves de Redis.
         
-        for key in keys:
-            data = await self.redis.get(key)
-            if data:
-                try:
-                    conversation = Conversation.parse_raw(data)
-                    
-                    # Verificar si necesita migración
-                    if (conversation.needs_migration and 
-                        conversation.websocket_closed_at and
-                        datetime.utcnow() - conversation.websocket_closed_at > grace_period):
-                        migration_candidates.append(conversation.id)
-                        
-                except Exception as e:
-                    logger.error(f"Error parseando conversación para migración: {str(e)}")
+        Las conversaciones de un lote fallido quedan ocultas hasta que vence el
+        reclamo y se reintentan; tras `migration_max_attempts` pasan al índice
+        de fallidas.
+        """
+        if not self.db:
+            logger.warning("PostgreSQL no configurado, migración omitida")
+            return self._migration_result([])
         
-        return migration_candidates
-    
-    # === POSTGRESQL OPERATIONS (preparado) ===
+        now = time.time()
+        members = await self._claim_migration(
+            keys=[MIGRATION_PENDING_KEY],
+            args=[
+                now - settings.websocket_grace_period,
+                limit,
+                now + settings.migration_claim_timeout_seconds
+            ]
+        )
+        return await self._migrate_members([
+            member.decode() if isinstance(member, bytes) else member for member in members
+        ])
     
     async def migrate_conversation_to_postgresql(self, conversation_id: str) -> bool:
-        """Migra conversación completa a PostgreSQL."""
+        """Migra una conversación concreta a PostgreSQL, esté o no pendiente en el índice."""
         if not self.db:
             logger.warning("PostgreSQL no configurado, migración omitida")
             return False
         
+        tenant_id = await self.redis.get(self._index_key(conversation_id))
+        if not tenant_id:
+            return False
+        if isinstance(tenant_id, bytes):
+            tenant_id = tenant_id.decode()
+        
+        result = await self._migrate_members([f"{tenant_id}:{conversation_id}"])
+        return conversation_id in result["migrated_ids"]
+    
+    async def _migrate_members(self, members: List[str]) -> Dict[str, Any]:
+        if not members:
+            return self._migration_result(members)
+        
+        started = time.perf_counter()
+        loaded, expired = await self._load_for_migration(members)
+        # Sin sesión que apunte a ellas, una reconexión abre conversación nueva
+        # en lugar de seguir escribiendo en la que se está archivando
+        await self._detach_sessions(loaded)
+        archived, failed = await self._write_archive(loaded)
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member, conversation, messages, _ in archived:
+                await self._trim_conversation(pipe, member, conversation, len(messages))
+            for member in expired:
+                # Caducó en Redis antes de migrarse: solo queda limpiar los restos
+                _, conversation_id = self._split_member(member)
+                pipe.delete(f"messages:{conversation_id}", self._stats_key(conversation_id), self._index_key(conversation_id))
+                pipe.zrem(MIGRATION_PENDING_KEY, member)
+                pipe.hdel(MIGRATION_ATTEMPTS_KEY, member)
+            for member, *_ in failed:
+                pipe.hincrby(MIGRATION_ATTEMPTS_KEY, member, 1)
+            results = await pipe.execute()
+        
+        trimmed = results[:len(archived)]
+        migrated = [item for item, done in zip(archived, trimmed) if done]
+        requeued = len(archived) - len(migrated)
+        attempts = results[len(results) - len(failed):] if failed else []
+        migrated_messages = sum(len(messages) for _, _, messages, _ in migrated)
+        
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(MIGRATION_METRICS_KEY, "migrated", len(migrated))
+            pipe.hincrby(MIGRATION_METRICS_KEY, "messages", migrated_messages)
+            pipe.hincrby(MIGRATION_METRICS_KEY, "expired", len(expired))
+            pipe.hincrby(MIGRATION_METRICS_KEY, "requeued", requeued)
+            pipe.hincrby(MIGRATION_METRICS_KEY, "batches", 1)
+            pipe.hset(MIGRATION_METRICS_KEY, mapping={
+                "last_batch_ms": elapsed_ms,
+                "last_batch_size": len(members),
+                "last_batch_at": datetime.utcnow().isoformat()
+            })
+            await pipe.execute()
+        
+        if failed:
+            await self._record_migration_failures(
+                [member for (member, *_), count in zip(failed, attempts) if count >= settings.migration_max_attempts]
+            )
+        
+        result = self._migration_result(members)
+        result.update({
+            "migrated": len(migrated),
+            "messages": migrated_messages,
+            "failed": len(failed),
+            "expired": len(expired),
+            "requeued": requeued,
+            "migrated_ids": [conversation.id for _, conversation, _, _ in migrated]
+        })
+        logger.info(
+            f"Lote de migración: {len(migrated)} conversaciones ({migrated_messages} mensajes) migradas, "
+            f"{len(failed)} fallidas, {len(expired)} caducadas, {requeued} reencoladas en {elapsed_ms}ms"
+        )
+        return result
+    
+    @staticmethod
+    def _migration_result(members: List[str]) -> Dict[str, Any]:
+        return {
+            "claimed": len(members), "migrated": 0, "messages": 0, "failed": 0,
+            "expired": 0, "requeued": 0, "migrated_ids": []
+        }
+    
+    async def _load_for_migration(
+        self,
+        members: List[str]
+    ) -> Tuple[List[Tuple[str, Conversation, List[Message], Optional[str]]], List[str]]:
+        """
+        Lee conversación, métricas, mensajes y sesión de cada miembro en un solo
+        pipeline. Devuelve (cargadas, caducadas).
+        """
+        parsed = [(member, *self._split_member(member)) for member in members]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for _, tenant_id, conversation_id in parsed:
+                pipe.get(self._conversation_key(tenant_id, conversation_id))
+                pipe.hgetall(self._stats_key(conversation_id))
+                pipe.lrange(f"messages:{conversation_id}", 0, -1)
+            results = await pipe.execute()
+        
+        loaded, expired = [], []
+        for i, (member, tenant_id, conversation_id) in enumerate(parsed):
+            data, stats, raw_messages = results[i * 3:i * 3 + 3]
+            if not data:
+                expired.append(member)
+                continue
+            try:
+                conversation = Conversation.parse_raw(data)
+                self._apply_stats(conversation, stats)
+                # Los mensajes están en orden LIFO
+                messages = [Message.parse_raw(raw) for raw in reversed(raw_messages)]
+            except Exception as e:
+                logger.error(f"Error parseando conversación {conversation_id} para migración: {str(e)}")
+                await self._record_migration_failures([member])
+                continue
+            loaded.append((member, conversation, messages, conversation.session_id))
+        return loaded, expired
+    
+    async def _write_archive(self, loaded: List[Tuple]) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Escribe el lote en una transacción; si falla, reintenta conversación a
+        conversación para que un registro defectuoso no bloquee al resto.
+        Devuelve (migradas, fallidas).
+        """
+        if not loaded:
+            return [], []
         try:
-            # Obtener conversación y mensajes de Redis
-            conversation = await self.get_conversation_from_redis(conversation_id)
-            if not conversation:
-                return False
-            
-            messages = await self.get_messages_from_redis(conversation_id)
-            
-            # TODO: Implementar cuando esté disponible Supabase
-            # await self.db.conversations.insert(conversation.dict())
-            # for message in messages:
-            #     await self.db.messages.insert(message.dict())
-            
-            # Marcar como migrada
-            conversation.migrated_to_db = True
-            conversation.status = ConversationStatus.TRANSFERRED
-            await self.save_conversation_to_redis(conversation)
-            
-            # Programar limpieza de Redis (después de un tiempo)
-            await self._schedule_redis_cleanup(conversation_id)
-            
-            logger.info(f"Conversación migrada a PostgreSQL: {conversation_id}")
-            return True
-            
+            async with self.db.acquire() as conn:
+                await self._insert_archive(conn, loaded)
+            return loaded, []
         except Exception as e:
-            logger.error(f"Error migrando conversación {conversation_id}: {str(e)}")
-            return False
+            if len(loaded) == 1:
+                logger.error(f"Error migrando conversación {loaded[0][1].id}: {str(e)}")
+                return [], loaded
+            logger.warning(f"Error migrando lote de {len(loaded)} conversaciones, reintentando una a una: {str(e)}")
+        
+        migrated, failed = [], []
+        async with self.db.acquire() as conn:
+            for item in loaded:
+                try:
+                    await self._insert_archive(conn, [item])
+                    migrated.append(item)
+                except Exception as e:
+                    logger.error(f"Error migrando conversación {item[1].id}: {str(e)}")
+                    failed.append(item)
+        return migrated, failed
+    
+    @staticmethod
+    async def _insert_archive(conn, loaded: List[Tuple]) -> None:
+        conversations = [conversation for _, conversation, _, _ in loaded]
+        messages = [message for _, _, conversation_messages, _ in loaded for message in conversation_messages]
+        
+        async with conn.transaction():
+            await conn.execute(
+                INSERT_CONVERSATIONS_SQL,
+                [c.id for c in conversations],
+                [c.tenant_id for c in conversations],
+                [c.session_id for c in conversations],
+                [c.agent_id for c in conversations],
+                [c.user_id for c in conversations],
+                [ConversationStatus.TRANSFERRED.value for _ in conversations],
+                [c.model_name for c in conversations],
+                [c.message_count for c in conversations],
+                [c.total_tokens for c in conversations],
+                [c.created_at for c in conversations],
+                [c.updated_at for c in conversations],
+                [c.last_message_at for c in conversations],
+                [c.websocket_closed_at for c in conversations]
+            )
+            if messages:
+                await conn.execute(
+                    INSERT_MESSAGES_SQL,
+                    [m.id for m in messages],
+                    [m.conversation_id for m in messages],
+                    [m.role.value for m in messages],
+                    [m.content for m in messages],
+                    [m.tokens_estimate for m in messages],
+                    [m.processing_time_ms for m in messages],
+                    [m.agent_id for m in messages],
+                    [m.model_used for m in messages],
+                    [m.created_at for m in messages],
+                    [json.dumps(m.metadata, default=str) for m in messages]
+                )
     
-    async def _schedule_redis_cleanup(self, conversation_id: str):
-        """Programa limpieza de Redis después de migración exitosa."""
-        # Dar tiempo para que otros servicios terminen de usar la conversación
-        cleanup_delay = 300  # 5 minutos
+    async def _detach_sessions(self, loaded: List[Tuple]) -> None:
+        """Desvincula de su sesión las conversaciones reclamadas (si la sesión no apunta ya a otra)."""
+        sessions = [(conversation, session_id) for _, conversation, _, session_id in loaded if session_id]
+        if not sessions:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for conversation, session_id in sessions:
+                await self._detach_session(
+                    keys=[f"session_conversation:{conversation.tenant_id}:{session_id}"],
+                    args=[conversation.id],
+                    client=pipe
+                )
+            await pipe.execute()
+    
+    async def _trim_conversation(self, pipe, member: str, conversation: Conversation, archived_messages: int) -> None:
+        """
+        Encola el borrado en Redis de una conversación ya persistida en PostgreSQL
+        (los rollups se conservan). El script devuelve 0 y la reencola si llegaron
+        mensajes durante la migración.
+        """
+        await self._trim_migrated(
+            keys=[
+                self._conversation_key(conversation.tenant_id, conversation.id),
+                f"messages:{conversation.id}",
+                self._stats_key(conversation.id),
+                self._index_key(conversation.id),
+                f"active_conversations:{conversation.tenant_id}",
+                *self._activity_keys(conversation.tenant_id, conversation.agent_id),
+                MIGRATION_PENDING_KEY,
+                MIGRATION_ATTEMPTS_KEY
+            ],
+            args=[archived_messages, conversation.id, member, time.time()],
+            client=pipe
+        )
+    
+    async def _record_migration_failures(self, members: List[str]) -> None:
+        """Mueve conversaciones que agotaron sus intentos al índice de fallidas."""
+        if not members:
+            return
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(MIGRATION_PENDING_KEY, *members)
+            pipe.zadd(MIGRATION_FAILED_KEY, {member: now for member in members})
+            pipe.hdel(MIGRATION_ATTEMPTS_KEY, *members)
+            pipe.hincrby(MIGRATION_METRICS_KEY, "failed", len(members))
+            await pipe.execute()
+        logger.error(f"{len(members)} conversaciones movidas a {MIGRATION_FAILED_KEY} tras agotar sus intentos")
+    
+    async def get_migration_metrics(self) -> Dict[str, Any]:
+        """Progreso de la migración: contadores acumulados, pendientes, fallidas y antigüedad del pendiente más viejo."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(MIGRATION_METRICS_KEY)
+            pipe.zcard(MIGRATION_PENDING_KEY)
+            pipe.zcard(MIGRATION_FAILED_KEY)
+            pipe.zrange(MIGRATION_PENDING_KEY, 0, 0, withscores=True)
+            counters, pending, failed, oldest = await pipe.execute()
         
-        # TODO: Implementar con job scheduler o worker específico
-        # Por ahora, simplemente logear
-        logger.info(f"Programada limpieza Redis para {conversation_id} en {cleanup_delay}s")
+        counters = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in (counters or {}).items()
+        }
+        return {
+            "pending": pending,
+            "failed": failed,
+            "completed": int(counters.get("migrated", 0)),
+            "messages_migrated": int(counters.get("messages", 0)),
+            "expired": int(counters.get("expired", 0)),
+            "requeued": int(counters.get("requeued", 0)),
+            "batches": int(counters.get("batches", 0)),
+            "last_batch_size": int(counters.get("last_batch_size", 0)),
+            "last_batch_ms": int(counters.get("last_batch_ms", 0)),
+            "last_batch_at": counters.get("last_batch_at"),
+            # Un pendiente reclamado tiene score futuro: no cuenta como retraso
+            "oldest_pending_age_seconds": max(0.0, time.time() - oldest[0][1]) if oldest else 0.0
+        }
     
     # === STATISTICS OPERATIONS ===
     
     async def get_basic_stats(self, tenant_id: str) -> Dict[str, Any]:
-        """Obtiene estadísticas básicas del tenant."""
+        """
+        Obtiene estadísticas básicas del tenant desde los rollups mantenidos al
+        escribir (dos round trips, sin recorrer conversaciones).
+        """
         try:
-            # Conversaciones activas
-            active_key = f"active_conversations:{tenant_id}"
-            active_count = await self.redis.scard(active_key)
+            tenant_key, _ = self._rollup_keys(tenant_id, "")
+            tenant_activity_key, _ = self._activity_keys(tenant_id, "")
+            now = time.time()
             
-            # Buscar todas las conversaciones del tenant en Redis
-            pattern = f"conversation:{tenant_id}:*"
-            conversation_keys = await self.redis.keys(pattern)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(tenant_key)
+                # Conversaciones activas: actividad dentro del TTL
+                pipe.zcount(tenant_activity_key, now - settings.conversation_active_ttl, "+inf")
+                pipe.smembers(self._rollup_agents_key(tenant_id))
+                totals, active_count, agent_ids = await pipe.execute()
+            totals = self._decode_counters(totals)
             
-            total_conversations = len(conversation_keys)
-            total_messages = 0
+            agent_ids = sorted(a.decode() if isinstance(a, bytes) else a for a in agent_ids)
             agents_usage = {}
+            if agent_ids:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for agent_id in agent_ids:
+                        pipe.hget(self._rollup_keys(tenant_id, agent_id)[1], "conversations")
+                    counts = await pipe.execute()
+                agents_usage = {agent_id: int(count or 0) for agent_id, count in zip(agent_ids, counts)}
             
-            for key in conversation_keys:
-                data = await self.redis.get(key)
-                if data:
-                    try:
-                        conv = Conversation.parse_raw(data)
-                        total_messages += conv.message_count
-                        
-                        # Conteo por agente
-                        agent_id = conv.agent_id
-                        if agent_id not in agents_usage:
-                            agents_usage[agent_id] = 0
-                        agents_usage[agent_id] += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error parseando conversación para stats: {str(e)}")
-            
+            total_conversations = totals.get("conversations", 0)
+            total_messages = totals.get("messages", 0)
             return {
                 "tenant_id": tenant_id,
                 "active_conversations": active_count,
                 "total_conversations": total_conversations,
                 "total_messages": total_messages,
+                "total_tokens": totals.get("tokens", 0),
                 "avg_messages_per_conversation": total_messages / max(total_conversations, 1),
                 "agents_usage": agents_usage,
                 "last_updated": datetime.utcnow().isoformat()
@@ -248,4 +801,56 @@ class PersistenceManager:
                 "error": str(e),
                 "last_updated": datetime.utcnow().isoformat()
             }
-
+    
+    async def get_period_stats(
+        self,
+        tenant_id: str,
+        days: int,
+        agent_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Estadísticas de los últimos `days` días (hoy incluido) del tenant o de un
+        agente, sumando los rollups diarios en un solo pipeline.
+        """
+        today = datetime.utcnow().date()
+        day_keys = [(today - timedelta(days=offset)).strftime("%Y%m%d") for offset in range(days)]
+        tenant_activity_key, agent_activity_key = self._activity_keys(tenant_id, agent_id or "")
+        now = time.time()
+        
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for day in day_keys:
+                tenant_key, agent_key = self._rollup_keys(tenant_id, agent_id or "", day)
+                pipe.hgetall(agent_key if agent_id else tenant_key)
+            pipe.zcount(
+                agent_activity_key if agent_id else tenant_activity_key,
+                now - settings.conversation_active_ttl, "+inf"
+            )
+            *buckets, active_count = await pipe.execute()
+        
+        daily = []
+        totals = {"conversations": 0, "messages": 0, "tokens": 0}
+        for day, bucket in zip(day_keys, buckets):
+            counters = self._decode_counters(bucket)
+            for field in totals:
+                totals[field] += counters.get(field, 0)
+            daily.append({
+                "date": f"{day[:4]}-{day[4:6]}-{day[6:]}",
+                **{field: counters.get(field, 0) for field in totals}
+            })
+        daily.reverse()  # Orden cronológico
+        
+        return {
+            "total_conversations": totals["conversations"],
+            "active_conversations": active_count,
+            "total_messages": totals["messages"],
+            "total_tokens": totals["tokens"],
+            "avg_messages_per_conversation": totals["messages"] / max(totals["conversations"], 1),
+            "daily": daily
+        }
+    
+    @staticmethod
+    def _decode_counters(counters: Dict) -> Dict[str, int]:
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in (counters or {}).items()
+        }
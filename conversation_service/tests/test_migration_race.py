@@ -0,0 +1,100 @@
+"""
+Migración Redis -> PostgreSQL con appends concurrentes.
+
+Los scripts Lua necesitan un Redis real: se usa TEST_REDIS_URL (por defecto
+redis://localhost:6379/15, base que el test vacía) y se omite si no responde.
+"""
+
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+import redis.asyncio as redis
+
+from conversation_service.models.conversation_model import Conversation, Message, MessageRole
+from conversation_service.services.persistence_manager import PersistenceManager, MIGRATION_PENDING_KEY
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+class _FakePool:
+    """Pool asyncpg mínimo: registra los mensajes archivados y ejecuta `on_write` en mitad de la escritura."""
+    
+    def __init__(self):
+        self.on_write = None
+        self.archived_message_ids = []
+    
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+    
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+    
+    async def execute(self, sql, *columns):
+        if "INSERT INTO messages" in sql:
+            self.archived_message_ids.extend(columns[0])
+            if self.on_write:
+                on_write, self.on_write = self.on_write, None
+                await on_write()
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = redis.from_url(TEST_REDIS_URL)
+    try:
+        await client.ping()
+    except (redis.ConnectionError, OSError):
+        await client.close()
+        pytest.skip(f"Redis no disponible en {TEST_REDIS_URL}")
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.close()
+
+
+def _message(conversation: Conversation, content: str) -> Message:
+    return Message(conversation_id=conversation.id, role=MessageRole.USER, content=content, tokens_estimate=1)
+
+
+async def _closed_conversation(manager: PersistenceManager) -> Conversation:
+    conversation = Conversation(tenant_id="tenant", session_id="session", agent_id="agent")
+    await manager.save_conversation_to_redis(conversation, created=True)
+    await manager.save_message_to_redis(_message(conversation, "hola"), conversation)
+    await manager.mark_conversation_for_migration(conversation.id, conversation.tenant_id)
+    return conversation
+
+
+@pytest.mark.asyncio
+async def test_append_during_migration_is_requeued_not_lost(redis_client):
+    pool = _FakePool()
+    manager = PersistenceManager(redis_client, pool)
+    conversation = await _closed_conversation(manager)
+    member = f"{conversation.tenant_id}:{conversation.id}"
+    late = _message(conversation, "mensaje tardío")
+    
+    async def append_late_message():
+        assert await manager.save_message_to_redis(late, conversation) == 2
+    pool.on_write = append_late_message
+    
+    assert not await manager.migrate_conversation_to_postgresql(conversation.id)
+    assert await redis_client.llen(f"messages:{conversation.id}") == 2
+    assert await redis_client.zscore(MIGRATION_PENDING_KEY, member) is not None
+    assert not await redis_client.exists(f"session_conversation:{conversation.tenant_id}:{conversation.session_id}")
+    
+    assert await manager.migrate_conversation_to_postgresql(conversation.id)
+    assert late.id in pool.archived_message_ids
+    assert not await redis_client.exists(f"messages:{conversation.id}")
+    assert await redis_client.zscore(MIGRATION_PENDING_KEY, member) is None
+
+
+@pytest.mark.asyncio
+async def test_append_after_migration_writes_nothing(redis_client):
+    manager = PersistenceManager(redis_client, _FakePool())
+    conversation = await _closed_conversation(manager)
+    
+    assert await manager.migrate_conversation_to_postgresql(conversation.id)
+    assert await manager.save_message_to_redis(_message(conversation, "tarde"), conversation) == -1
+    assert not await redis_client.exists(f"messages:{conversation.id}", f"conversation_stats:{conversation.id}")
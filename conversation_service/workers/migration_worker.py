@@ -9,10 +9,10 @@ VERSIÓN: 4.0 - Adaptado al patrón BaseWorker con handle_action
 
 import asyncio
 import logging
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional
 
 import time
+import asyncpg
 import redis.asyncio as redis_async
 
 from common.config import CommonAppSettings
@@ -54,11 +54,12 @@ class MigrationWorker(BaseWorker):
             app_settings: Configuración de la aplicación.
             async_redis_conn: Conexión Redis asíncrona.
             consumer_id_suffix: Sufijo para el ID del consumidor.
-            db_client: Cliente de base de datos opcional.
+            db_client: Pool asyncpg opcional; si no se da, se crea uno con postgres_url.
         """
         super().__init__(app_settings, async_redis_conn, consumer_id_suffix)
         
         self.db_client = db_client
+        self._owns_db_pool = False
         self.persistence: Optional[PersistenceManager] = None
         self.memory_manager: Optional[MemoryManager] = None
         self.logger = logging.getLogger(f"{__name__}.{self.consumer_name}")
@@ -70,6 +71,17 @@ class MigrationWorker(BaseWorker):
         
         await super().initialize()
         
+        if self.db_client is None:
+            try:
+                self.db_client = await asyncpg.create_pool(
+                    self.app_settings.postgres_url,
+                    min_size=settings.migration_db_pool_min_size,
+                    max_size=settings.migration_db_pool_max_size
+                )
+                self._owns_db_pool = True
+            except Exception as e:
+                self.logger.error(f"No se pudo crear el pool de PostgreSQL, migración deshabilitada: {str(e)}")
+        
         self.persistence = PersistenceManager(self.async_redis_conn, self.db_client)
         self.memory_manager = MemoryManager()
         
@@ -99,6 +111,8 @@ class MigrationWorker(BaseWorker):
                     await migration_task
                 except asyncio.CancelledError:
                     pass # Esperado al cancelar
+            if self._owns_db_pool:
+                await self.db_client.close()
     
     async def _handle_action(self, action: DomainAction, context: Optional[ExecutionContext] = None) -> Dict[str, Any]:
         """
@@ -182,41 +196,40 @@ class MigrationWorker(BaseWorker):
             }
     
     async def _migration_loop(self):
-        """Bucle principal de migración."""
+        """
+        Bucle principal de migración: encadena lotes mientras haya atraso y
+        espera el intervalo configurado cuando el índice de pendientes se vacía.
+        """
         while self.running:
             try:
-                await self._process_migrations()
-                await asyncio.sleep(settings.persistence_migration_interval)
+                result = await self._process_migrations()
+                if result["claimed"] < settings.migration_batch_size:
+                    await asyncio.sleep(settings.persistence_migration_interval)
             except Exception as e:
                 logger.error(f"Error en ciclo de migración: {str(e)}")
                 await asyncio.sleep(10)
     
-    async def _process_migrations(self):
-        """Procesa conversaciones que necesitan migración."""
+    async def _process_migrations(self) -> Dict[str, Any]:
+        """
+        Migra un lote de conversaciones cerradas y limita el ritmo a
+        `migration_max_conversations_per_second`.
+        """
         if not self.initialized:
             await self.initialize()
-            
-        candidates = await self.persistence.get_conversations_needing_migration()
         
-        if not candidates:
-            return
+        started = time.monotonic()
+        result = await self.persistence.migrate_pending_batch(settings.migration_batch_size)
         
-        logger.info(f"Procesando {len(candidates)} conversaciones para migración")
+        for conversation_id in result["migrated_ids"]:
+            # Limpiar memoria LangChain
+            self.memory_manager.cleanup_conversation_memory(conversation_id)
         
-        for conversation_id in candidates:
-            try:
-                # Migrar a PostgreSQL
-                success = await self.persistence.migrate_conversation_to_postgresql(conversation_id)
-                
-                if success:
-                    # Limpiar memoria LangChain
-                    self.memory_manager.cleanup_conversation_memory(conversation_id)
-                    logger.info(f"Conversación migrada exitosamente: {conversation_id}")
-                else:
-                    logger.warning(f"Falló migración de conversación: {conversation_id}")
-                    
-            except Exception as e:
-                logger.error(f"Error migrando conversación {conversation_id}: {str(e)}")
+        rate = settings.migration_max_conversations_per_second
+        if rate > 0 and result["claimed"]:
+            remaining = result["claimed"] / rate - (time.monotonic() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+        return result
     
     async def get_migration_stats(self) -> Dict[str, Any]:
         """
@@ -227,10 +240,9 @@ class MigrationWorker(BaseWorker):
         """
         if not self.initialized:
             await self.initialize()
-            
-        pending = await self.persistence.get_pending_migration_count()
-        completed = await self.persistence.get_completed_migration_count()
-        failed = await self.persistence.get_failed_migration_count()
+        
+        metrics = await self.persistence.get_migration_metrics()
+        pending, completed, failed = metrics.pop("pending"), metrics.pop("completed"), metrics.pop("failed")
         
         return {
             "status": "running" if self.running else "stopped",
@@ -238,8 +250,11 @@ class MigrationWorker(BaseWorker):
                 "pending": pending,
                 "completed": completed,
                 "failed": failed,
-                "total": pending + completed + failed
+                "total": pending + completed + failed,
+                **metrics
             },
-            "last_run": datetime.now().isoformat(),
-            "interval_seconds": settings.persistence_migration_interval
+            "last_run": metrics["last_batch_at"],
+            "interval_seconds": settings.persistence_migration_interval,
+            "batch_size": settings.migration_batch_size,
+            "max_conversations_per_second": settings.migration_max_conversations_per_second
         }
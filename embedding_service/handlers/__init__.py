@@ -4,5 +4,7 @@ Handlers del Embedding Service.
 
 from .openai_handler import OpenAIHandler
 from .validation_handler import ValidationHandler
+from .cache_handler import EmbeddingCacheHandler
+from .query_coalescer import QueryEmbeddingCoalescer
 
-__all__ = ['OpenAIHandler', 'ValidationHandler']
\ No newline at end of file
+__all__ = ['OpenAIHandler', 'ValidationHandler', 'EmbeddingCacheHandler', 'QueryEmbeddingCoalescer']
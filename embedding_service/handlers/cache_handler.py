@@ -0,0 +1,110 @@
+"""
+Handler de caché de embeddings direccionada por contenido.
+
+Guarda cada vector bajo hash(modelo, dimensiones, texto normalizado), de modo que
+re-ingestar un documento, chunks repetidos entre documentos o preguntas
+frecuentes no vuelven a pagarse contra la API de OpenAI.
+"""
+
+import base64
+import hashlib
+import unicodedata
+from array import array
+from typing import List, Optional
+
+from common.handlers import BaseHandler
+from common.clients.redis.cache_key_manager import CacheKeyManager
+
+
+class EmbeddingCacheHandler(BaseHandler):
+    """
+    Lectura (MGET) y escritura (pipeline SET EX) de embeddings en Redis.
+
+    Los vectores se almacenan como float32 empaquetado en base64: ocupan ~4x menos
+    que JSON y funcionan con cualquier valor de `redis_decode_responses`.
+    """
+
+    CACHE_TYPE = "embedding"
+
+    def __init__(self, app_settings, direct_redis_conn=None):
+        super().__init__(app_settings, direct_redis_conn)
+
+        self.enabled = bool(direct_redis_conn) and app_settings.embedding_cache_enabled
+        self.ttl_seconds = app_settings.embedding_cache_ttl_seconds
+        self.key_manager = CacheKeyManager(
+            environment=app_settings.environment,
+            service_name=app_settings.service_name
+        )
+
+        self._logger.info(f"EmbeddingCacheHandler inicializado (habilitado={self.enabled}, ttl={self.ttl_seconds}s)")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalización usada para la clave: Unicode NFC y espacios colapsados."""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def cache_key(self, normalized_text: str, model: str, dimensions: Optional[int]) -> str:
+        digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+        return self.key_manager.get_cache_key(self.CACHE_TYPE, [model, str(dimensions or "default"), digest])
+
+    async def get_many(
+        self,
+        normalized_texts: List[str],
+        model: str,
+        dimensions: Optional[int]
+    ) -> List[Optional[List[float]]]:
+        """
+        Recupera los vectores cacheados en una sola llamada MGET.
+
+        Returns:
+            Lista alineada con `normalized_texts`; None donde no hay entrada.
+        """
+        if not self.enabled or not normalized_texts:
+            return [None] * len(normalized_texts)
+
+        keys = [self.cache_key(text, model, dimensions) for text in normalized_texts]
+        try:
+            values = await self.direct_redis_conn.mget(keys)
+        except Exception as e:
+            # La caché nunca debe romper la generación de embeddings
+            self._logger.warning(f"Error leyendo caché de embeddings: {e}")
+            return [None] * len(normalized_texts)
+
+        return [self._unpack(value) if value else None for value in values]
+
+    async def set_many(
+        self,
+        normalized_texts: List[str],
+        vectors: List[List[float]],
+        model: str,
+        dimensions: Optional[int]
+    ) -> None:
+        """
+        Guarda los vectores nuevos en un único pipeline. Los vectores vacíos o de
+        ceros (marcadores de índices que OpenAI no devolvió) no se cachean: un
+        fallo puntual no debe fijar un vector inválido durante todo el TTL.
+        """
+        entries = [
+            (text, vector) for text, vector in zip(normalized_texts, vectors)
+            if vector and any(vector)
+        ]
+        if not self.enabled or not entries:
+            return
+
+        try:
+            pipe = self.direct_redis_conn.pipeline(transaction=False)
+            for text, vector in entries:
+                pipe.set(self.cache_key(text, model, dimensions), self._pack(vector), ex=self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            self._logger.warning(f"Error escribiendo caché de embeddings: {e}")
+
+    @staticmethod
+    def _pack(vector: List[float]) -> str:
+        return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+    @staticmethod
+    def _unpack(value) -> List[float]:
+        vector = array("f")
+        vector.frombytes(base64.b64decode(value))
+        return vector.tolist()
@@ -56,7 +56,9 @@ class OpenAIHandler(BaseHandler):
         tenant_id: Optional[str] = None,
         agent_id: Optional[str] = None,
         trace_id: Optional[UUID] = None,
-        rag_config: Optional[Dict[str, Any]] = None
+        rag_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Genera embeddings para una lista de textos.
@@ -70,6 +72,8 @@ class OpenAIHandler(BaseHandler):
             agent_id: ID del agente
             trace_id: ID de traza
             rag_config: Configuración RAG opcional con parámetros dinámicos
+            timeout: Timeout de la llamada si no se pasa rag_config
+            max_retries: Reintentos de la llamada si no se pasa rag_config
             
         Returns:
             Dict con embeddings y metadatos
@@ -92,8 +96,8 @@ class OpenAIHandler(BaseHandler):
         )
         
         try:
-            request_timeout = None
-            request_max_retries = None
+            request_timeout = timeout
+            request_max_retries = max_retries
 
             if rag_config:
                 request_timeout = rag_config.timeout
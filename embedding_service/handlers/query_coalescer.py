@@ -0,0 +1,173 @@
+"""
+Handler de micro-batching para embeddings de consulta.
+
+Cada `embedding.generate_query` es un único texto. En picos de chat eso se traduce
+en cientos de peticiones diminutas por segundo a OpenAI, y el límite de RPM llega
+mucho antes que el de TPM. Este handler agrupa las consultas concurrentes con el
+mismo modelo/dimensiones durante unos milisegundos y las envía en una sola llamada.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common.handlers import BaseHandler
+
+# (modelo, dimensiones, formato, timeout, max_retries)
+BatchKey = Tuple[str, Optional[int], str, Optional[float], Optional[int]]
+
+
+@dataclass
+class _PendingBatch:
+    texts: List[str] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    tenant_ids: set = field(default_factory=set)
+    timer: Optional[asyncio.Task] = None
+
+
+class QueryEmbeddingCoalescer(BaseHandler):
+    """
+    Agrupa peticiones de un solo texto en lotes por (modelo, dimensiones, formato)
+    y por los límites de la llamada a OpenAI (timeout, max_retries), que son lo
+    único del rag_config que usa el handler. El resto (colecciones, top_k...) es
+    por agente y no separa lotes.
+
+    Un lote se envía cuando alcanza `max_batch_size` o cuando vence `max_wait_ms`
+    desde su primera petición. Se comparte por proceso (`get_instance`) para que
+    todos los workers del servicio alimenten la misma ventana.
+    """
+
+    _instance: Optional["QueryEmbeddingCoalescer"] = None
+
+    def __init__(
+        self,
+        app_settings,
+        batch_fn: Callable[..., Awaitable[Dict[str, Any]]],
+        direct_redis_conn=None
+    ):
+        """
+        Args:
+            app_settings: EmbeddingServiceSettings.
+            batch_fn: Corrutina que genera embeddings para una lista de textos con la
+                firma de `EmbeddingService._generate_embeddings_cached`.
+        """
+        super().__init__(app_settings, direct_redis_conn)
+        self.batch_fn = batch_fn
+        self.max_batch_size = app_settings.query_coalescing_max_batch_size
+        self.max_wait_seconds = app_settings.query_coalescing_max_wait_ms / 1000.0
+        self._batches: Dict[BatchKey, _PendingBatch] = {}
+
+        self._logger.info(
+            f"QueryEmbeddingCoalescer inicializado (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={app_settings.query_coalescing_max_wait_ms})"
+        )
+
+    @classmethod
+    def get_instance(
+        cls,
+        app_settings,
+        batch_fn: Callable[..., Awaitable[Dict[str, Any]]],
+        direct_redis_conn=None
+    ) -> "QueryEmbeddingCoalescer":
+        """Devuelve el coalescer del proceso, creándolo con `batch_fn` si no existe."""
+        if cls._instance is None:
+            cls._instance = cls(app_settings, batch_fn, direct_redis_conn)
+        return cls._instance
+
+    async def embed(
+        self,
+        text: str,
+        model: str,
+        dimensions: Optional[int],
+        encoding_format: Optional[str],
+        tenant_id: Optional[Any] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Encola un texto y espera su vector.
+
+        Returns:
+            Dict con el formato de `OpenAIHandler.generate_embeddings` para un único
+            texto. El uso de tokens del lote se reparte en proporción a la longitud.
+        """
+        key: BatchKey = (model, dimensions, encoding_format or "float", timeout, max_retries)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = _PendingBatch()
+            batch.timer = asyncio.create_task(self._flush_after_wait(key))
+            self._batches[key] = batch
+
+        future = asyncio.get_running_loop().create_future()
+        batch.texts.append(text)
+        batch.futures.append(future)
+        batch.tenant_ids.add(tenant_id)
+
+        if len(batch.texts) >= self.max_batch_size:
+            try:
+                await self._flush(key)
+            except asyncio.CancelledError:
+                # Nadie esperará ya este future; se consume su error para no loguearlo
+                if future.done() and not future.cancelled():
+                    future.exception()
+                raise
+
+        return await future
+
+    async def _flush_after_wait(self, key: BatchKey):
+        await asyncio.sleep(self.max_wait_seconds)
+        await self._flush(key)
+
+    async def _flush(self, key: BatchKey):
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return  # Ya enviado por tamaño
+        if batch.timer and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+
+        model, dimensions, encoding_format, timeout, max_retries = key
+        # El `user` de OpenAI solo se envía si todo el lote es del mismo tenant
+        tenant_id = next(iter(batch.tenant_ids)) if len(batch.tenant_ids) == 1 else None
+
+        try:
+            result = await self.batch_fn(
+                texts=batch.texts,
+                model=model,
+                dimensions=dimensions,
+                encoding_format=encoding_format,
+                tenant_id=tenant_id,
+                timeout=timeout,
+                max_retries=max_retries
+            )
+
+            total_chars = sum(len(text) for text in batch.texts) or 1
+            for text, vector, future in zip(batch.texts, result["embeddings"], batch.futures):
+                if future.done():
+                    continue
+                share = len(text) / total_chars
+                future.set_result({
+                    "embeddings": [vector],
+                    "model": result["model"],
+                    "dimensions": result["dimensions"],
+                    "prompt_tokens": round(result.get("prompt_tokens", 0) * share),
+                    "total_tokens": round(result.get("total_tokens", 0) * share),
+                    "processing_time_ms": result.get("processing_time_ms", 0),
+                    "batch_size": len(batch.texts)
+                })
+        except Exception as e:
+            self._fail_pending(batch, e)
+            return
+        finally:
+            # Si el envío se cancela (p.ej. se cancela el llamante que disparó el lote
+            # por tamaño), ninguna otra petición del lote debe quedar esperando
+            self._fail_pending(
+                batch, RuntimeError("Lote de embeddings de consulta interrumpido")
+            )
+
+        self._logger.debug(f"Lote de {len(batch.texts)} consultas enviado (modelo={model}, dimensiones={dimensions})")
+
+    @staticmethod
+    def _fail_pending(batch: _PendingBatch, error: BaseException):
+        for future in batch.futures:
+            if not future.done():
+                future.set_exception(error)
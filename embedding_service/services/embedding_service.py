@@ -6,7 +6,8 @@ delegando operaciones específicas a los handlers correspondientes.
 """
 
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 from uuid import uuid4
 
 from pydantic import ValidationError
@@ -29,6 +30,8 @@ from ..models.payloads import (
 )
 from ..handlers.openai_handler import OpenAIHandler
 from ..handlers.validation_handler import ValidationHandler
+from ..handlers.cache_handler import EmbeddingCacheHandler
+from ..handlers.query_coalescer import QueryEmbeddingCoalescer
 
 
 class EmbeddingService(BaseService):
@@ -66,6 +69,20 @@ class EmbeddingService(BaseService):
             app_settings=app_settings,
             direct_redis_conn=direct_redis_conn
         )
+
+        self.cache_handler = EmbeddingCacheHandler(
+            app_settings=app_settings,
+            direct_redis_conn=direct_redis_conn
+        )
+
+        # Compartido por todos los workers del proceso
+        self.query_coalescer = None
+        if app_settings.query_coalescing_enabled:
+            self.query_coalescer = QueryEmbeddingCoalescer.get_instance(
+                app_settings=app_settings,
+                batch_fn=self._generate_embeddings_cached,
+                direct_redis_conn=direct_redis_conn
+            )
         
         self._logger.info("EmbeddingService inicializado correctamente con inyección de cliente")
     
@@ -150,7 +167,7 @@ class EmbeddingService(BaseService):
         if valid_chunks:
             valid_texts = [chunk["text"] for chunk in valid_chunks]
             try:
-                embedding_api_result = await self.openai_handler.generate_embeddings(
+                embedding_api_result = await self._generate_embeddings_cached(
                     texts=valid_texts,
                     model=rag_config.embedding_model.value,
                     dimensions=rag_config.embedding_dimensions,
@@ -165,8 +182,8 @@ class EmbeddingService(BaseService):
                 for i, chunk in enumerate(valid_chunks):
                     results[chunk["id"]] = {
                         "chunk_id": chunk["id"],
-                        "embedding": embedding_api_result["embeddings"][i]["embedding"],
-                        "text_index": embedding_api_result["embeddings"][i]["index"]
+                        "embedding": embedding_api_result["embeddings"][i],
+                        "text_index": i
                     }
 
             except Exception as e:
@@ -209,17 +226,30 @@ class EmbeddingService(BaseService):
         if not validation_result["is_valid"]:
             raise ValueError(f"Validación de consulta fallida: {validation_result['messages'][0]}")
 
-        # Pasamos el rag_config completo para que el handler decida cómo usarlo
-        result = await self.openai_handler.generate_embeddings(
-            texts=[query_text],
-            model=rag_config.embedding_model.value,
-            dimensions=rag_config.embedding_dimensions,
-            encoding_format=rag_config.encoding_format,
-            tenant_id=action.tenant_id,
-            agent_id=action.agent_id,
-            trace_id=action.trace_id,
-            rag_config=rag_config
-        )
+        if self.query_coalescer:
+            # Se agrupa con otras consultas concurrentes; agent_id/trace_id son
+            # por petición y no se propagan a la llamada compartida
+            result = await self.query_coalescer.embed(
+                text=query_text,
+                model=rag_config.embedding_model.value,
+                dimensions=rag_config.embedding_dimensions,
+                encoding_format=rag_config.encoding_format,
+                tenant_id=action.tenant_id,
+                timeout=rag_config.timeout,
+                max_retries=rag_config.max_retries
+            )
+        else:
+            # Pasamos el rag_config completo para que el handler decida cómo usarlo
+            result = await self._generate_embeddings_cached(
+                texts=[query_text],
+                model=rag_config.embedding_model.value,
+                dimensions=rag_config.embedding_dimensions,
+                encoding_format=rag_config.encoding_format,
+                tenant_id=action.tenant_id,
+                agent_id=action.agent_id,
+                trace_id=action.trace_id,
+                rag_config=rag_config
+            )
 
         response = EmbeddingResponse(
             embeddings=result["embeddings"],
@@ -249,7 +279,7 @@ class EmbeddingService(BaseService):
             rag_config = action.rag_config.dict() if action.rag_config else None
             
             # Generar embeddings con configuración dinámica
-            result = await self.openai_handler.generate_embeddings(
+            result = await self._generate_embeddings_cached(
                 texts=payload.texts,
                 model=model,
                 dimensions=payload.dimensions,
@@ -292,6 +322,79 @@ class EmbeddingService(BaseService):
             
             return batch_result.model_dump()
     
+    async def _generate_embeddings_cached(
+        self,
+        texts: List[str],
+        model: str,
+        dimensions: Optional[int] = None,
+        encoding_format: Optional[str] = None,
+        **handler_kwargs
+    ) -> Dict[str, Any]:
+        """
+        Genera embeddings pasando primero por la caché direccionada por contenido.
+
+        Normaliza los textos, colapsa duplicados dentro del lote, consulta Redis con
+        un MGET y solo envía a OpenAI los textos únicos que faltan. Los vectores
+        nuevos se guardan en un pipeline. Devuelve el mismo formato que
+        `OpenAIHandler.generate_embeddings` (embeddings alineados con `texts`) más
+        `cache_hits`; el uso de tokens corresponde solo a la llamada real a la API.
+        """
+        if not self.cache_handler.enabled or (encoding_format or "float") != "float":
+            result = await self.openai_handler.generate_embeddings(
+                texts=texts,
+                model=model,
+                dimensions=dimensions,
+                encoding_format=encoding_format,
+                **handler_kwargs
+            )
+            result["cache_hits"] = 0
+            return result
+
+        start_time = time.time()
+        normalized = [self.cache_handler.normalize(text) if text else "" for text in texts]
+        unique_texts = list(dict.fromkeys(text for text in normalized if text))
+
+        cached = await self.cache_handler.get_many(unique_texts, model, dimensions)
+        vectors = {text: vector for text, vector in zip(unique_texts, cached) if vector is not None}
+        missing = [text for text in unique_texts if text not in vectors]
+
+        result: Dict[str, Any] = {
+            "model": model,
+            "dimensions": dimensions,
+            "prompt_tokens": 0,
+            "total_tokens": 0,
+            "cache_hits": len(unique_texts) - len(missing)
+        }
+
+        if missing:
+            api_result = await self.openai_handler.generate_embeddings(
+                texts=missing,
+                model=model,
+                dimensions=dimensions,
+                encoding_format=encoding_format,
+                **handler_kwargs
+            )
+            vectors.update(zip(missing, api_result["embeddings"]))
+            await self.cache_handler.set_many(missing, api_result["embeddings"], model, dimensions)
+            result.update(
+                model=api_result["model"],
+                dimensions=api_result["dimensions"],
+                prompt_tokens=api_result.get("prompt_tokens", 0),
+                total_tokens=api_result.get("total_tokens", 0)
+            )
+        elif vectors:
+            result["dimensions"] = len(next(iter(vectors.values())))
+
+        zero_vector = [0.0] * (result["dimensions"] or 1536)
+        result["embeddings"] = [vectors.get(text, zero_vector) if text else zero_vector for text in normalized]
+        result["processing_time_ms"] = int((time.time() - start_time) * 1000)
+
+        self._logger.debug(
+            f"Embeddings: {len(texts)} textos, {len(unique_texts)} únicos, "
+            f"{result['cache_hits']} desde caché, {len(missing)} enviados a OpenAI"
+        )
+        return result
+
     async def _track_metrics(self, action: DomainAction, response: Any):
         """
         Registra métricas del servicio.
@@ -22,10 +22,6 @@ router = APIRouter(prefix="/api/v1/ingestion", tags=["ingestion"])
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
-# Temporary upload directory
-UPLOAD_DIR = Path("/tmp/ingestion_uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token and extract user info"""
@@ -96,19 +92,13 @@ async def ingest_document(
             f"document={request.document_name}, tenant={tenant_id}"
         )
         
-        # Generar ID determinístico
-        deterministic_id = str(generate_deterministic_id(
-            tenant_id=user_info["tenant_id"],
-            session_id=user_info["session_id"],
-            agent_id=request.agent_id,
-            document_id=request.document_id
-        ))
+        task_id = _ingestion_task_id(user_info, request)
 
         # Create domain action
         action = DomainAction(
             action_type="ingestion.ingest_document",
-            task_id=deterministic_id,
-            trace_id=deterministic_id,  # Mismo ID para trazabilidad
+            task_id=task_id,
+            trace_id=task_id,  # Mismo ID para trazabilidad
             tenant_id=user_info["tenant_id"],
             user_id=user_info["user_id"],
             session_id=user_info["session_id"],
@@ -224,13 +214,7 @@ async def batch_ingest_documents(
                     }
                 )
                 
-                # Generar ID determinístico para cada documento del lote
-                deterministic_id = str(generate_deterministic_id(
-                    tenant_id=user_info["tenant_id"],
-                    session_id=user_info["session_id"],
-                    agent_id=individual_request.agent_id,
-                    document_id=individual_request.document_id
-                ))
+                task_id = _ingestion_task_id(user_info, individual_request)
 
                 # Create domain action for individual document
                 action = DomainAction(
@@ -238,8 +222,8 @@ async def batch_ingest_documents(
                     tenant_id=user_info["tenant_id"],
                     user_id=user_info["user_id"],
                     session_id=user_info["session_id"],
-                    task_id=deterministic_id,
-                    trace_id=deterministic_id,
+                    task_id=task_id,
+                    trace_id=task_id,
                     origin_service="api",
                     rag_config=rag_config,
                     data=individual_request.model_dump()
@@ -247,6 +231,13 @@ async def batch_ingest_documents(
                 
                 # Process individual document
                 result = await service.process_action(action)
+                if result.get("status") == "already_processing":
+                    failed_items.append({
+                        "index": idx,
+                        "document_name": individual_request.document_name,
+                        "error": result["message"]
+                    })
+                    continue
                 task_ids.append(result["task_id"])
                 accepted_count += 1
                 
@@ -309,13 +300,18 @@ async def upload_document(
         }
         document_type = type_map.get(file_extension, DocumentType.TXT)
         
-        # Save file temporarily
+        # Save file temporarily, streaming it to disk in blocks; the service
+        # deletes it once the task completes or fails
+        upload_dir = Path(service.app_settings.upload_dir)
+        upload_dir.mkdir(parents=True, exist_ok=True)
         file_id = str(uuid.uuid4())
-        file_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        file_path = upload_dir / f"{file_id}_{file.filename}"
+        await _save_upload(
+            file,
+            file_path,
+            max_bytes=service.app_settings.max_file_size_bytes,
+            chunk_size=service.app_settings.upload_chunk_size_bytes
+        )
         
         # Create ingestion request
         request = DocumentIngestionRequest(
@@ -331,18 +327,12 @@ async def upload_document(
         )
         
         # Create domain action
-        # Generar ID determinístico para la acción de ingesta de archivo
-        deterministic_id = str(generate_deterministic_id(
-            tenant_id=user_info["tenant_id"],
-            session_id=user_info["session_id"],
-            agent_id=request.agent_id,
-            document_id=request.document_id
-        ))
+        task_id = _ingestion_task_id(user_info, request)
 
         action = DomainAction(
             action_type="ingestion.ingest_document",
-            task_id=deterministic_id,
-            trace_id=deterministic_id,
+            task_id=task_id,
+            trace_id=task_id,
             tenant_id=user_info["tenant_id"],
             user_id=user_info["user_id"],
             session_id=user_info["session_id"],
@@ -353,28 +343,50 @@ async def upload_document(
         # Process
         result = await service.process_action(action)
         
-        # Clean up file after processing starts
-        # The service should have read it by now
-        asyncio.create_task(_cleanup_file(file_path, delay=60))
-        
         return {
             "success": True,
             "data": result
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in upload endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _cleanup_file(file_path: Path, delay: int = 60):
-    """Clean up uploaded file after delay"""
-    await asyncio.sleep(delay)
+def _ingestion_task_id(user_info: dict, request: DocumentIngestionRequest) -> str:
+    """
+    Task id of an ingestion. Re-ingesting an existing document gets a deterministic
+    id, so a re-submission while it is still running is detected; every new document
+    gets its own id.
+    """
+    if not request.document_id:
+        return str(uuid.uuid4())
+    return str(generate_deterministic_id(
+        tenant_id=user_info["tenant_id"],
+        session_id=user_info["session_id"],
+        agent_id=request.agent_id,
+        document_id=request.document_id
+    ))
+
+
+async def _save_upload(file: UploadFile, file_path: Path, max_bytes: int, chunk_size: int):
+    """Write an upload to disk block by block, rejecting it once it exceeds max_bytes"""
+    written = 0
     try:
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        logger.error(f"Error cleaning up file {file_path}: {e}")
+        async with aiofiles.open(file_path, 'wb') as f:
+            while data := await file.read(chunk_size):
+                written += len(data)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds the maximum size of {max_bytes} bytes"
+                    )
+                await f.write(data)
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
 
 
 @router.get("/status/{task_id}")
@@ -3,9 +3,20 @@
 from .chunk_enricher import ChunkEnricherHandler
 from .document_processor import DocumentProcessorHandler
 from .qdrant_handler import QdrantHandler
+from .ingestion_pipeline import IngestionPipelineHandler
+from .chunk_staging import ChunkStagingHandler
+from .task_progress import TaskProgressHandler
+from .task_checkpoint import TaskCheckpointHandler
+from .ingestion_scheduler import IngestionScheduler, estimate_chunk_count
 
 __all__ = [
     "ChunkEnricherHandler",
     "DocumentProcessorHandler",
     "QdrantHandler",
+    "IngestionPipelineHandler",
+    "ChunkStagingHandler",
+    "TaskProgressHandler",
+    "TaskCheckpointHandler",
+    "IngestionScheduler",
+    "estimate_chunk_count",
 ]
\ No newline at end of file
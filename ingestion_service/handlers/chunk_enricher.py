@@ -1,5 +1,8 @@
+import asyncio
+import logging
 import re
-from typing import List, Set, Dict
+from concurrent.futures import Executor
+from typing import List, Optional, Set, Dict, Tuple
 from collections import Counter
 import spacy
 import nltk
@@ -10,13 +13,32 @@ from common.handlers import BaseHandler
 from common.config import CommonAppSettings
 from ..models import ChunkModel
 
+logger = logging.getLogger(__name__)
 
-class ChunkEnricherHandler(BaseHandler):
-    """Handler for enriching chunks with keywords and tags"""
+# Extractor of the current process; built lazily (and once per process-pool worker)
+_extractor: Optional["KeywordExtractor"] = None
+
+
+def get_extractor() -> "KeywordExtractor":
+    global _extractor
+    if _extractor is None:
+        _extractor = KeywordExtractor()
+    return _extractor
+
+
+def enrich_batch(items: List[Tuple[str, Dict]]) -> List[Tuple[List[str], List[str]]]:
+    """Return (keywords, tags) for each (content, metadata). Picklable entry point for process pools."""
+    extractor = get_extractor()
+    return [
+        (extractor.extract_keywords(content)[:10], sorted(extractor.generate_tags(content, metadata)))
+        for content, metadata in items
+    ]
+
+
+class KeywordExtractor:
+    """CPU-bound keyword and tag extraction (spaCy/NLTK), free of event-loop state"""
     
-    def __init__(self, app_settings: CommonAppSettings):
-        super().__init__(app_settings)
-        
+    def __init__(self):
         # Initialize NLP tools
         try:
             # Download required NLTK data
@@ -24,7 +46,7 @@ class ChunkEnricherHandler(BaseHandler):
             nltk.download('stopwords', quiet=True)
             self.stop_words = set(stopwords.words('english'))
         except:
-            self._logger.warning("NLTK data not available, using basic stop words")
+            logger.warning("NLTK data not available, using basic stop words")
             self.stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for'}
         
         # Try to load spaCy model for better NER
@@ -32,23 +54,10 @@ class ChunkEnricherHandler(BaseHandler):
             self.nlp = spacy.load("en_core_web_sm")
             self.use_spacy = True
         except:
-            self._logger.warning("spaCy model not available, using basic keyword extraction")
+            logger.warning("spaCy model not available, using basic keyword extraction")
             self.use_spacy = False
     
-    async def enrich_chunks(self, chunks: List[ChunkModel]) -> List[ChunkModel]:
-        """Enrich chunks with keywords and tags"""
-        for chunk in chunks:
-            # Extract keywords
-            keywords = await self._extract_keywords(chunk.content)
-            chunk.keywords = list(keywords)[:10]  # Top 10 keywords
-            
-            # Generate tags based on content analysis
-            tags = await self._generate_tags(chunk.content, chunk.metadata)
-            chunk.tags = list(tags)
-            
-        return chunks
-    
-    async def _extract_keywords(self, content: str) -> List[str]:
+    def extract_keywords(self, content: str) -> List[str]:
         """Extract keywords from content"""
         keywords = set()
         
@@ -92,7 +101,7 @@ class ChunkEnricherHandler(BaseHandler):
         
         return sorted(list(keywords))
     
-    async def _generate_tags(self, content: str, metadata: Dict) -> Set[str]:
+    def generate_tags(self, content: str, metadata: Dict) -> Set[str]:
         """Generate tags based on content analysis"""
         tags = set()
         
@@ -130,3 +139,29 @@ class ChunkEnricherHandler(BaseHandler):
             tags.add('tutorial')
             
         return tags
+
+
+class ChunkEnricherHandler(BaseHandler):
+    """Handler for enriching chunks with keywords and tags"""
+    
+    def __init__(self, app_settings: CommonAppSettings):
+        super().__init__(app_settings)
+    
+    async def enrich_chunks(self, chunks: List[ChunkModel], executor: Optional[Executor] = None) -> List[ChunkModel]:
+        """
+        Enrich chunks with keywords and tags.
+        
+        With an executor the NLP work runs there (e.g. a process pool) instead of
+        blocking the event loop.
+        """
+        items = [(chunk.content, chunk.metadata) for chunk in chunks]
+        if executor is not None:
+            results = await asyncio.get_running_loop().run_in_executor(executor, enrich_batch, items)
+        else:
+            results = enrich_batch(items)
+        
+        for chunk, (keywords, tags) in zip(chunks, results):
+            chunk.keywords = keywords  # Top 10 keywords
+            chunk.tags = tags
+            
+        return chunks
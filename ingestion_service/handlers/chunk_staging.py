@@ -0,0 +1,109 @@
+import asyncio
+import time
+from typing import Dict, List, Set
+
+from redis.asyncio import Redis as AIORedis
+
+from common.handlers import BaseHandler
+from common.config import CommonAppSettings
+from common.clients.redis.cache_key_manager import CacheKeyManager
+from ..models import ChunkModel
+
+
+class ChunkStagingHandler(BaseHandler):
+    """
+    Staging area for chunks waiting for their embeddings: one Redis hash per
+    ingestion task (field = chunk_id, value = chunk JSON).
+
+    Each embedding batch costs one pipelined round trip to stage, one to read
+    and one to release once its result is accounted for, and the whole area is
+    dropped with a single DEL when the task ends. Chunks stay staged until then,
+    so a restarted task can tell which chunks are still in flight.
+
+    A per-task counter of staged batches doubles as the in-flight window: it is
+    shared through Redis because the embedding result of a batch may be handled
+    by any ingestion worker.
+    """
+
+    def __init__(self, app_settings: CommonAppSettings, direct_redis_conn: AIORedis):
+        super().__init__(app_settings, direct_redis_conn)
+        self.key_manager = CacheKeyManager(
+            environment=app_settings.environment,
+            service_name=app_settings.service_name
+        )
+        self.ttl_seconds = app_settings.chunk_staging_ttl_seconds
+
+    def _key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("chunk_staging", task_id)
+
+    def _in_flight_key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("chunk_staging_in_flight", task_id)
+
+    async def stage(self, task_id: str, chunks: List[ChunkModel]) -> None:
+        """Store a batch of chunks and refresh the area's TTL."""
+        if not chunks:
+            return
+        key = self._key(task_id)
+        async with self.direct_redis_conn.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={chunk.chunk_id: chunk.model_dump_json() for chunk in chunks})
+            pipe.expire(key, self.ttl_seconds)
+            pipe.incr(self._in_flight_key(task_id))
+            pipe.expire(self._in_flight_key(task_id), self.ttl_seconds)
+            await pipe.execute()
+
+    async def read(self, task_id: str, chunk_ids: List[str]) -> Dict[str, ChunkModel]:
+        """Read the given chunks. Missing ids are absent from the result."""
+        if not chunk_ids:
+            return {}
+        values = await self.direct_redis_conn.hmget(self._key(task_id), chunk_ids)
+
+        chunks = {}
+        for chunk_id, value in zip(chunk_ids, values):
+            if value is None:
+                continue
+            try:
+                chunks[chunk_id] = ChunkModel.model_validate_json(value)
+            except Exception as e:
+                self._logger.error(f"Task {task_id}: staged chunk {chunk_id} could not be parsed: {e}")
+        return chunks
+
+    async def release(self, task_id: str, chunk_ids: List[str]) -> None:
+        """Remove a batch whose embedding result has been handled and free its slot in the window."""
+        if not chunk_ids:
+            return
+        async with self.direct_redis_conn.pipeline(transaction=False) as pipe:
+            pipe.hdel(self._key(task_id), *chunk_ids)
+            pipe.decr(self._in_flight_key(task_id))
+            await pipe.execute()
+
+    async def staged_ids(self, task_id: str) -> Set[str]:
+        """Ids of the chunks sent for embedding whose result has not been handled yet."""
+        return {
+            chunk_id.decode() if isinstance(chunk_id, bytes) else chunk_id
+            for chunk_id in await self.direct_redis_conn.hkeys(self._key(task_id))
+        }
+
+    async def in_flight(self, task_id: str) -> int:
+        """Number of staged batches of the task still waiting for their embeddings."""
+        return int(await self.direct_redis_conn.get(self._in_flight_key(task_id)) or 0)
+
+    async def wait_for_window(
+        self,
+        task_id: str,
+        max_in_flight: int,
+        timeout_seconds: float,
+        poll_interval_seconds: float = 0.1
+    ) -> None:
+        """Wait until fewer than `max_in_flight` batches of the task await their embeddings."""
+        deadline = time.monotonic() + timeout_seconds
+        while await self.in_flight(task_id) >= max_in_flight:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Task {task_id}: no embedding result received in {timeout_seconds}s "
+                    f"with {max_in_flight} batches in flight"
+                )
+            await asyncio.sleep(poll_interval_seconds)
+
+    async def clear(self, task_id: str) -> None:
+        """Drop the task's staging area."""
+        await self.direct_redis_conn.delete(self._key(task_id), self._in_flight_key(task_id))
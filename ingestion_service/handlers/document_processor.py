@@ -1,17 +1,70 @@
+import asyncio
+import codecs
 import os
 import logging
-from typing import List, Optional, Dict, Any
+import tempfile
+import time
+from concurrent.futures import Executor
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import hashlib
+import zlib
 
+import aiofiles
+import httpx
 from llama_index.core import SimpleDirectoryReader, Document
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import TextNode
-import requests
 
 from common.handlers import BaseHandler
 from common.config import CommonAppSettings
 from ..models import DocumentIngestionRequest, ChunkModel, DocumentType
+from ..utils.id_generation import generate_chunk_id
+
+# Characters read per step from plain-text files and remote responses
+_READ_BLOCK_CHARS = 1024 * 1024
+# Leading characters of a paragraph hashed to decide section boundaries; also the
+# lookahead a streamed buffer needs past a section window before it can be cut
+_BOUNDARY_HASH_CHARS = 256
+
+
+def read_file_pages(file_path: str, document_type: str) -> List[str]:
+    """Extract the text of a file, one entry per page for paged formats. Picklable for process pools."""
+    if document_type in (DocumentType.PDF.value, DocumentType.DOCX.value):
+        # Use SimpleDirectoryReader for complex formats
+        reader = SimpleDirectoryReader(input_files=[file_path])
+        return [doc.text for doc in reader.load_data()]
+    # Plain text formats
+    return [Path(file_path).read_text(encoding='utf-8')]
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[Dict[str, Any]]:
+    """Split text into sentence-aware nodes. Picklable for process pools."""
+    chunk_parser = SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        include_metadata=True,
+        include_prev_next_rel=True
+    )
+    document = Document(text=text, id_=hashlib.sha256(text.encode()).hexdigest())
+    return [
+        {
+            "content": node.get_content(),
+            "start_char_idx": node.start_char_idx,
+            "end_char_idx": node.end_char_idx,
+            "relationships": _extract_relationships(node)
+        }
+        for node in chunk_parser.get_nodes_from_documents([document])
+    ]
+
+
+def _extract_relationships(node: TextNode) -> Dict[str, Any]:
+    """Extract node relationships for metadata"""
+    relationships = {}
+    if hasattr(node, 'relationships'):
+        for rel_type, rel_node in node.relationships.items():
+            relationships[rel_type.value] = rel_node.node_id if rel_node else None
+    return relationships
 
 
 class DocumentProcessorHandler(BaseHandler):
@@ -19,7 +72,6 @@ class DocumentProcessorHandler(BaseHandler):
     
     def __init__(self, app_settings: CommonAppSettings):
         super().__init__(app_settings)
-        self.chunk_parser = SentenceSplitter()
         
     async def process_document(
         self, 
@@ -29,41 +81,13 @@ class DocumentProcessorHandler(BaseHandler):
     ) -> List[ChunkModel]:
         """Process document and return chunks"""
         try:
-            # Load document based on type
-            document = await self._load_document(request)
-            
-            # Configure chunk parser
-            self.chunk_parser = SentenceSplitter(
-                chunk_size=request.chunk_size,
-                chunk_overlap=request.chunk_overlap,
-                include_metadata=True,
-                include_prev_next_rel=True
-            )
-            
-            # Parse into nodes
-            nodes = self.chunk_parser.get_nodes_from_documents([document])
-            
-            # Convert nodes to ChunkModel
             chunks = []
-            for idx, node in enumerate(nodes):
-                chunk = ChunkModel(
-                    document_id=document_id,
-                    tenant_id=request.tenant_id,
-                    agent_id=agent_id,
-                    collection_id=request.collection_id,
-                    content=node.get_content(),
-                    chunk_index=idx,
-                    metadata={
-                        **request.metadata,
-                        "document_name": request.document_name,
-                        "document_type": request.document_type.value,
-                        "agent_id": agent_id,
-                        "start_char_idx": node.start_char_idx,
-                        "end_char_idx": node.end_char_idx,
-                        "relationships": self._extract_relationships(node)
-                    }
-                )
-                chunks.append(chunk)
+            content_counts: Dict[str, int] = {}
+            async for offset, section in self.iter_sections(request):
+                nodes = split_text(section, request.chunk_size, request.chunk_overlap)
+                chunks.extend(self.build_chunks(
+                    request, document_id, agent_id, nodes, len(chunks), offset, content_counts
+                ))
                 
             self._logger.info(f"Processed document {document_id} into {len(chunks)} chunks for agent {agent_id}")
             return chunks
@@ -72,58 +96,208 @@ class DocumentProcessorHandler(BaseHandler):
             self._logger.error(f"Error processing document: {e}")
             raise
     
-    async def _load_document(self, request: DocumentIngestionRequest) -> Document:
-        """Load document from various sources"""
-        content = None
-        metadata = {"source": request.document_type.value}
+    async def iter_sections(
+        self,
+        request: DocumentIngestionRequest,
+        executor: Optional[Executor] = None,
+        section_chars: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Stream the document as sections of up to `section_chars` characters cut
+        at paragraph boundaries, as (char offset, text) pairs.
+        
+        Text is read incrementally and each section is yielded as soon as enough
+        of the following text has arrived to place its boundary, so the pipeline
+        can chunk and embed the beginning of a large file or slow download while
+        the rest is still being read. File parsing runs in `executor` when given.
+        
+        Boundaries are content-defined: past half the section size, a section ends
+        at the first paragraph whose leading text hashes to a fixed pattern. An
+        edit therefore only moves the boundaries around it, and the chunks of the
+        other sections (and their deterministic ids) stay the same on re-ingestion.
+        """
+        buffer = ""
+        buffer_offset = 0
+        async for block in self._iter_text(request, executor):
+            buffer += block
+            if not section_chars:
+                continue
+            while len(buffer) > section_chars + _BOUNDARY_HASH_CHARS + 2:
+                end = self._find_section_end(buffer, 0, section_chars)
+                yield buffer_offset, buffer[:end]
+                buffer_offset += end
+                buffer = buffer[end:]
+        
+        if not section_chars or buffer_offset == 0 and len(buffer) <= section_chars:
+            yield buffer_offset, buffer
+            return
+        offset = 0
+        while offset < len(buffer):
+            end = self._find_section_end(buffer, offset, section_chars)
+            yield buffer_offset + offset, buffer[offset:end]
+            offset = end
+    
+    def _find_section_end(self, text: str, offset: int, section_chars: int) -> int:
+        limit = offset + section_chars
+        if limit >= len(text):
+            return len(text)
+        
+        last_break = -1
+        position = text.find("\n\n", offset + section_chars // 2, limit)
+        while position != -1:
+            last_break = position
+            paragraph = text[position + 2:position + 2 + _BOUNDARY_HASH_CHARS].split("\n\n", 1)[0]
+            if zlib.crc32(paragraph.encode("utf-8")) % 8 == 0:
+                return position
+            position = text.find("\n\n", position + 2, limit)
         
+        if last_break != -1:
+            return last_break
+        # No paragraph break in the window: cut at the last line break, or hard cut
+        line_break = text.rfind("\n", offset + 1, limit)
+        return line_break if line_break > offset else limit
+    
+    def build_chunks(
+        self,
+        request: DocumentIngestionRequest,
+        document_id: str,
+        agent_id: str,
+        nodes: List[Dict[str, Any]],
+        first_index: int = 0,
+        char_offset: int = 0,
+        content_counts: Optional[Dict[str, int]] = None
+    ) -> List[ChunkModel]:
+        """
+        Convert split nodes of a section into ChunkModel with document-wide indices
+        and offsets. Chunk ids are derived from the content; `content_counts`
+        (shared across the sections of a document) numbers repeated contents.
+        """
+        if content_counts is None:
+            content_counts = {}
+        chunks = []
+        for idx, node in enumerate(nodes):
+            occurrence = content_counts.get(node["content"], 0)
+            content_counts[node["content"]] = occurrence + 1
+            chunk = ChunkModel(
+                chunk_id=generate_chunk_id(document_id, node["content"], occurrence),
+                document_id=document_id,
+                tenant_id=request.tenant_id,
+                agent_id=agent_id,
+                collection_id=request.collection_id,
+                content=node["content"],
+                chunk_index=first_index + idx,
+                metadata={
+                    **request.metadata,
+                    "document_name": request.document_name,
+                    "document_type": request.document_type.value,
+                    "agent_id": agent_id,
+                    "start_char_idx": node["start_char_idx"] + char_offset if node["start_char_idx"] is not None else None,
+                    "end_char_idx": node["end_char_idx"] + char_offset if node["end_char_idx"] is not None else None,
+                    "relationships": node["relationships"]
+                }
+            )
+            chunks.append(chunk)
+        return chunks
+    
+    async def _iter_text(
+        self,
+        request: DocumentIngestionRequest,
+        executor: Optional[Executor] = None
+    ) -> AsyncIterator[str]:
+        """Yield the document text in blocks, from whichever source the request provides"""
         if request.file_path:
-            # Load from file
             file_path = Path(request.file_path)
             if not file_path.exists():
                 raise FileNotFoundError(f"File not found: {request.file_path}")
-                
-            if request.document_type in [DocumentType.PDF, DocumentType.DOCX]:
-                # Use SimpleDirectoryReader for complex formats
-                reader = SimpleDirectoryReader(input_files=[str(file_path)])
-                docs = reader.load_data()
-                if docs:
-                    content = "\n\n".join([doc.text for doc in docs])
-            else:
-                # Plain text formats
-                content = file_path.read_text(encoding='utf-8')
+            async for block in self._iter_file_text(file_path, request.document_type, executor):
+                yield block
                 
         elif request.url:
-            # Fetch from URL
-            response = requests.get(str(request.url), timeout=30)
-            response.raise_for_status()
-            content = response.text
-            metadata["url"] = str(request.url)
+            async for block in self._iter_url_text(str(request.url), request.document_type, executor):
+                yield block
             
         elif request.content:
             # Direct content
-            content = request.content
+            yield request.content
             
         else:
             raise ValueError("No content source provided")
+    
+    async def _iter_file_text(
+        self,
+        file_path: Path,
+        document_type: DocumentType,
+        executor: Optional[Executor] = None
+    ) -> AsyncIterator[str]:
+        if document_type in (DocumentType.PDF, DocumentType.DOCX):
+            # Paged formats are parsed whole, off the event loop
+            pages = await asyncio.get_running_loop().run_in_executor(
+                executor, read_file_pages, str(file_path), document_type.value
+            )
+            for i, page in enumerate(pages):
+                yield page if i == 0 else "\n\n" + page
+            return
+        
+        # Plain text formats are read block by block
+        async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
+            while block := await f.read(_READ_BLOCK_CHARS):
+                yield block
+    
+    async def _iter_url_text(
+        self,
+        url: str,
+        document_type: DocumentType,
+        executor: Optional[Executor] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a remote document, enforcing `max_url_content_size_bytes` and an
+        overall `url_fetch_timeout_seconds` deadline (a slow server cannot hold
+        the task open indefinitely by trickling bytes).
         
-        # Create document
-        document = Document(
-            text=content,
-            metadata=metadata,
-            id_=self._generate_doc_hash(content)
-        )
+        Text responses are decoded incrementally; paged formats are spooled to a
+        temporary file and parsed like an upload.
+        """
+        max_bytes = self.app_settings.max_url_content_size_bytes
+        timeout_seconds = self.app_settings.url_fetch_timeout_seconds
+        deadline = time.monotonic() + timeout_seconds
         
-        return document
+        async def stream_bytes(response: httpx.Response) -> AsyncIterator[bytes]:
+            received = 0
+            async for data in response.aiter_bytes(_READ_BLOCK_CHARS):
+                received += len(data)
+                if received > max_bytes:
+                    raise ValueError(f"Content at {url} exceeds the maximum size of {max_bytes} bytes")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Download of {url} exceeded {timeout_seconds}s")
+                yield data
+        
+        async with httpx.AsyncClient(timeout=timeout_seconds, follow_redirects=True) as client:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                content_length = int(response.headers.get("content-length") or 0)
+                if content_length > max_bytes:
+                    raise ValueError(f"Content at {url} exceeds the maximum size of {max_bytes} bytes")
+                
+                if document_type in (DocumentType.PDF, DocumentType.DOCX):
+                    fd, temp_path = tempfile.mkstemp(suffix=f".{document_type.value}")
+                    os.close(fd)
+                    try:
+                        async with aiofiles.open(temp_path, "wb") as f:
+                            async for data in stream_bytes(response):
+                                await f.write(data)
+                        async for block in self._iter_file_text(Path(temp_path), document_type, executor):
+                            yield block
+                    finally:
+                        os.unlink(temp_path)
+                    return
+                
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                async for data in stream_bytes(response):
+                    if text := decoder.decode(data):
+                        yield text
+                if text := decoder.decode(b"", final=True):
+                    yield text
     
     def _generate_doc_hash(self, content: str) -> str:
         """Generate unique hash for document content"""
         return hashlib.sha256(content.encode()).hexdigest()
-    
-    def _extract_relationships(self, node: TextNode) -> Dict[str, Any]:
-        """Extract node relationships for metadata"""
-        relationships = {}
-        if hasattr(node, 'relationships'):
-            for rel_type, rel_node in node.relationships.items():
-                relationships[rel_type.value] = rel_node.node_id if rel_node else None
-        return relationships
@@ -0,0 +1,124 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from common.handlers import BaseHandler
+from common.config import CommonAppSettings
+from ..models import DocumentIngestionRequest, ChunkModel
+from .document_processor import DocumentProcessorHandler, split_text
+from .chunk_enricher import ChunkEnricherHandler
+
+# End-of-stream marker between stages
+_DONE = object()
+
+
+class IngestionPipelineHandler(BaseHandler):
+    """
+    Staged ingestion: parse -> chunk -> enrich -> embed, connected by bounded
+    queues so every stage works on a different part of the document at once.
+
+    CPU-bound stages (file parsing, sentence splitting, spaCy enrichment) run in
+    the given executor, normally a process pool, so the event loop stays free for
+    other tasks and WebSockets. The embed stage hands each batch to `on_batch`;
+    vectors are upserted when the embedding results come back, which overlaps
+    Qdrant writes with the parsing of later sections.
+    """
+
+    def __init__(
+        self,
+        app_settings: CommonAppSettings,
+        document_processor: DocumentProcessorHandler,
+        chunk_enricher: ChunkEnricherHandler,
+        executor: Optional[Executor] = None
+    ):
+        super().__init__(app_settings)
+        self.document_processor = document_processor
+        self.chunk_enricher = chunk_enricher
+        self.executor = executor
+        self.queue_size = app_settings.pipeline_queue_size
+        self.section_chars = app_settings.pipeline_section_chars
+        # Enrichment is the heaviest stage: one concurrent batch per CPU worker
+        self.enrich_concurrency = max(1, app_settings.pipeline_cpu_workers)
+
+    async def run(
+        self,
+        request: DocumentIngestionRequest,
+        document_id: str,
+        agent_id: str,
+        batch_size: int,
+        on_batch: Callable[[List[ChunkModel]], Awaitable[None]],
+        on_chunking_complete: Callable[[Dict[str, int]], Awaitable[None]],
+        skip_chunk_ids: Optional[Set[str]] = None
+    ) -> int:
+        """
+        Run the pipeline for one document. Returns the number of chunks produced.
+
+        `on_chunking_complete(chunk_indices)` receives the chunk_index of every
+        chunk id produced and is awaited before the last batch is handed to
+        `on_batch`, so the final total is known before the last embedding result
+        can arrive. Chunks in `skip_chunk_ids` (already stored, unchanged) are
+        neither enriched nor embedded.
+        """
+        loop = asyncio.get_running_loop()
+        sections_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        chunks_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        enriched_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        total_chunks = 0
+        chunk_indices: Dict[str, int] = {}
+        content_counts: Dict[str, int] = {}
+
+        async def parse():
+            async for section in self.document_processor.iter_sections(request, self.executor, self.section_chars):
+                await sections_queue.put(section)
+            await sections_queue.put(_DONE)
+
+        async def chunk():
+            nonlocal total_chunks
+            while (item := await sections_queue.get()) is not _DONE:
+                offset, text = item
+                nodes = await loop.run_in_executor(
+                    self.executor, split_text, text, request.chunk_size, request.chunk_overlap
+                )
+                chunks = self.document_processor.build_chunks(
+                    request, document_id, agent_id, nodes, total_chunks, offset, content_counts
+                )
+                total_chunks += len(chunks)
+                chunk_indices.update((c.chunk_id, c.chunk_index) for c in chunks)
+                if skip_chunk_ids:
+                    chunks = [c for c in chunks if c.chunk_id not in skip_chunk_ids]
+                for i in range(0, len(chunks), batch_size):
+                    await chunks_queue.put(chunks[i:i + batch_size])
+            for _ in range(self.enrich_concurrency):
+                await chunks_queue.put(_DONE)
+
+        async def enrich():
+            while (batch := await chunks_queue.get()) is not _DONE:
+                await enriched_queue.put(await self.chunk_enricher.enrich_chunks(batch, self.executor))
+
+        async def enrich_all():
+            await asyncio.gather(*(enrich() for _ in range(self.enrich_concurrency)))
+            await enriched_queue.put(_DONE)
+
+        async def embed():
+            # One batch is held back so the total can be published before it is sent
+            pending = None
+            while (batch := await enriched_queue.get()) is not _DONE:
+                if pending is not None:
+                    await on_batch(pending)
+                pending = batch
+            await on_chunking_complete(chunk_indices)
+            if pending is not None:
+                await on_batch(pending)
+
+        stages = [asyncio.create_task(stage()) for stage in (parse, chunk, enrich_all, embed)]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+
+        self._logger.info(f"Pipeline finished for document {document_id}: {total_chunks} chunks for agent {agent_id}")
+        return total_chunks
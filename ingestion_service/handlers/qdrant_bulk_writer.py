@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import PointStruct
+
+
+class QdrantBulkWriter:
+    """
+    Coalesces the points of concurrent embedding callbacks into sized upserts
+    sent with `wait=False`.
+
+    Points are buffered until `batch_size` is reached or `linger_ms` expires, then
+    uploaded in up to `max_parallel` concurrent requests. Qdrant only acknowledges
+    them (the operation is queued in its WAL); the highest operation id seen is
+    kept so the caller can confirm that the document is indexed once, at the end,
+    instead of once per batch.
+    """
+
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        collection_name: str,
+        batch_size: int = 256,
+        max_parallel: int = 4,
+        linger_ms: int = 50
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.linger_seconds = linger_ms / 1000
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._pending: List[Tuple[List[PointStruct], asyncio.Future]] = []
+        self._pending_points = 0
+        self._linger_task: Optional[asyncio.Task] = None
+        # Referenced until done so they are not garbage-collected and can be awaited on close
+        self._uploads: Set[asyncio.Task] = set()
+        self.last_operation_id: Optional[int] = None
+        self._logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    async def write(self, points: List[PointStruct]) -> List[str]:
+        """Queue points for upload. Returns the ids of the points that could not be written."""
+        if not points:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((points, future))
+        self._pending_points += len(points)
+
+        if self._pending_points >= self.batch_size:
+            self._flush()
+        elif self._linger_task is None:
+            self._linger_task = asyncio.create_task(self._linger())
+        return await future
+
+    async def _linger(self):
+        await asyncio.sleep(self.linger_seconds)
+        self._linger_task = None
+        self._flush()
+
+    def _flush(self):
+        if self._linger_task is not None:
+            self._linger_task.cancel()
+            self._linger_task = None
+        pending, self._pending, self._pending_points = self._pending, [], 0
+        if pending:
+            upload = asyncio.create_task(self._upload(pending))
+            self._uploads.add(upload)
+            upload.add_done_callback(self._uploads.discard)
+
+    async def close(self):
+        """Send what is still buffered and wait for the uploads in flight."""
+        self._flush()
+        if self._uploads:
+            await asyncio.gather(*self._uploads, return_exceptions=True)
+
+    async def _upload(self, pending: List[Tuple[List[PointStruct], asyncio.Future]]):
+        points = [point for batch, _ in pending for point in batch]
+        batches = [points[i:i + self.batch_size] for i in range(0, len(points), self.batch_size)]
+        results = await asyncio.gather(*(self._upsert(batch) for batch in batches))
+        failed_ids = {point_id for batch_failed in results for point_id in batch_failed}
+
+        for batch, future in pending:
+            if not future.done():
+                future.set_result([str(point.id) for point in batch if str(point.id) in failed_ids])
+
+    async def _upsert(self, points: List[PointStruct]) -> List[str]:
+        async with self._semaphore:
+            try:
+                result = await self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=False
+                )
+                if result.operation_id is not None:
+                    self.last_operation_id = max(self.last_operation_id or 0, result.operation_id)
+                return []
+            except Exception as e:
+                self._logger.error(f"Error upserting {len(points)} points: {e}")
+                return [str(point.id) for point in points]
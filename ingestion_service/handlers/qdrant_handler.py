@@ -1,17 +1,23 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
+import time
 from datetime import datetime
 
 from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct, 
-    Filter, FieldCondition, MatchValue, PointIdsList
+    Filter, FieldCondition, MatchValue, PointIdsList,
+    SparseVectorParams, SparseVector, Modifier,
+    SetPayload, SetPayloadOperation
 )
 import numpy as np
 
 from common.handlers import BaseHandler
 from common.config import CommonAppSettings
+from common.utils.sparse_encoder import SPARSE_VECTOR_NAME, encode_document
 from ..models import ChunkModel
+from .qdrant_bulk_writer import QdrantBulkWriter
 
 
 class QdrantHandler(BaseHandler):
@@ -27,6 +33,17 @@ class QdrantHandler(BaseHandler):
         self.collection_name = collection_name
         self.client = qdrant_client  
         self.vector_size = 1536  # Default for OpenAI embeddings
+        # Sparse (BM25-style) vector stored next to the dense one for hybrid search
+        self.sparse_enabled = app_settings.sparse_vectors_enabled
+        # Points of concurrent callbacks are coalesced and written without waiting for indexing
+        self.bulk_writer = QdrantBulkWriter(
+            client=qdrant_client,
+            collection_name=collection_name,
+            batch_size=app_settings.qdrant_upsert_batch_size,
+            max_parallel=app_settings.qdrant_upsert_parallelism,
+            linger_ms=app_settings.qdrant_upsert_linger_ms
+        )
+        self.confirm_timeout_seconds = app_settings.qdrant_confirm_timeout_seconds
         self._initialized = False
         
     async def initialize(self):
@@ -46,7 +63,11 @@ class QdrantHandler(BaseHandler):
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
-                    )
+                    ),
+                    # IDF is computed by Qdrant over the whole collection
+                    sparse_vectors_config={
+                        SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+                    } if self.sparse_enabled else None
                 )
                 
                 # Create payload indices for efficient filtering
@@ -74,13 +95,27 @@ class QdrantHandler(BaseHandler):
                 self._logger.info(f"Collection '{self.collection_name}' created with indices")
             else:
                 self._logger.info(f"Collection '{self.collection_name}' already exists")
+                if self.sparse_enabled:
+                    info = await self.client.get_collection(self.collection_name)
+                    sparse_vectors = info.config.params.sparse_vectors or {}
+                    if SPARSE_VECTOR_NAME not in sparse_vectors:
+                        # Collections created before hybrid search cannot gain a sparse vector in place
+                        self._logger.warning(
+                            f"Collection '{self.collection_name}' has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                            "storing dense vectors only. Recreate the collection to enable hybrid search."
+                        )
+                        self.sparse_enabled = False
                 
         except Exception as e:
             self._logger.error(f"Error ensuring collection '{self.collection_name}': {e}")
             raise
     
-    async def store_chunks(self, chunks: List[ChunkModel]) -> Dict[str, Any]:
-        """Store chunks with embeddings in Qdrant."""
+    async def store_chunks(self, chunks: List[ChunkModel], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store chunks with embeddings in Qdrant. `run_id` is stamped on every point
+        so confirm_document can tell this run's writes from older points with the
+        same (deterministic) ids.
+        """
         if not chunks:
             return {"stored": 0, "failed": 0, "failed_ids": []}
 
@@ -107,29 +142,35 @@ class QdrantHandler(BaseHandler):
             # Se fusiona la metadata custom, que debe contener el agent_id
             if chunk.metadata:
                 payload.update(chunk.metadata)
+            if run_id:
+                payload["ingestion_run_id"] = run_id
+
+            vector = chunk.embedding
+            if self.sparse_enabled and chunk.keywords:
+                indices, values = encode_document(chunk.content, chunk.keywords)
+                vector = {
+                    "": chunk.embedding,
+                    SPARSE_VECTOR_NAME: SparseVector(indices=indices, values=values)
+                }
 
             point = PointStruct(
                 id=chunk.chunk_id,
-                vector=chunk.embedding,
+                vector=vector,
                 payload=payload
             )
             points.append(point)
 
+        stored = len(points)
         if points:
-            try:
-                await self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=points,
-                    wait=True
-                )
-                self._logger.info(f"Stored {len(points)} chunks in Qdrant for agent_id: {agent_id}")
-            except Exception as e:
-                self._logger.error(f"Error storing chunks: {e}")
-                # If the batch fails, we consider all points in it as failed
-                failed_chunks.extend([p.id for p in points])
+            # Acknowledged, not yet indexed: durability is confirmed per document
+            # with confirm_document
+            failed_ids = await self.bulk_writer.write(points)
+            stored -= len(failed_ids)
+            failed_chunks.extend(failed_ids)
+            self._logger.info(f"Queued {stored} chunks for Qdrant ({len(failed_ids)} failed)")
 
         return {
-            "stored": len(points) - len(failed_chunks),
+            "stored": stored,
             "failed": len(failed_chunks),
             "failed_ids": failed_chunks,
         }
@@ -191,6 +232,115 @@ class QdrantHandler(BaseHandler):
             self._logger.error(f"Error deleting document {document_id}: {e}")
             raise
     
+    async def close(self):
+        """Wait for the buffered upserts before shutting down."""
+        await self.bulk_writer.close()
+    
+    async def confirm_document(
+        self,
+        tenant_id: str,
+        document_id: str,
+        collection_id: str,
+        run_id: Optional[str],
+        expected_chunks: int,
+        poll_interval_seconds: float = 0.5
+    ) -> bool:
+        """
+        Wait until the points written by an ingestion run are applied: an exact
+        count of the document's points stamped with `run_id`. Points left by a
+        previous ingestion share the ids but not the run id, so they do not
+        count. Replaces waiting on every upsert. Returns False on timeout.
+        """
+        if expected_chunks <= 0:
+            return True
+        must_conditions = [
+            FieldCondition(key="document_id", match=MatchValue(value=document_id)),
+            FieldCondition(key="collection_id", match=MatchValue(value=collection_id)),
+            FieldCondition(key="tenant_id", match=MatchValue(value=tenant_id))
+        ]
+        if run_id:
+            must_conditions.append(FieldCondition(key="ingestion_run_id", match=MatchValue(value=run_id)))
+        count_filter = Filter(must=must_conditions)
+        deadline = time.monotonic() + self.confirm_timeout_seconds
+        while True:
+            result = await self.client.count(
+                collection_name=self.collection_name,
+                count_filter=count_filter,
+                exact=True
+            )
+            if result.count >= expected_chunks:
+                self._logger.info(
+                    f"Document {document_id}: {result.count} chunks confirmed in Qdrant "
+                    f"(last operation id: {self.bulk_writer.last_operation_id})"
+                )
+                return True
+            if time.monotonic() >= deadline:
+                self._logger.warning(
+                    f"Document {document_id}: only {result.count}/{expected_chunks} chunks applied "
+                    f"after {self.confirm_timeout_seconds}s"
+                )
+                return False
+            await asyncio.sleep(poll_interval_seconds)
+
+    async def get_document_chunks(
+        self,
+        tenant_id: str,
+        document_id: str,
+        collection_id: str,
+        agent_id: Optional[str] = None,
+        page_size: int = 1000
+    ) -> Dict[str, int]:
+        """Return {chunk_id: chunk_index} of the points already stored for a document."""
+        must_conditions = [
+            FieldCondition(key="document_id", match=MatchValue(value=document_id)),
+            FieldCondition(key="collection_id", match=MatchValue(value=collection_id)),
+            FieldCondition(key="tenant_id", match=MatchValue(value=tenant_id))
+        ]
+        if agent_id:
+            must_conditions.append(FieldCondition(key="agent_id", match=MatchValue(value=agent_id)))
+
+        chunks = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=Filter(must=must_conditions),
+                limit=page_size,
+                offset=offset,
+                with_payload=["chunk_index"],
+                with_vectors=False
+            )
+            for point in points:
+                chunks[str(point.id)] = (point.payload or {}).get("chunk_index")
+            if offset is None:
+                break
+        return chunks
+
+    async def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete points by chunk id."""
+        if not chunk_ids:
+            return
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=chunk_ids),
+            wait=True
+        )
+        self._logger.info(f"Deleted {len(chunk_ids)} stale chunks")
+
+    async def update_chunk_indices(self, chunk_indices: Dict[str, int]) -> None:
+        """Set a new chunk_index on unchanged chunks whose position moved, in one batch request."""
+        if not chunk_indices:
+            return
+        await self.client.batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload={"chunk_index": index}, points=[chunk_id]))
+                for chunk_id, index in chunk_indices.items()
+            ],
+            wait=True
+        )
+        self._logger.info(f"Updated chunk_index of {len(chunk_indices)} moved chunks")
+
     async def get_collection_stats(
         self, 
         tenant_id: str, 
@@ -0,0 +1,104 @@
+import uuid
+from typing import Iterable, Optional
+
+from redis.asyncio import Redis as AIORedis
+
+from common.handlers import BaseHandler
+from common.config import CommonAppSettings
+from common.clients import RedisStateManager
+from common.clients.redis.cache_key_manager import CacheKeyManager
+from ..models import IngestionCheckpoint
+
+# Lease operations that only apply while the caller still owns the lease: a
+# worker whose lease expired and was taken over must not touch the new owner's.
+# KEYS: lease; ARGV: owner id (and the TTL for the refresh)
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_REFRESH_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class TaskCheckpointHandler(BaseHandler):
+    """
+    Checkpoints and ownership leases of ingestion tasks.
+
+    The checkpoint records what a restarted worker needs to resume a task
+    without redoing finished work: the original action, the chunks stored
+    before the task started and, once parsing finished, the manifest of every
+    chunk id. Progress within the embed/store stages is not duplicated here:
+    chunks in flight stay in the staging hash and accounted chunks in the
+    progress set until the task ends.
+
+    A task is owned by the worker holding its lease (SET NX with a short TTL,
+    refreshed while the task is queued or running). A task without a lease
+    has lost its worker and can be claimed and resumed by another one.
+    """
+
+    def __init__(self, app_settings: CommonAppSettings, direct_redis_conn: AIORedis):
+        super().__init__(app_settings, direct_redis_conn)
+        self.key_manager = CacheKeyManager(
+            environment=app_settings.environment,
+            service_name=app_settings.service_name
+        )
+        self.state_manager = RedisStateManager[IngestionCheckpoint](
+            redis_conn=direct_redis_conn,
+            state_model=IngestionCheckpoint,
+            app_settings=app_settings
+        )
+        self.lease_seconds = app_settings.ingestion_task_lease_seconds
+        # Identifies this worker as lease owner
+        self.owner_id = str(uuid.uuid4())
+        self._release_lease = direct_redis_conn.register_script(_RELEASE_LEASE_SCRIPT)
+        self._refresh_lease = direct_redis_conn.register_script(_REFRESH_LEASE_SCRIPT)
+
+    def _checkpoint_key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("task_checkpoint", task_id)
+
+    def _lease_key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("task_lease", task_id)
+
+    async def load(self, task_id: str) -> Optional[IngestionCheckpoint]:
+        return await self.state_manager.load_state(self._checkpoint_key(task_id))
+
+    async def save(self, checkpoint: IngestionCheckpoint) -> None:
+        await self.state_manager.save_state(
+            self._checkpoint_key(checkpoint.task_id),
+            checkpoint,
+            expiration_seconds=86400  # Same lifetime as the task state
+        )
+
+    async def acquire_lease(self, task_id: str) -> bool:
+        """Take ownership of the task if no live worker holds it."""
+        return bool(await self.direct_redis_conn.set(
+            self._lease_key(task_id), self.owner_id, nx=True, ex=self.lease_seconds
+        ))
+
+    async def refresh_leases(self, task_ids: Iterable[str]) -> None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        async with self.direct_redis_conn.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                await self._refresh_lease(
+                    keys=[self._lease_key(task_id)],
+                    args=[self.owner_id, self.lease_seconds],
+                    client=pipe
+                )
+            await pipe.execute()
+
+    async def release_lease(self, task_id: str) -> None:
+        """Drop the lease only if this worker still owns it."""
+        await self._release_lease(keys=[self._lease_key(task_id)], args=[self.owner_id])
+
+    async def clear(self, task_id: str) -> None:
+        """Drop the checkpoint and the lease of a finished task."""
+        await self.direct_redis_conn.delete(self._checkpoint_key(task_id), self._lease_key(task_id))
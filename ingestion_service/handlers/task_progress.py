@@ -0,0 +1,163 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Set, Tuple
+
+from redis.asyncio import Redis as AIORedis
+
+from common.handlers import BaseHandler
+from common.config import CommonAppSettings
+from common.clients.redis.cache_key_manager import CacheKeyManager
+from ..models import IngestionTask
+
+# Counter fields of IngestionTask kept in the progress hash
+_COUNTER_FIELDS = ("total_chunks", "processed_chunks", "failed_chunks", "unchanged_chunks", "deleted_chunks")
+
+# Counts only the chunk ids not accounted for yet, so a redelivered embedding
+# result does not add to the counters twice.
+# KEYS: progress hash, accounted set
+# ARGV: TTL, updated_at, number of processed ids, processed ids..., failed ids...
+# Returns: {newly accounted ids, HGETALL of the progress hash}
+_INCREMENT_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+local processed_count = tonumber(ARGV[3])
+local processed, failed = 0, 0
+local added = {}
+for i = 4, #ARGV do
+    if redis.call('SADD', KEYS[2], ARGV[i]) == 1 then
+        added[#added + 1] = ARGV[i]
+        if i - 3 <= processed_count then
+            processed = processed + 1
+        else
+            failed = failed + 1
+        end
+    end
+end
+redis.call('EXPIRE', KEYS[2], ttl)
+redis.call('HINCRBY', KEYS[1], 'processed_chunks', processed)
+redis.call('HINCRBY', KEYS[1], 'failed_chunks', failed)
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ttl)
+return {added, redis.call('HGETALL', KEYS[1])}
+"""
+
+
+class TaskProgressHandler(BaseHandler):
+    """
+    Chunk counters of an ingestion task kept as fields of one Redis hash and
+    updated with HINCRBY, so concurrent embedding callbacks (on any worker)
+    never overwrite each other's progress.
+
+    The task JSON stays the source of truth for everything else (status,
+    request, result); `apply` overlays the counters on a loaded task.
+
+    The ids of the chunks already counted (stored or failed) are kept in a set
+    updated by the same script, so a resumed task skips exactly those and a
+    redelivered result is not counted twice.
+    """
+
+    def __init__(self, app_settings: CommonAppSettings, direct_redis_conn: AIORedis):
+        super().__init__(app_settings, direct_redis_conn)
+        self.key_manager = CacheKeyManager(
+            environment=app_settings.environment,
+            service_name=app_settings.service_name
+        )
+        # Same lifetime as the task state
+        self.ttl_seconds = 86400
+        self._increment = direct_redis_conn.register_script(_INCREMENT_SCRIPT)
+
+    def _key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("task_progress", task_id)
+
+    def _accounted_key(self, task_id: str) -> str:
+        return self.key_manager.get_cache_key("task_progress_accounted", task_id)
+
+    async def increment(
+        self,
+        task_id: str,
+        processed_ids: List[str],
+        failed_ids: List[str]
+    ) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Atomically record the chunks as accounted for and add those not counted
+        before to the processed/failed counters. Returns all counters after the
+        update and the ids that were newly accounted for.
+        """
+        added, counters = await self._increment(
+            keys=[self._key(task_id), self._accounted_key(task_id)],
+            args=[self.ttl_seconds, int(time.time()), len(processed_ids), *processed_ids, *failed_ids]
+        )
+        counters = dict(zip(counters[::2], counters[1::2]))
+        return self._decode(counters), [
+            chunk_id.decode() if isinstance(chunk_id, bytes) else chunk_id for chunk_id in added
+        ]
+
+    async def set_totals(
+        self,
+        task_id: str,
+        total_chunks: int,
+        chunking_complete: bool = False,
+        unchanged_chunks: int = 0,
+        deleted_chunks: int = 0
+    ) -> Dict[str, int]:
+        """Record the running chunk total; the final one also sets the chunking summary. Returns all counters."""
+        mapping = {"total_chunks": total_chunks, "updated_at": int(time.time())}
+        if chunking_complete:
+            mapping.update(
+                chunking_complete=1,
+                unchanged_chunks=unchanged_chunks,
+                deleted_chunks=deleted_chunks
+            )
+        key = self._key(task_id)
+        async with self.direct_redis_conn.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.hgetall(key)
+            *_, counters = await pipe.execute()
+        return self._decode(counters)
+
+    async def get(self, task_id: str) -> Dict[str, int]:
+        return self._decode(await self.direct_redis_conn.hgetall(self._key(task_id)))
+
+    async def accounted_ids(self, task_id: str) -> Set[str]:
+        """Ids of the chunks whose embedding result has already been counted."""
+        return {
+            chunk_id.decode() if isinstance(chunk_id, bytes) else chunk_id
+            for chunk_id in await self.direct_redis_conn.smembers(self._accounted_key(task_id))
+        }
+
+    async def clear(self, task_id: str) -> None:
+        """Reset the counters, e.g. when a task id is reused for a new ingestion."""
+        await self.direct_redis_conn.delete(self._key(task_id), self._accounted_key(task_id))
+
+    async def claim_completion(self, task_id: str) -> bool:
+        """True for exactly one caller, so a task is completed once even if several callbacks see it finished."""
+        return bool(await self.direct_redis_conn.hsetnx(self._key(task_id), "completion_claimed", 1))
+
+    @staticmethod
+    def is_finished(counters: Dict[str, int]) -> bool:
+        """Chunking is over and every chunk has been stored, failed or kept."""
+        return bool(counters.get("chunking_complete")) and (
+            counters.get("processed_chunks", 0)
+            + counters.get("failed_chunks", 0)
+            + counters.get("unchanged_chunks", 0)
+        ) >= counters.get("total_chunks", 0)
+
+    @staticmethod
+    def apply(task: IngestionTask, counters: Dict[str, int]) -> IngestionTask:
+        """Overlay the counters (and the time of the last counter update) on the task model."""
+        for field in _COUNTER_FIELDS:
+            if field in counters:
+                setattr(task, field, counters[field])
+        if "chunking_complete" in counters:
+            task.chunking_complete = bool(counters["chunking_complete"])
+        if "updated_at" in counters:
+            updated_at = datetime.fromtimestamp(counters["updated_at"], tz=timezone.utc).replace(tzinfo=None)
+            task.updated_at = max(task.updated_at, updated_at)
+        return task
+
+    @staticmethod
+    def _decode(counters: Dict) -> Dict[str, int]:
+        return {
+            (field.decode() if isinstance(field, bytes) else field): int(value)
+            for field, value in counters.items()
+        }
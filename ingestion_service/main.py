@@ -17,19 +17,19 @@ from .workers import IngestionWorker
 from .api import router
 from .dependencies import set_ingestion_service, set_ws_manager
 from .services import IngestionService
-from .websocket import WebSocketManager
 
 # Global instances
 redis_manager: RedisManager = None
 redis_client: BaseRedisClient = None
 ingestion_worker: IngestionWorker = None
+ingestion_service: IngestionService = None
 settings: IngestionServiceSettings = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global redis_manager, redis_client, ingestion_worker, settings
+    global redis_manager, redis_client, ingestion_worker, ingestion_service, settings
     
     # Startup
     settings = IngestionServiceSettings()
@@ -49,24 +49,27 @@ async def lifespan(app: FastAPI):
             settings=settings
         )
         
-        # Initialize WebSocket manager
-        ws_manager = WebSocketManager()
-        set_ws_manager(ws_manager)
-        
-        # Initialize service
+        # Initialize service: a single instance shared by the API and the worker,
+        # so every queued task has its lease refreshed by the same background loops
         ingestion_service = IngestionService(
             app_settings=settings,
             service_redis_client=redis_client,
             direct_redis_conn=redis_conn
         )
+        await ingestion_service.initialize()
+        ingestion_service.start_background_tasks()
         set_ingestion_service(ingestion_service)
         
+        # Progress notifications go through the service's WebSocket manager
+        set_ws_manager(ingestion_service.ws_manager)
+        
         # Initialize and start worker
         if settings.auto_start_workers:
             ingestion_worker = IngestionWorker(
                 app_settings=settings,
                 async_redis_conn=redis_conn,
-                redis_client=redis_client
+                redis_client=redis_client,
+                ingestion_service=ingestion_service
             )
             await ingestion_worker.initialize()
             await ingestion_worker.start()
@@ -84,6 +87,9 @@ async def lifespan(app: FastAPI):
         if ingestion_worker:
             await ingestion_worker.stop()
         
+        if ingestion_service:
+            await ingestion_service.shutdown()
+        
         if redis_manager:
             await redis_manager.close()
         
@@ -7,6 +7,8 @@ from .ingestion_models import (
     ChunkModel,
     ProcessingProgress,
     IngestionTask,
+    CheckpointStage,
+    IngestionCheckpoint,
     BatchDocumentIngestionRequest,
     BatchIngestionResponse,
 )
@@ -18,6 +20,8 @@ __all__ = [
     "ChunkModel",
     "ProcessingProgress",
     "IngestionTask",
+    "CheckpointStage",
+    "IngestionCheckpoint",
     "BatchDocumentIngestionRequest",
     "BatchIngestionResponse",
 ]
\ No newline at end of file
@@ -15,6 +15,12 @@ class IngestionStatus(str, Enum):
     FAILED = "failed"
 
 
+class CheckpointStage(str, Enum):
+    QUEUED = "queued"
+    PARSING = "parsing"
+    CHUNKED = "chunked"
+
+
 class DocumentType(str, Enum):
     PDF = "pdf"
     DOCX = "docx"
@@ -40,6 +46,10 @@ class DocumentIngestionRequest(BaseModel):
     content: Optional[str] = Field(None, description="Direct text content")
     url: Optional[HttpUrl] = Field(None, description="URL to fetch content from")
     
+    # Re-ingestion of an existing document
+    document_id: Optional[str] = Field(None, description="Existing document to re-ingest; a new one is created if omitted")
+    incremental: bool = Field(default=True, description="On re-ingestion, only embed new or changed chunks (unchanged ones are kept)")
+    
     # Chunking parameters
     chunk_size: int = Field(default=512, description="Size of chunks in tokens")
     chunk_overlap: int = Field(default=50, description="Overlap between chunks")
@@ -124,6 +134,7 @@ class IngestionTask(BaseModel):
     user_id: str
     session_id: str
     document_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    run_id: Optional[str] = Field(None, description="Unique per submission (the task id repeats on re-ingestion); stamped on the points it writes")
     
     status: IngestionStatus = Field(default=IngestionStatus.PENDING)
     request: DocumentIngestionRequest
@@ -131,6 +142,9 @@ class IngestionTask(BaseModel):
     total_chunks: int = Field(default=0)
     processed_chunks: int = Field(default=0)
     failed_chunks: int = Field(default=0, description="Number of chunks that failed during processing")
+    chunking_complete: bool = Field(default=False, description="All chunks have been produced, so total_chunks is final")
+    unchanged_chunks: int = Field(default=0, description="Chunks kept from a previous ingestion (incremental mode)")
+    deleted_chunks: int = Field(default=0, description="Stale chunks of a previous ingestion that were deleted")
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -141,6 +155,16 @@ class IngestionTask(BaseModel):
     result: Optional[Dict[str, Any]] = None
 
 
+class IngestionCheckpoint(BaseModel):
+    """Resumable state of an ingestion task, saved when each stage completes"""
+    task_id: str
+    stage: CheckpointStage = Field(default=CheckpointStage.QUEUED)
+    action: Dict[str, Any] = Field(..., description="Original ingest DomainAction, used to restart the task")
+    existing_chunks: Dict[str, int] = Field(default_factory=dict, description="Chunks stored before the task started (chunk_id -> chunk_index)")
+    chunk_manifest: Optional[Dict[str, int]] = Field(None, description="Every chunk produced by parsing (chunk_id -> chunk_index), once chunking is complete")
+    resume_count: int = Field(default=0, description="Times the task was restarted after its worker was lost")
+
+
 class BatchDocumentIngestionRequest(BaseModel):
     """Model for batch document ingestion request"""
     # Shared context for all documents
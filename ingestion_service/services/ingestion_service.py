@@ -1,6 +1,11 @@
 import asyncio
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, List, Set
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
 from qdrant_client import AsyncQdrantClient
 
@@ -8,17 +13,22 @@ from common.services import BaseService
 from common.models import DomainAction, DomainActionResponse
 from common.config import CommonAppSettings
 from common.clients import BaseRedisClient, RedisStateManager, CacheManager
+from common.clients.redis.cache_key_manager import CacheKeyManager
+from common.tiers import TierClient, TierRepository, TierLimits
 from redis.asyncio import Redis as AIORedis
 
 from ..models import (
     DocumentIngestionRequest, IngestionTask, IngestionStatus,
-    ProcessingProgress, ChunkModel
+    ProcessingProgress, ChunkModel, IngestionCheckpoint, CheckpointStage
 )
 from ..handlers import (
-    DocumentProcessorHandler, ChunkEnricherHandler, QdrantHandler
+    DocumentProcessorHandler, ChunkEnricherHandler, QdrantHandler, IngestionPipelineHandler,
+    ChunkStagingHandler, TaskProgressHandler, TaskCheckpointHandler, IngestionScheduler,
+    estimate_chunk_count
 )
-from ..websocket.manager import WebSocketManager
+from ..websocket import WebSocketManager, ProgressPublisher
 from ..clients import EmbeddingClient
+from ..utils.embedding_batching import EmbeddingBatchPlanner
 
 
 class IngestionService(BaseService):
@@ -36,6 +46,19 @@ class IngestionService(BaseService):
         self.document_processor = DocumentProcessorHandler(app_settings)
         self.chunk_enricher = ChunkEnricherHandler(app_settings)
         
+        # Process pool for the CPU-bound pipeline stages (spawn: the parent holds
+        # an event loop and open Redis/Qdrant sockets that must not be forked)
+        self.cpu_executor = ProcessPoolExecutor(
+            max_workers=app_settings.pipeline_cpu_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) if app_settings.pipeline_cpu_workers > 0 else None
+        self.ingestion_pipeline = IngestionPipelineHandler(
+            app_settings=app_settings,
+            document_processor=self.document_processor,
+            chunk_enricher=self.chunk_enricher,
+            executor=self.cpu_executor
+        )
+        
         # Initialize Qdrant client
         self.qdrant_client = AsyncQdrantClient(
             url=app_settings.qdrant_url,
@@ -55,21 +78,51 @@ class IngestionService(BaseService):
             app_settings=app_settings
         )
         
+        # Índice de tareas activas por deadline de estancamiento (sorted set)
+        self.task_deadlines_key = CacheKeyManager(
+            environment=app_settings.environment,
+            service_name=app_settings.service_name
+        ).get_cache_key("task_deadlines", "active")
+        
         # Initialize embedding client
         self.embedding_client = EmbeddingClient(
             app_settings=app_settings,
             redis_client=service_redis_client
         )
         
-        # WebSocket manager for progress updates
+        # Tier limits (embedding batch size and scheduling weight per tenant)
+        self.tier_client = TierClient(TierRepository())
+        
+        # Documents start under a global cap, fairly shared between tenants
+        self.scheduler = IngestionScheduler(max_concurrent=app_settings.max_concurrent_tasks)
+        
+        # Checkpoints and leases: a task whose worker is lost is resumed by another
+        self.task_checkpoint = TaskCheckpointHandler(
+            app_settings=app_settings,
+            direct_redis_conn=direct_redis_conn
+        )
+        # Tasks queued or running in this worker (their leases are kept alive)
+        self._leased_tasks: Set[str] = set()
+        
+        # WebSocket manager for progress updates, throttled per task
         self.ws_manager = WebSocketManager()
+        self._background_tasks: List[asyncio.Task] = []
+        self._confirmations: Set[asyncio.Task] = set()
+        self.progress_publisher = ProgressPublisher(
+            self.ws_manager,
+            min_interval_seconds=app_settings.progress_broadcast_interval_seconds
+        )
         
-        # CORRECCIÓN 6: Cache manager para almacenamiento temporal de chunks
-        self.chunk_cache_manager = CacheManager[ChunkModel](
-            redis_conn=direct_redis_conn,
-            state_model=ChunkModel,
+        # Contadores de progreso atómicos (HINCRBY) por tarea
+        self.task_progress = TaskProgressHandler(
+            app_settings=app_settings,
+            direct_redis_conn=direct_redis_conn
+        )
+        
+        # Staging de chunks pendientes de embedding: un hash de Redis por tarea
+        self.chunk_staging = ChunkStagingHandler(
             app_settings=app_settings,
-            default_ttl=3600  # TTL de 1 hora
+            direct_redis_conn=direct_redis_conn
         )
         
         self._logger.info("IngestionService initialized")
@@ -80,13 +133,6 @@ class IngestionService(BaseService):
         await self.qdrant_handler.initialize()
         
         # Initialize cache managers
-        from ingestion_service.models import ChunkModel
-        self.chunk_cache_manager = CacheManager(
-            redis_conn=self.direct_redis_conn,
-            state_model=ChunkModel,
-            app_settings=self.app_settings
-        )
-        
         from ingestion_service.models import IngestionTask
         self.task_cache_manager = CacheManager(
             redis_conn=self.direct_redis_conn,
@@ -134,10 +180,9 @@ class IngestionService(BaseService):
             f"document={request.document_name}, tenant={request.tenant_id}"
         )
         
-        # Define la duración del timeout para la tarea (idealmente desde app_settings)
-        task_timeout_hours = getattr(self.app_settings, 'ingestion_task_timeout_hours', 2)
+        # Define la duración del timeout para la tarea
+        task_timeout_hours = self.app_settings.ingestion_task_timeout_hours
 
-        # Create task CON agent_id y expires_at
         # Create task CON agent_id y expires_at
         task = IngestionTask(
             task_id=str(action.task_id),
@@ -145,63 +190,171 @@ class IngestionService(BaseService):
             user_id=action.user_id,
             session_id=action.session_id,
             agent_id=request.agent_id,  # NUEVO: Incluir agent_id
+            **({"document_id": request.document_id} if request.document_id else {}),
+            run_id=str(uuid.uuid4()),
             request=request,
-            status=IngestionStatus.PROCESSING,
+            status=IngestionStatus.PENDING,
             expires_at=datetime.utcnow() + timedelta(hours=task_timeout_hours)
         )
         
-        # Save task state
-        await self.task_state_manager.save_state(
-            f"task:{task.task_id}",
-            task,
-            expiration_seconds=86400  # 24 hours
-        )
+        # Re-ingestions of an existing document get a deterministic task id: a re-submission
+        # while it is still queued or running is not started twice
+        if not await self.task_checkpoint.acquire_lease(task.task_id):
+            self._logger.info(f"Task {task.task_id} is already queued or running")
+            return {
+                "task_id": task.task_id,
+                "document_id": task.document_id,
+                "status": "already_processing",
+                "agent_id": task.agent_id,
+                "message": "Document ingestion already in progress"
+            }
+        
+        # Save task state (and reset what a previous run with the same id left behind)
+        await self.task_progress.clear(task.task_id)
+        await self.chunk_staging.clear(task.task_id)
+        await self._save_task(task)
+        await self.task_checkpoint.save(IngestionCheckpoint(
+            task_id=task.task_id,
+            action=action.model_dump(mode="json")
+        ))
         
-        # Start async processing CON rag_config
-        asyncio.create_task(self._process_ingestion_task(task, action))
+        # Queue for processing CON rag_config: the scheduler starts it when a slot is free
+        await self._schedule_task(task, action)
         
         return {
             "task_id": task.task_id,
             "document_id": task.document_id,
             "status": task.status.value,
             "agent_id": task.agent_id,  # NUEVO: Incluir en respuesta
-            "message": "Document ingestion started"
+            "message": "Document ingestion queued"
         }
     
+    async def _schedule_task(self, task: IngestionTask, action: DomainAction):
+        """Queue a task whose lease this worker holds; the scheduler starts it when a slot is free."""
+        self._leased_tasks.add(task.task_id)
+        task.status = IngestionStatus.PENDING
+        task.updated_at = datetime.utcnow()
+        await self._save_task(task)
+        
+        tier_limits = await self._tier_limits(task.tenant_id)
+        estimated_chunks = estimate_chunk_count(task.request, self.app_settings.max_chunks_per_document)
+        self.scheduler.submit(
+            tenant_id=task.tenant_id,
+            estimated_chunks=estimated_chunks,
+            weight=tier_limits.ingestion_scheduling_weight if tier_limits else 1,
+            job=lambda: self._process_ingestion_task(task, action)
+        )
+        self._logger.info(
+            f"Task {task.task_id} queued (~{estimated_chunks} chunks), "
+            f"{self.scheduler.queued} documents waiting"
+        )
+    
     async def _process_ingestion_task(self, task: IngestionTask, original_action: DomainAction):
-        """Process the ingestion task asynchronously"""
+        """
+        Process the ingestion task through the staged pipeline, resuming from its
+        checkpoint when a previous worker was interrupted: chunks already counted
+        or still in flight are skipped, so only the missing ones are embedded.
+        """
         try:
+            latest = await self.task_state_manager.load_state(f"task:{task.task_id}")
+            if latest and latest.status == IngestionStatus.FAILED:
+                # Timed out by the sweeper while waiting in the queue
+                self._logger.warning(f"Task {task.task_id} failed while queued; not processing it")
+                return
+            
+            # The processing time limit counts from the start, not from queueing
+            task.expires_at = datetime.utcnow() + timedelta(hours=self.app_settings.ingestion_task_timeout_hours)
+            
             # Update progress: Processing
             await self._update_progress(task, IngestionStatus.PROCESSING, "Loading document", 10)
             
-            # CAMBIO: Process document into chunks CON agent_id
-            chunks = await self.document_processor.process_document(
-                task.request,
-                task.document_id,
-                agent_id=task.agent_id  # NUEVO: Propagar agent_id
+            checkpoint = await self.task_checkpoint.load(task.task_id) or IngestionCheckpoint(
+                task_id=task.task_id,
+                action=original_action.model_dump(mode="json")
             )
-            task.total_chunks = len(chunks)
-            
-            # Update progress: Chunking
-            await self._update_progress(task, IngestionStatus.CHUNKING, f"Created {len(chunks)} chunks", 30)
+            if checkpoint.stage == CheckpointStage.QUEUED:
+                # Re-ingestion: chunks already stored for the document (deterministic ids)
+                if task.request.document_id:
+                    checkpoint.existing_chunks = await self.qdrant_handler.get_document_chunks(
+                        tenant_id=task.tenant_id,
+                        document_id=task.document_id,
+                        collection_id=task.request.collection_id,
+                        agent_id=task.agent_id
+                    )
+                    self._logger.info(
+                        f"Re-ingesting document {task.document_id}: {len(checkpoint.existing_chunks)} chunks stored, "
+                        f"incremental={task.request.incremental}"
+                    )
+                checkpoint.stage = CheckpointStage.PARSING
+                await self.task_checkpoint.save(checkpoint)
+            unchanged_ids = set(checkpoint.existing_chunks) if task.request.incremental else set()
             
-            # Enrich chunks with agent_id validation
-            self._logger.info(f"Enriching {len(chunks)} chunks for agent_id={task.agent_id}")
-            chunks = await self.chunk_enricher.enrich_chunks(chunks)
+            # Chunks handled before an interruption: results already counted or still in flight
+            resumed_ids = await self.task_progress.accounted_ids(task.task_id) | await self.chunk_staging.staged_ids(task.task_id)
+            if resumed_ids:
+                self._logger.info(
+                    f"Resuming task {task.task_id} from stage {checkpoint.stage.value}: "
+                    f"{len(resumed_ids)} chunks already embedded or in flight"
+                )
+            if checkpoint.stage == CheckpointStage.CHUNKED and set(checkpoint.chunk_manifest) <= unchanged_ids | resumed_ids:
+                # Every chunk was dispatched before the interruption: only their results remain
+                await self._finish_chunking(task, checkpoint, checkpoint.chunk_manifest, unchanged_ids)
+                return
             
-            # Update progress: Embedding
-            await self._update_progress(task, IngestionStatus.EMBEDDING, "Generating embeddings", 50)
+            # Embedding requests sized by estimated tokens and the tenant's tier batch limit
+            batch_planner = EmbeddingBatchPlanner(
+                max_inputs=await self._embedding_batch_limit(task.tenant_id),
+                max_tokens=self.app_settings.embedding_max_batch_tokens
+            )
+            dispatched_chunks = 0
+            chunking_done = False
             
-            # CAMBIO: Send chunks to embedding service in batches CON rag_config
-            batch_size = 10
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i+batch_size]
+            async def send(batch: List[ChunkModel]):
+                nonlocal dispatched_chunks
+                await self.chunk_staging.wait_for_window(
+                    task.task_id,
+                    self.app_settings.embedding_max_in_flight_batches,
+                    self.app_settings.embedding_in_flight_timeout_seconds
+                )
+                first_batch = dispatched_chunks == 0
+                dispatched_chunks += len(batch)
+                if checkpoint.stage != CheckpointStage.CHUNKED:
+                    await self._record_chunk_total(task, len(resumed_ids) + dispatched_chunks)
+                if first_batch:
+                    await self._update_progress(task, IngestionStatus.EMBEDDING, "Generating embeddings", 50)
+                # State will be updated when embeddings are received
                 await self._send_chunks_for_embedding(batch, task, original_action)
             
-            # State will be updated when embeddings are received
+            async def dispatch(batch: List[ChunkModel]):
+                for ready in batch_planner.add(batch):
+                    await send(ready)
+                # Flush the partial batch at the end, or right away if the embedding
+                # service is idle: batches only grow while it is the bottleneck
+                if chunking_done or await self.chunk_staging.in_flight(task.task_id) == 0:
+                    pending = batch_planner.flush()
+                    if pending:
+                        await send(pending)
+            
+            async def chunking_complete(chunk_indices: Dict[str, int]):
+                nonlocal chunking_done
+                chunking_done = True
+                await self._finish_chunking(task, checkpoint, chunk_indices, unchanged_ids)
+            
+            self._logger.info(f"Starting ingestion pipeline for task {task.task_id}, agent_id={task.agent_id}")
+            await self.ingestion_pipeline.run(
+                request=task.request,
+                document_id=task.document_id,
+                agent_id=task.agent_id,
+                batch_size=self.app_settings.pipeline_batch_size,
+                on_batch=dispatch,
+                on_chunking_complete=chunking_complete,
+                skip_chunk_ids=unchanged_ids | resumed_ids
+            )
             
         except Exception as e:
             self._logger.error(f"Error processing task {task.task_id} for agent_id={task.agent_id}: {e}")
+            task = await self._load_task(task.task_id) or task
+            await self.chunk_staging.clear(task.task_id)
             await self._update_progress(
                 task, 
                 IngestionStatus.FAILED, 
@@ -209,6 +362,83 @@ class IngestionService(BaseService):
                 task.processed_chunks / task.total_chunks * 100 if task.total_chunks > 0 else 0,
                 error=str(e)
             )
+        finally:
+            # Remaining results are handled by whichever worker receives them
+            self._leased_tasks.discard(task.task_id)
+            await self.task_checkpoint.release_lease(task.task_id)
+    
+    async def _finish_chunking(
+        self,
+        task: IngestionTask,
+        checkpoint: IngestionCheckpoint,
+        chunk_indices: Dict[str, int],
+        unchanged_ids: Set[str]
+    ):
+        """
+        Apply the end of chunking (idempotent, so a resumed task can repeat it):
+        drop stale chunks, renumber moved ones, publish the final total and
+        checkpoint the chunk manifest.
+        """
+        existing_chunks = checkpoint.existing_chunks
+        unchanged = [chunk_id for chunk_id in chunk_indices if chunk_id in unchanged_ids]
+        stale = [chunk_id for chunk_id in existing_chunks if chunk_id not in chunk_indices]
+        moved = {
+            chunk_id: chunk_indices[chunk_id] for chunk_id in unchanged
+            if existing_chunks[chunk_id] != chunk_indices[chunk_id]
+        }
+        await self.qdrant_handler.delete_chunks(stale)
+        await self.qdrant_handler.update_chunk_indices(moved)
+        
+        counters = await self._record_chunk_total(
+            task,
+            len(chunk_indices),
+            chunking_complete=True,
+            unchanged_chunks=len(unchanged),
+            deleted_chunks=len(stale)
+        )
+        checkpoint.stage = CheckpointStage.CHUNKED
+        checkpoint.chunk_manifest = chunk_indices
+        await self.task_checkpoint.save(checkpoint)
+        # Nothing left to embed
+        await self._complete_if_finished(task, counters)
+    
+    async def _tier_limits(self, tenant_id: str) -> Optional[TierLimits]:
+        try:
+            return await self.tier_client.get_tier_limits_for_tenant(tenant_id)
+        except Exception as e:
+            self._logger.warning(f"Could not load tier limits for tenant {tenant_id}: {e}")
+            return None
+    
+    async def _embedding_batch_limit(self, tenant_id: str) -> int:
+        """Max texts per embedding request: the global limit capped by the tenant's tier."""
+        limit = self.app_settings.embedding_max_batch_inputs
+        tier_limits = await self._tier_limits(tenant_id)
+        if tier_limits:
+            limit = min(limit, tier_limits.max_embedding_batch_size)
+        return limit
+    
+    async def _record_chunk_total(
+        self,
+        task: IngestionTask,
+        total_chunks: int,
+        chunking_complete: bool = False,
+        unchanged_chunks: int = 0,
+        deleted_chunks: int = 0
+    ) -> Dict[str, int]:
+        """
+        Record the running chunk total in the task's progress hash, next to the
+        counters that embedding results increment. Returns the current counters.
+        """
+        counters = await self.task_progress.set_totals(
+            task.task_id,
+            total_chunks,
+            chunking_complete=chunking_complete,
+            unchanged_chunks=unchanged_chunks,
+            deleted_chunks=deleted_chunks
+        )
+        self.task_progress.apply(task, counters)
+        await self._touch_task(task)
+        return counters
     
     async def _send_chunks_for_embedding(
         self, 
@@ -217,14 +447,8 @@ class IngestionService(BaseService):
         original_action: DomainAction
     ):
         """Send chunks to embedding service"""
-        # Almacenar chunks temporalmente en Redis
-        for chunk in chunks:
-            await self.chunk_cache_manager.save(
-                cache_type="chunk",
-                context=chunk.chunk_id,
-                data=chunk,
-                ttl=3600  # TTL de 1 hora
-            )
+        # Almacenar el lote en el área de staging de la tarea (un solo round trip)
+        await self.chunk_staging.stage(task.task_id, chunks)
         
         # Preparar datos para la generación de embeddings
         texts = [chunk.content for chunk in chunks]
@@ -242,7 +466,8 @@ class IngestionService(BaseService):
             "batch_index": chunks[0].chunk_index if chunks else 0,
             "batch_size": len(chunks),
             "agent_id": task.agent_id,
-            "tenant_id": task.tenant_id
+            "tenant_id": task.tenant_id,
+            "task_id": task.task_id
         }
         
         # Llamar al cliente de embedding encapsulado
@@ -259,12 +484,14 @@ class IngestionService(BaseService):
     async def _handle_embedding_result(self, action: DomainAction) -> None:
         """Handle embedding results from embedding service"""
         data = action.data
-        task_id = data.get("task_id")
+        # The batch metadata sent with the request is echoed back in the result
+        result_metadata = data.get("metadata") or {}
+        task_id = data.get("task_id") or result_metadata.get("task_id")
         chunk_ids = data.get("chunk_ids", [])
         embeddings = data.get("embeddings", [])
         
         # NUEVO: Extraer agent_id desde metadata o data
-        agent_id = data.get("agent_id") or action.metadata.get("agent_id")
+        agent_id = data.get("agent_id") or result_metadata.get("agent_id") or action.metadata.get("agent_id")
         
         if not task_id:
             self._logger.error("No task_id in embedding result")
@@ -280,6 +507,10 @@ class IngestionService(BaseService):
             self._logger.error(f"Task {task_id} not found")
             return
             
+        if task.status in (IngestionStatus.COMPLETED, IngestionStatus.FAILED):
+            self._logger.warning(f"Task {task_id} is already {task.status.value}; ignoring embedding result")
+            return
+            
         # NUEVO: Validar que agent_id coincida
         if task.agent_id != agent_id:
             self._logger.error(
@@ -294,116 +525,142 @@ class IngestionService(BaseService):
         )
         
         # Process embeddings
-        chunks_to_store = []
         if len(chunk_ids) != len(embeddings):
             error_message = f"Critical mismatch: received {len(embeddings)} embeddings for {len(chunk_ids)} chunks."
             self._logger.error(f"Task {task_id}: {error_message}")
             
-            task.status = IngestionStatus.FAILED
-            task.error_message = error_message
             task.completed_at = datetime.utcnow()
-            
+            self.task_progress.apply(task, await self.task_progress.get(task_id))
+            await self.chunk_staging.clear(task.task_id)
             await self._update_progress(
                 task,
                 IngestionStatus.FAILED,
                 "Task failed due to embedding count mismatch",
-                task.processed_chunks / task.total_chunks * 100, # Progress so far
+                task.processed_chunks / task.total_chunks * 100 if task.total_chunks > 0 else 0, # Progress so far
                 error=error_message
             )
-            
-            await self.task_state_manager.save_state(f"task:{task.task_id}", task)
             return
-
-        for i, chunk_id in enumerate(chunk_ids):
-            embedding_result_dict = embeddings[i]
-            error_detail = embedding_result_dict.get("error")
+        
+        # Read the whole batch from staging in one round trip; it is released once counted
+        staged_chunks = await self.chunk_staging.read(task_id, chunk_ids)
+        
+        chunks_to_store = []
+        failed_ids = []
+        for chunk_id, embedding_result in zip(chunk_ids, embeddings):
+            # Each result is either a bare vector or {"embedding": [...], "error": ...}
+            if isinstance(embedding_result, dict):
+                error_detail = embedding_result.get("error")
+                actual_embedding_vector = embedding_result.get("embedding")
+            else:
+                error_detail, actual_embedding_vector = None, embedding_result
 
             if error_detail:
                 self._logger.error(
                     f"Task {task_id}, Chunk {chunk_id}: Received error from embedding service.",
                     extra={"error": error_detail, "chunk_id": chunk_id, "task_id": task_id}
                 )
-                task.failed_chunks += 1
-                await self.chunk_cache_manager.delete(
-                    cache_type="chunk",
-                    context=chunk_id
-                ) # Clean up
+                failed_ids.append(chunk_id)
                 continue
 
-            actual_embedding_vector = embedding_result_dict.get("embedding")
             if actual_embedding_vector is None:
                 self._logger.warning(f"Task {task_id}, Chunk {chunk_id}: Embedding result missing 'embedding' vector and no error reported.")
-                task.failed_chunks += 1
-                await self.chunk_cache_manager.delete(
-                    cache_type="chunk",
-                    context=chunk_id
-                ) # Clean up
+                failed_ids.append(chunk_id)
                 continue
 
-            # Load chunk
-            chunk_data = await self.chunk_cache_manager.get(
-                cache_type="chunk",
-                context=chunk_id
-            )
-            if chunk_data:
-                try:
-                    chunk = ChunkModel.parse_raw(chunk_data)
-                    chunk.embedding = actual_embedding_vector
-                    chunks_to_store.append(chunk)
-                    
-                    # Clean up temp storage
-                    await self.chunk_cache_manager.delete(
-                        cache_type="chunk",
-                        context=chunk_id
-                    )
-                except Exception as e:
-                    self._logger.error(f"Task {task_id}, Chunk {chunk_id}: Failed to process chunk after embedding: {e}", exc_info=True)
-                    task.failed_chunks += 1
-            else:
-                self._logger.warning(f"Task {task_id}: Chunk {chunk_id} not found in cache for embedding result.")
-                task.failed_chunks += 1
+            chunk = staged_chunks.get(chunk_id)
+            if chunk is None:
+                self._logger.warning(f"Task {task_id}: Chunk {chunk_id} not found in staging for embedding result.")
+                failed_ids.append(chunk_id)
+                continue
+            
+            chunk.embedding = actual_embedding_vector
+            chunks_to_store.append(chunk)
 
         # Store in Qdrant CON agent_id
+        processed_ids = []
         if chunks_to_store:
-            await self._update_progress(task, IngestionStatus.STORING, "Storing vectors", 80)
-            
             self._logger.info(f"Storing {len(chunks_to_store)} chunks in Qdrant for agent_id={agent_id}")
-            result = await self.qdrant_handler.store_chunks(chunks_to_store)
-            task.processed_chunks += result["stored"]
-            
-            # Check if complete
-            if (task.processed_chunks + task.failed_chunks) >= task.total_chunks:
-                task.status = IngestionStatus.COMPLETED
-                task.completed_at = datetime.utcnow()
-                task.result = {
-                    "document_id": task.document_id,
-                    "total_chunks": task.total_chunks,
-                    "stored_chunks": task.processed_chunks,
-                    "failed_chunks": task.failed_chunks
-                }
-                
-                await self._update_progress(
-                    task, 
-                    IngestionStatus.COMPLETED,
-                    "Ingestion completed successfully",
-                    100
-                )
-            else:
-                # Update progress
-                progress = (task.processed_chunks / task.total_chunks) * 100
-                await self._update_progress(
-                    task,
-                    task.status,
-                    f"Processed {task.processed_chunks}/{task.total_chunks} chunks",
-                    progress
-                )
-            
-            # Save updated task
-            await self.task_state_manager.save_state(
-                f"task:{task.task_id}",
-                task,
-                expiration_seconds=86400
+            result = await self.qdrant_handler.store_chunks(chunks_to_store, run_id=task.run_id)
+            store_failed = set(result["failed_ids"])
+            processed_ids = [c.chunk_id for c in chunks_to_store if c.chunk_id not in store_failed]
+            failed_ids.extend(store_failed)
+        
+        # Atomic counters: concurrent callbacks for the task cannot lose updates, and
+        # a result redelivered after a reclaim counts (and frees its window slot) once
+        counters, accounted_ids = await self.task_progress.increment(task_id, processed_ids, failed_ids)
+        if accounted_ids:
+            await self.chunk_staging.release(task_id, accounted_ids)
+        else:
+            self._logger.info(f"Task {task_id}: embedding result for {len(chunk_ids)} chunks already counted")
+        self.task_progress.apply(task, counters)
+        
+        # Check if complete (the total is final only once chunking has finished)
+        if await self._complete_if_finished(task, counters):
+            return
+        
+        # Notify only; the task state is not rewritten for each callback
+        progress = ((task.processed_chunks + task.unchanged_chunks) / task.total_chunks) * 100 if task.total_chunks > 0 else 0
+        await self._update_progress(
+            task,
+            IngestionStatus.STORING,
+            f"Processed {task.processed_chunks}/{task.total_chunks} chunks",
+            progress,
+            persist=False
+        )
+        await self._touch_task(task)
+    
+    async def _complete_if_finished(self, task: IngestionTask, counters: Dict[str, int]) -> bool:
+        """Complete the task if the counters show it finished; only the first caller to see it does."""
+        if not self.task_progress.is_finished(counters):
+            return False
+        if not await self.task_progress.claim_completion(task.task_id):
+            return False
+        await self._complete_task(task)
+        return True
+    
+    async def _complete_task(self, task: IngestionTask):
+        """
+        Mark the task as completed and notify. Upserts are sent with wait=False,
+        so whether the document's vectors are applied is confirmed afterwards in
+        a tracked background step (`vectors_confirmed` stays None until then),
+        without holding the embedding callback that finished the task.
+        """
+        task.completed_at = datetime.utcnow()
+        await self.chunk_staging.clear(task.task_id)
+        task.result = {
+            "document_id": task.document_id,
+            "total_chunks": task.total_chunks,
+            "stored_chunks": task.processed_chunks,
+            "failed_chunks": task.failed_chunks,
+            "unchanged_chunks": task.unchanged_chunks,
+            "deleted_chunks": task.deleted_chunks,
+            "vectors_confirmed": None
+        }
+        
+        await self._update_progress(
+            task, 
+            IngestionStatus.COMPLETED,
+            "Ingestion completed successfully",
+            100
+        )
+        
+        confirmation = asyncio.create_task(self._confirm_vectors(task))
+        self._confirmations.add(confirmation)
+        confirmation.add_done_callback(self._confirmations.discard)
+    
+    async def _confirm_vectors(self, task: IngestionTask):
+        """Record in the completed task whether all its vectors are applied in Qdrant."""
+        try:
+            task.result["vectors_confirmed"] = await self.qdrant_handler.confirm_document(
+                tenant_id=task.tenant_id,
+                document_id=task.document_id,
+                collection_id=task.request.collection_id,
+                run_id=task.run_id,
+                expected_chunks=task.processed_chunks
             )
+            await self._save_task(task)
+        except Exception as e:
+            self._logger.error(f"Task {task.task_id}: could not confirm vectors in Qdrant: {e}")
     
     async def _handle_get_status(self, action: DomainAction) -> Dict[str, Any]:
         """Get status of an ingestion task"""
@@ -411,7 +668,7 @@ class IngestionService(BaseService):
         if not task_id:
             raise ValueError("task_id is required")
         
-        task = await self.task_state_manager.load_state(f"task:{task_id}")
+        task = await self._load_task(task_id)
         if not task:
             return {
                 "task_id": task_id,
@@ -458,7 +715,8 @@ class IngestionService(BaseService):
         status: IngestionStatus,
         message: str,
         percentage: float,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        persist: bool = True
     ):
         """Update task progress and notify via WebSocket"""
         task.status = status
@@ -467,11 +725,8 @@ class IngestionService(BaseService):
             task.error_message = error
 
         # Guardar el estado actualizado de la tarea
-        await self.task_state_manager.save_state(
-            f"task:{task.task_id}",
-            task,
-            expiration_seconds=86400  # Mantener el estado por 24h
-        )
+        if persist:
+            await self._save_task(task)
 
         # Notificar por WebSocket
         progress_update = ProcessingProgress(
@@ -482,64 +737,197 @@ class IngestionService(BaseService):
             message=message,
             error=error
         )
-        await self.ws_manager.broadcast(task.session_id, progress_update.model_dump_json())
+        await self.progress_publisher.publish(task.user_id, progress_update)
+
+    async def _load_task(self, task_id: str) -> Optional[IngestionTask]:
+        """Load the task state with its current progress counters."""
+        task = await self.task_state_manager.load_state(f"task:{task_id}")
+        if task:
+            self.task_progress.apply(task, await self.task_progress.get(task_id))
+        return task
+
+    async def _save_task(self, task: IngestionTask):
+        """Persist the task and refresh its stall deadline in the sweeper index."""
+        await self.task_state_manager.save_state(
+            f"task:{task.task_id}",
+            task,
+            expiration_seconds=86400  # Mantener el estado por 24h
+        )
+        await self._touch_task(task)
+
+    async def _touch_task(self, task: IngestionTask):
+        """Refresh the task's stall deadline in the sweeper index (removed once terminal)."""
+        if task.status in (IngestionStatus.COMPLETED, IngestionStatus.FAILED):
+            await self.direct_redis_conn.zrem(self.task_deadlines_key, task.task_id)
+            await self.task_checkpoint.clear(task.task_id)
+            self._remove_upload(task)
+        else:
+            await self.direct_redis_conn.zadd(self.task_deadlines_key, {task.task_id: self._task_deadline(task)})
+
+    def _remove_upload(self, task: IngestionTask):
+        """Delete the task's uploaded file; files outside the upload directory are never touched."""
+        if not task.request.file_path:
+            return
+        file_path = Path(task.request.file_path)
+        if file_path.parent != Path(self.app_settings.upload_dir):
+            return
+        try:
+            file_path.unlink(missing_ok=True)
+        except OSError as e:
+            self._logger.error(f"Task {task.task_id}: could not delete upload {file_path}: {e}")
+
+    def _task_deadline(self, task: IngestionTask) -> float:
+        """Epoch at which the task counts as stalled: no progress for the stall timeout, capped by expires_at."""
+        deadline = task.updated_at.replace(tzinfo=timezone.utc).timestamp() + self.app_settings.ingestion_task_stall_timeout_seconds
+        if task.expires_at:
+            deadline = min(deadline, task.expires_at.replace(tzinfo=timezone.utc).timestamp())
+        return deadline
 
     async def _task_sweeper_loop(self):
-        """Periodically checks for and fails expired tasks."""
-        # Idealmente, este intervalo es configurable
-        sweep_interval_seconds = getattr(self.app_settings, 'ingestion_sweeper_interval_seconds', 300)
+        """Periodically fails stalled tasks, popping only the overdue entries of the deadline index."""
+        sweep_interval_seconds = self.app_settings.ingestion_sweeper_interval_seconds
+        batch_size = 100
         
         self._logger.info(f"Task sweeper started. Checking every {sweep_interval_seconds} seconds.")
         
         while True:
             await asyncio.sleep(sweep_interval_seconds)
-            self._logger.info("Running task sweeper for expired tasks...")
             
             try:
                 expired_tasks_count = 0
-                # Use scan_iter to avoid blocking Redis with a potentially large number of keys
-                async for task_key in self.direct_redis_conn.scan_iter("task:*"):
-                    task_data = await self.direct_redis_conn.get(task_key)
-                    if not task_data:
-                        continue
-                    
-                    try:
-                        task = IngestionTask.model_validate_json(task_data)
-                    except Exception as e:
-                        self._logger.warning(f"Could not parse task data for key {task_key}: {e}")
-                        continue
-
-                    # Check if task is in a terminal state
-                    if task.status in [IngestionStatus.COMPLETED, IngestionStatus.FAILED]:
-                        continue
-
-                    # Check for expiration
-                    if task.expires_at and datetime.utcnow() > task.expires_at:
-                        self._logger.warning(
-                            f"Task {task.task_id} for agent_id={task.agent_id} has expired. "
-                            f"Marking as FAILED. Expiration was at {task.expires_at}."
-                        )
-                        
-                        # Re-use the progress update logic to fail the task
-                        await self._update_progress(
-                            task,
-                            IngestionStatus.FAILED,
-                            "Task processing timed out.",
-                            task.processed_chunks / task.total_chunks * 100 if task.total_chunks > 0 else 0,
-                            error="Task exceeded the maximum configured processing time."
-                        )
-                        expired_tasks_count += 1
+                now = time.time()
+                while True:
+                    task_ids = await self.direct_redis_conn.zrangebyscore(
+                        self.task_deadlines_key, "-inf", now, start=0, num=batch_size
+                    )
+                    for raw_task_id in task_ids:
+                        task_id = raw_task_id.decode() if isinstance(raw_task_id, bytes) else raw_task_id
+                        # ZREM acts as the claim: only one worker handles each entry
+                        if not await self.direct_redis_conn.zrem(self.task_deadlines_key, task_id):
+                            continue
+                        if await self._expire_task(task_id, now):
+                            expired_tasks_count += 1
+                    if len(task_ids) < batch_size:
+                        break
 
                 if expired_tasks_count > 0:
                     self._logger.info(f"Task sweeper finished. Found and failed {expired_tasks_count} expired tasks.")
                 else:
-                    self._logger.info("Task sweeper finished. No expired tasks found.")
+                    self._logger.debug("Task sweeper finished. No expired tasks found.")
 
             except Exception as e:
                 self._logger.error(f"Error during task sweeper run: {e}", exc_info=True)
 
+    async def _expire_task(self, task_id: str, now: float) -> bool:
+        """
+        Handle a claimed overdue task: keep it if it made progress after the sweep
+        read the index or is still queued in a live worker, resume it from its
+        checkpoint if its worker was lost, and fail it otherwise.
+        """
+        task = await self._load_task(task_id)
+        if not task or task.status in (IngestionStatus.COMPLETED, IngestionStatus.FAILED):
+            return False
+        
+        deadline = self._task_deadline(task)
+        if deadline > now:
+            await self.direct_redis_conn.zadd(self.task_deadlines_key, {task_id: deadline})
+            return False
+        
+        expired = task.expires_at is not None and task.expires_at.replace(tzinfo=timezone.utc).timestamp() <= now
+        if not expired and await self.task_checkpoint.acquire_lease(task_id):
+            # No live worker owns the task
+            if await self._resume_task(task):
+                return False
+        elif not expired and task.status == IngestionStatus.PENDING:
+            # Still waiting in a live worker's queue
+            await self.direct_redis_conn.zadd(
+                self.task_deadlines_key,
+                {task_id: now + self.app_settings.ingestion_task_stall_timeout_seconds}
+            )
+            return False
+        
+        self._logger.warning(
+            f"Task {task.task_id} for agent_id={task.agent_id} has stalled or expired "
+            f"(last update {task.updated_at}, expires_at {task.expires_at}). Marking as FAILED."
+        )
+        await self.chunk_staging.clear(task.task_id)
+        # Re-use the progress update logic to fail the task
+        await self._update_progress(
+            task,
+            IngestionStatus.FAILED,
+            "Task processing timed out.",
+            task.processed_chunks / task.total_chunks * 100 if task.total_chunks > 0 else 0,
+            error="Task exceeded the maximum configured processing time."
+        )
+        return True
+
+    async def _resume_task(self, task: IngestionTask) -> bool:
+        """Re-queue, from its checkpoint, a task whose lease this worker just took over."""
+        checkpoint = await self.task_checkpoint.load(task.task_id)
+        if not checkpoint or checkpoint.resume_count >= self.app_settings.ingestion_max_resume_attempts:
+            return False
+        
+        checkpoint.resume_count += 1
+        await self.task_checkpoint.save(checkpoint)
+        self._logger.warning(
+            f"Task {task.task_id} lost its worker at stage {checkpoint.stage.value}; "
+            f"resuming (attempt {checkpoint.resume_count})"
+        )
+        await self._schedule_task(task, DomainAction.model_validate(checkpoint.action))
+        return True
+
+    async def _resume_interrupted_tasks(self):
+        """On startup, take over the active tasks that no live worker holds."""
+        try:
+            resumed = 0
+            for raw_task_id in await self.direct_redis_conn.zrange(self.task_deadlines_key, 0, -1):
+                task_id = raw_task_id.decode() if isinstance(raw_task_id, bytes) else raw_task_id
+                if not await self.task_checkpoint.acquire_lease(task_id):
+                    continue
+                task = await self._load_task(task_id)
+                if (
+                    task and task.status not in (IngestionStatus.COMPLETED, IngestionStatus.FAILED)
+                    and await self._resume_task(task)
+                ):
+                    resumed += 1
+                else:
+                    # Not resumable: left to the sweeper
+                    await self.task_checkpoint.release_lease(task_id)
+            if resumed:
+                self._logger.info(f"Resumed {resumed} interrupted ingestion tasks.")
+        except Exception as e:
+            self._logger.error(f"Error resuming interrupted tasks: {e}", exc_info=True)
+
+    async def _lease_refresh_loop(self):
+        """Keeps alive the leases of the tasks queued or running in this worker."""
+        interval = max(1.0, self.app_settings.ingestion_task_lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.task_checkpoint.refresh_leases(self._leased_tasks)
+            except Exception as e:
+                self._logger.error(f"Error refreshing task leases: {e}", exc_info=True)
+
     def start_background_tasks(self):
         """Starts all background tasks for the service."""
         self._logger.info("Scheduling background tasks...")
-        asyncio.create_task(self._task_sweeper_loop())
-        self._logger.info("Task sweeper has been scheduled.")
\ No newline at end of file
+        self._background_tasks = [
+            asyncio.create_task(self._lease_refresh_loop()),
+            asyncio.create_task(self._resume_interrupted_tasks()),
+            asyncio.create_task(self._task_sweeper_loop())
+        ]
+        self._logger.info("Task sweeper, lease refresh and task resumption have been scheduled.")
+
+    async def shutdown(self):
+        """Stop the background tasks and release service resources (CPU process pool)."""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+        for task in self._confirmations:
+            task.cancel()
+        await asyncio.gather(*self._confirmations, return_exceptions=True)
+        await self.qdrant_handler.close()
+        if self.cpu_executor:
+            self.cpu_executor.shutdown(wait=False, cancel_futures=True)
+            self._logger.info("CPU process pool shut down.")
@@ -0,0 +1,46 @@
+from typing import List
+
+from ..models import ChunkModel
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación de tokens usada también por el ValidationHandler del Embedding Service (~4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+class EmbeddingBatchPlanner:
+    """
+    Agrupa chunks en peticiones de embedding limitadas por número de entradas y
+    por tokens estimados, en lugar de un tamaño fijo.
+
+    Args:
+        max_inputs: Máximo de textos por petición (límite de la API y del tier del tenant).
+        max_tokens: Máximo de tokens estimados por petición.
+    """
+
+    def __init__(self, max_inputs: int, max_tokens: int):
+        self.max_inputs = max(1, max_inputs)
+        self.max_tokens = max(1, max_tokens)
+        self._pending: List[ChunkModel] = []
+        self._pending_tokens = 0
+
+    def add(self, chunks: List[ChunkModel]) -> List[List[ChunkModel]]:
+        """Añade chunks y devuelve los lotes que ya están completos."""
+        ready = []
+        for chunk in chunks:
+            tokens = estimate_tokens(chunk.content)
+            if self._pending and self._pending_tokens + tokens > self.max_tokens:
+                ready.append(self._take())
+            self._pending.append(chunk)
+            self._pending_tokens += tokens
+            if len(self._pending) >= self.max_inputs:
+                ready.append(self._take())
+        return ready
+
+    def flush(self) -> List[ChunkModel]:
+        """Devuelve el lote parcial pendiente (puede estar vacío)."""
+        return self._take()
+
+    def _take(self) -> List[ChunkModel]:
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        return batch
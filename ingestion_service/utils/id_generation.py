@@ -1,3 +1,4 @@
+import hashlib
 import uuid
 from typing import Optional
 
@@ -19,3 +20,13 @@ def generate_deterministic_id(
     
     input_str = "|".join(base_parts)
     return uuid.uuid5(uuid.NAMESPACE_OID, input_str)
+
+
+def generate_chunk_id(document_id: str, content: str, occurrence: int = 0) -> str:
+    """
+    Genera el ID determinístico (UUID5) de un chunk a partir del documento y del
+    hash de su contenido. `occurrence` distingue chunks idénticos repetidos dentro
+    del mismo documento. Un chunk que no cambia entre ingestas conserva su ID.
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{document_id}|{content_hash}|{occurrence}"))
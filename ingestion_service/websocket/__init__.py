@@ -1,4 +1,5 @@
 """WebSocket support for Ingestion Service"""
 from .manager import WebSocketManager
+from .progress_publisher import ProgressPublisher
 
-__all__ = ["WebSocketManager"]
\ No newline at end of file
+__all__ = ["WebSocketManager", "ProgressPublisher"]
\ No newline at end of file
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from ..models import ProcessingProgress, IngestionStatus
+from .manager import WebSocketManager
+
+_TERMINAL_STATUSES = (IngestionStatus.COMPLETED, IngestionStatus.FAILED)
+
+
+class ProgressPublisher:
+    """
+    Coalesces progress updates per task so each task is broadcast at most once
+    every `min_interval_seconds`.
+
+    An update that arrives inside the interval replaces the pending one and is
+    sent when the interval ends, so the latest state always goes out. Terminal
+    updates (completed / failed) are sent immediately and drop any pending one.
+    """
+
+    def __init__(self, ws_manager: WebSocketManager, min_interval_seconds: float = 0.5):
+        self.ws_manager = ws_manager
+        self.min_interval_seconds = min_interval_seconds
+        self._last_sent: Dict[str, float] = {}
+        self._pending: Dict[str, Tuple[str, ProcessingProgress]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self.logger = logging.getLogger("ProgressPublisher")
+
+    async def publish(self, user_id: str, progress: ProcessingProgress):
+        task_id = progress.task_id
+        if progress.status in _TERMINAL_STATUSES:
+            self._cancel_pending(task_id)
+            self._last_sent.pop(task_id, None)
+            await self._send(user_id, progress)
+            return
+
+        wait = self._last_sent.get(task_id, 0.0) + self.min_interval_seconds - time.monotonic()
+        if wait <= 0 and task_id not in self._pending:
+            self._last_sent[task_id] = time.monotonic()
+            await self._send(user_id, progress)
+            return
+
+        self._pending[task_id] = (user_id, progress)
+        if task_id not in self._timers:
+            self._timers[task_id] = asyncio.create_task(self._flush_later(task_id, max(wait, 0.0)))
+
+    async def _flush_later(self, task_id: str, delay: float):
+        await asyncio.sleep(delay)
+        self._timers.pop(task_id, None)
+        pending: Optional[Tuple[str, ProcessingProgress]] = self._pending.pop(task_id, None)
+        if pending:
+            self._last_sent[task_id] = time.monotonic()
+            await self._send(*pending)
+
+    def _cancel_pending(self, task_id: str):
+        self._pending.pop(task_id, None)
+        timer = self._timers.pop(task_id, None)
+        if timer:
+            timer.cancel()
+
+    async def _send(self, user_id: str, progress: ProcessingProgress):
+        try:
+            await self.ws_manager.send_to_user(user_id, progress.model_dump(mode="json"))
+        except Exception as e:
+            self.logger.error(f"Error publishing progress for task {progress.task_id}: {e}")
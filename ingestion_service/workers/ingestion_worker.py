@@ -18,11 +18,14 @@ class IngestionWorker(BaseWorker):
         app_settings: CommonAppSettings,
         async_redis_conn: redis_async.Redis,
         redis_client: BaseRedisClient,
-        consumer_id_suffix: Optional[str] = None
+        consumer_id_suffix: Optional[str] = None,
+        ingestion_service: Optional[IngestionService] = None
     ):
         super().__init__(app_settings, async_redis_conn, consumer_id_suffix)
         self.redis_client = redis_client
-        self.ingestion_service = None
+        # Shared with the API when given: one set of leases, background loops and process pool
+        self.ingestion_service = ingestion_service
+        self._owns_service = ingestion_service is None
         self._logger = logging.getLogger(f"{self.service_name}.IngestionWorker")
     
     async def initialize(self):
@@ -30,18 +33,25 @@ class IngestionWorker(BaseWorker):
         # Initialize base worker
         await super().initialize()
         
-        # Initialize ingestion service
-        self.ingestion_service = IngestionService(
-            app_settings=self.app_settings,
-            service_redis_client=self.redis_client,
-            direct_redis_conn=self.async_redis_conn
-        )
-        
-        # Initialize the service components (including QdrantHandler)
-        await self.ingestion_service.initialize()
+        if self._owns_service:
+            self.ingestion_service = IngestionService(
+                app_settings=self.app_settings,
+                service_redis_client=self.redis_client,
+                direct_redis_conn=self.async_redis_conn
+            )
+            
+            # Initialize the service components (including QdrantHandler)
+            await self.ingestion_service.initialize()
+            self.ingestion_service.start_background_tasks()
         
         self._logger.info("IngestionWorker initialized successfully")
     
+    async def stop(self):
+        """Stop the worker and release the service resources"""
+        await super().stop()
+        if self._owns_service and self.ingestion_service:
+            await self.ingestion_service.shutdown()
+    
     async def _handle_action(self, action: DomainAction) -> Optional[Dict[str, Any]]:
         """
         Route domain actions to the ingestion service
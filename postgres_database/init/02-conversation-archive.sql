@@ -0,0 +1,50 @@
+-- Archivo de conversaciones del Conversation Service
+-- Las conversaciones cerradas se migran aquí desde Redis (MigrationWorker)
+
+-- Crear base de datos de la plataforma si no existe
+SELECT 'CREATE DATABASE nooble WITH OWNER nooble_admin ENCODING ''UTF8'' LC_COLLATE = ''en_US.utf8'' LC_CTYPE = ''en_US.utf8'''
+WHERE NOT EXISTS (SELECT 1 FROM pg_database WHERE datname = 'nooble')\gexec
+
+\c nooble;
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    tenant_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    user_id TEXT,
+    status TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    last_message_at TIMESTAMP,
+    closed_at TIMESTAMP,
+    migrated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_tenant_agent_created
+    ON conversations (tenant_id, agent_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens_estimate INTEGER,
+    processing_time_ms INTEGER,
+    agent_id TEXT,
+    model_used TEXT,
+    created_at TIMESTAMP NOT NULL,
+    metadata JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created
+    ON messages (conversation_id, created_at);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Archivo de conversaciones configurado en la base de datos nooble';
+END
+$$;
@@ -57,8 +57,10 @@ class EmbeddingClient:
             DomainActionResponse con los embeddings
         """
         # Payload solo con los textos (datos puros)
+        # embedding.generate requiere un id por texto; se usa el índice
         payload = {
-            "texts": texts  # Solo los datos
+            "texts": texts,
+            "chunk_ids": [str(i) for i in range(len(texts))]
         }
         
         # Crear DomainAction con correlation_id para pseudo-sync
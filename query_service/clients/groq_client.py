@@ -3,7 +3,7 @@ Cliente para interactuar con la API de Groq usando el SDK oficial.
 """
 
 import logging
-from typing import Optional, Dict, Any, List, Tuple, Union
+from typing import Optional, Dict, Any, List, Tuple, Union, Callable, Awaitable
 
 from groq import AsyncGroq, APIConnectionError, RateLimitError, APIStatusError
 from common.errors.exceptions import ServiceUnavailableError
@@ -90,6 +90,73 @@ class GroqClient:
                 raise ValueError(f"Error en la petición: {e.message}")
             raise ServiceUnavailableError(f"Error en el servidor de Groq: {e.message}")
     
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        frequency_penalty: float,
+        presence_penalty: float,
+        on_delta: Callable[[str], Awaitable[None]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Genera una respuesta en modo streaming, entregando cada fragmento a `on_delta`
+        a medida que llega.
+        
+        Returns:
+            Tupla de (respuesta_completa, uso_de_tokens), igual que `generate`.
+        """
+        parts: List[str] = []
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        
+        try:
+            stream = await self.client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                frequency_penalty=frequency_penalty,
+                presence_penalty=presence_penalty,
+                stop=stop,
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        await on_delta(delta)
+                
+                # Groq envía el uso en `x_groq.usage` del último chunk
+                chunk_usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if chunk_usage:
+                    usage = {
+                        "prompt_tokens": chunk_usage.prompt_tokens,
+                        "completion_tokens": chunk_usage.completion_tokens,
+                        "total_tokens": chunk_usage.total_tokens
+                    }
+            
+            return "".join(parts), usage
+            
+        except APIConnectionError as e:
+            self._logger.debug(f"Error de conexión con Groq API: {e}")
+            raise ServiceUnavailableError("Error de conexión con la API de Groq")
+        
+        except RateLimitError as e:
+            self._logger.debug(f"Límite de peticiones excedido: {e}")
+            raise ServiceUnavailableError("Límite de peticiones de Groq API excedido")
+        
+        except APIStatusError as e:
+            self._logger.debug(f"Error de API de Groq: {e}")
+            if 400 <= e.status_code < 500:
+                raise ValueError(f"Error en la petición: {e.message}")
+            raise ServiceUnavailableError(f"Error en el servidor de Groq: {e.message}")
+    
     async def close(self):
         """Cierra el cliente."""
         await self.client.close()
\ No newline at end of file
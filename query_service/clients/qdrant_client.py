@@ -2,34 +2,55 @@
 Cliente para Qdrant usando el SDK oficial.
 """
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
-    Filter, FieldCondition, MatchValue,
-    SearchParams, PointStruct
+    Filter, FieldCondition, MatchValue, MatchAny,
+    SearchParams, PointStruct,
+    SearchRequest, NamedSparseVector, SparseVector
 )
 
 from common.models.chat_models import RAGChunk
+from common.utils.sparse_encoder import SPARSE_VECTOR_NAME, encode_query
+
+# Tras detectar una colección sin vector disperso, segundos de búsqueda solo densa
+# antes de volver a intentar la híbrida (la colección puede recrearse con él)
+_DENSE_FALLBACK_SECONDS = 300
 
 
 class QdrantClient:
     """Cliente oficial de Qdrant para búsquedas vectoriales."""
     
-    def __init__(self, url: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        hybrid_enabled: bool = True,
+        rrf_k: int = 60,
+        candidate_multiplier: int = 3
+    ):
         """
         Inicializa el cliente de Qdrant.
         
         Args:
             url: URL de Qdrant
             api_key: API key opcional
+            hybrid_enabled: Fusionar búsqueda densa y dispersa (keywords) con RRF
+            rrf_k: Constante k de reciprocal-rank fusion
+            candidate_multiplier: Candidatos por rama = top_k * multiplicador
         """
         self.client = AsyncQdrantClient(
             url=url,
             api_key=api_key,
             timeout=30
         )
+        self.hybrid_enabled = hybrid_enabled
+        self._dense_only_until = 0.0
+        self.rrf_k = rrf_k
+        self.candidate_multiplier = candidate_multiplier
         self.logger = logging.getLogger(__name__)
     
     async def search(
@@ -40,14 +61,20 @@ class QdrantClient:
         similarity_threshold: float,
         tenant_id: UUID,
         agent_id: str,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        query_text: Optional[str] = None
     ) -> List[RAGChunk]:
         """
         Realiza búsqueda vectorial en la colección unificada "documents".
         
+        Si se pasa `query_text` y la búsqueda híbrida está habilitada, se lanza en
+        un único `search_batch` la búsqueda densa y la dispersa por keywords, y los
+        resultados se fusionan con reciprocal-rank fusion.
+        
         Args:
             agent_id: ID del agente - OBLIGATORIO para filtrado
             collection_ids: IDs de colecciones para filtro virtual (no nombres físicos)
+            query_text: Texto de la consulta para la rama dispersa (opcional)
         
         Returns:
             Lista de RAGChunk directamente
@@ -56,7 +83,130 @@ class QdrantClient:
         if not agent_id:
             raise ValueError("agent_id is required for vector search")
         
-        # Construir filtro con tenant_id, agent_id Y collection_ids virtuales
+        qdrant_filter = self._build_filter(tenant_id, agent_id, collection_ids, filters)
+        
+        self.logger.info(f"Searching vectors for agent_id={agent_id}, tenant_id={tenant_id}, collection_ids={collection_ids}")
+        
+        if query_text and self._hybrid_active():
+            all_results = await self._hybrid_search(
+                query_embedding, query_text, qdrant_filter, top_k, similarity_threshold, tenant_id, agent_id
+            )
+        else:
+            # CAMBIO CRÍTICO: Buscar solo en colección unificada "documents"
+            results = await self.client.search(
+                collection_name="documents",  # Colección única
+                query_vector=query_embedding,
+                query_filter=qdrant_filter,
+                limit=top_k,
+                score_threshold=similarity_threshold,
+                with_payload=True
+            )
+            all_results = [self._to_chunk(hit, hit.score, tenant_id, agent_id) for hit in results]
+            
+            # Ordenar por score
+            all_results.sort(key=lambda x: x.similarity_score, reverse=True)
+        
+        self.logger.info(f"Found {len(all_results)} chunks for agent_id={agent_id}")
+        
+        # Retornar solo top_k globales
+        return all_results[:top_k]
+    
+    async def search_parallel(
+        self,
+        query_embeddings: List[List[float]],
+        query_texts: List[str],
+        collection_ids: List[str],
+        top_k: int,
+        similarity_threshold: float,
+        tenant_id: UUID,
+        agent_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        hybrid: Optional[bool] = None
+    ) -> List[RAGChunk]:
+        """
+        Lanza varias sub-consultas en un único `search_batch`: una por colección y
+        variante de consulta (más su rama dispersa si la búsqueda híbrida está
+        habilitada). Los resultados se fusionan con RRF, deduplicados por chunk_id,
+        y se reparten con una cuota por colección para que ninguna acapare el top_k.
+        
+        Args:
+            query_embeddings: Un embedding por variante de consulta
+            query_texts: Texto de cada variante (alineado con `query_embeddings`)
+            hybrid: Forzar (o no) las ramas dispersas; por defecto según la configuración
+        """
+        if not agent_id:
+            raise ValueError("agent_id is required for vector search")
+        if hybrid is None:
+            hybrid = self._hybrid_active()
+        
+        # Sin colecciones explícitas, una sola sub-consulta sin filtro de colección
+        collection_groups = [[collection_id] for collection_id in collection_ids] or [[]]
+        requests: List[SearchRequest] = []
+        dense_flags: List[bool] = []
+        groups: List[str] = []
+        
+        for collection_group in collection_groups:
+            qdrant_filter = self._build_filter(tenant_id, agent_id, collection_group, filters)
+            for embedding, text in zip(query_embeddings, query_texts):
+                for request, is_dense in self._build_requests(
+                    embedding, text if hybrid else None, qdrant_filter,
+                    top_k * self.candidate_multiplier, similarity_threshold
+                ):
+                    requests.append(request)
+                    dense_flags.append(is_dense)
+                    groups.append(collection_group[0] if collection_group else "")
+        
+        self.logger.info(
+            f"Parallel search: {len(requests)} sub-queries for agent_id={agent_id}, "
+            f"collections={len(collection_ids)}, variants={len(query_texts)}"
+        )
+        
+        try:
+            batch_results = await self.client.search_batch(collection_name="documents", requests=requests)
+        except Exception as e:
+            if not hybrid or not self._is_missing_sparse_vector(e):
+                raise
+            # Colección sin vector disperso: se repite solo con las ramas densas
+            self._fall_back_to_dense(e)
+            return await self.search_parallel(
+                query_embeddings, query_texts, collection_ids, top_k,
+                similarity_threshold, tenant_id, agent_id, filters, hybrid=False
+            )
+        
+        # Un documento solo aparece en las listas de su colección
+        lists_per_collection = len(requests) // len(collection_groups)
+        fused = self._fuse_rrf(batch_results, dense_flags, lists_per_collection, tenant_id, agent_id)
+        results = self._apply_collection_quotas(fused, top_k, len(collection_groups))
+        
+        self.logger.info(f"Found {len(results)} chunks for agent_id={agent_id} ({len(fused)} unique candidates)")
+        return results
+    
+    def _hybrid_active(self) -> bool:
+        return self.hybrid_enabled and time.monotonic() >= self._dense_only_until
+    
+    def _fall_back_to_dense(self, error: Exception):
+        self.logger.warning(
+            f"Collection has no '{SPARSE_VECTOR_NAME}' sparse vector, using dense search "
+            f"for {_DENSE_FALLBACK_SECONDS}s: {error}"
+        )
+        self._dense_only_until = time.monotonic() + _DENSE_FALLBACK_SECONDS
+    
+    @staticmethod
+    def _is_missing_sparse_vector(error: Exception) -> bool:
+        """Error de Qdrant por consultar un vector con nombre que la colección no tiene."""
+        message = str(error).lower()
+        return SPARSE_VECTOR_NAME.lower() in message and (
+            "not existing vector name" in message or "not found" in message
+        )
+    
+    def _build_filter(
+        self,
+        tenant_id: UUID,
+        agent_id: str,
+        collection_ids: List[str],
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Filter:
+        """Construye filtro con tenant_id, agent_id Y collection_ids virtuales."""
         must_conditions = [
             FieldCondition(
                 key="tenant_id",
@@ -74,57 +224,164 @@ class QdrantClient:
             must_conditions.append(
                 FieldCondition(
                     key="collection_id",
-                    match=MatchValue(any=collection_ids)  # Filtro virtual por collection_id
+                    match=MatchAny(any=[str(c) for c in collection_ids])  # Filtro virtual por collection_id
                 )
             )
         
-        qdrant_filter = Filter(must=must_conditions)
-        
-        self.logger.info(f"Searching vectors for agent_id={agent_id}, tenant_id={tenant_id}, collection_ids={collection_ids}")
-        
         # Agregar filtros adicionales si existen
         if filters and filters.get("document_ids"):
-            qdrant_filter.must.append(
+            must_conditions.append(
                 FieldCondition(
                     key="document_id",
-                    match=MatchValue(any=filters["document_ids"])
+                    match=MatchAny(any=[str(d) for d in filters["document_ids"]])
                 )
             )
         
-        # CAMBIO CRÍTICO: Buscar solo en colección unificada "documents"
-        results = await self.client.search(
-            collection_name="documents",  # Colección única
-            query_vector=query_embedding,
-            query_filter=qdrant_filter,
-            limit=top_k,
-            score_threshold=similarity_threshold,
-            with_payload=True
-        )
+        return Filter(must=must_conditions)
+    
+    def _build_requests(
+        self,
+        query_embedding: List[float],
+        query_text: Optional[str],
+        qdrant_filter: Filter,
+        limit: int,
+        similarity_threshold: float
+    ) -> List[Tuple[SearchRequest, bool]]:
+        """Petición densa y, si hay texto con términos, su rama dispersa. Devuelve (request, es_densa)."""
+        requests = [(
+            SearchRequest(
+                vector=query_embedding,
+                filter=qdrant_filter,
+                limit=limit,
+                score_threshold=similarity_threshold,
+                with_payload=True
+            ),
+            True
+        )]
+        indices, values = encode_query(query_text) if query_text else ([], [])
+        if indices:
+            requests.append((
+                SearchRequest(
+                    vector=NamedSparseVector(
+                        name=SPARSE_VECTOR_NAME,
+                        vector=SparseVector(indices=indices, values=values)
+                    ),
+                    filter=qdrant_filter,
+                    limit=limit,
+                    with_payload=True
+                ),
+                False
+            ))
+        return requests
+    
+    async def _hybrid_search(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        qdrant_filter: Filter,
+        top_k: int,
+        similarity_threshold: float,
+        tenant_id: UUID,
+        agent_id: str
+    ) -> List[RAGChunk]:
+        """Búsqueda densa + dispersa en un solo round trip, fusionada con RRF."""
+        requests, dense_flags = zip(*self._build_requests(
+            query_embedding, query_text, qdrant_filter, top_k * self.candidate_multiplier, similarity_threshold
+        ))
         
-        # Convertir a RAGChunk CON agent_id y collection_id del payload
-        all_results = []
-        for hit in results:
-            chunk = RAGChunk(
-                chunk_id=str(hit.id),
-                content=hit.payload.get("content", ""),  # Ya usa 'content' 
-                document_id=UUID(hit.payload.get("document_id", str(UUID(int=0)))),
-                collection_id=hit.payload.get("collection_id", ""),  # Del payload, no parámetro
-                similarity_score=hit.score,
-                metadata={
-                    **hit.payload.get("metadata", {}),
-                    "agent_id": hit.payload.get("agent_id", agent_id),  # Incluir agent_id
-                    "tenant_id": hit.payload.get("tenant_id", str(tenant_id))
-                }
-            )
-            all_results.append(chunk)
+        try:
+            batch_results = await self.client.search_batch(collection_name="documents", requests=list(requests))
+        except Exception as e:
+            if not self._is_missing_sparse_vector(e):
+                raise
+            # Colección sin vector disperso: se continúa solo con la rama densa
+            self._fall_back_to_dense(e)
+            dense_flags = (True,)
+            batch_results = [await self.client.search(
+                collection_name="documents",
+                query_vector=query_embedding,
+                query_filter=qdrant_filter,
+                limit=top_k,
+                score_threshold=similarity_threshold,
+                with_payload=True
+            )]
+        
+        return self._fuse_rrf(batch_results, list(dense_flags), len(batch_results), tenant_id, agent_id)
+    
+    def _fuse_rrf(
+        self,
+        result_lists: List[List[Any]],
+        dense_flags: List[bool],
+        max_lists_per_doc: int,
+        tenant_id: UUID,
+        agent_id: str
+    ) -> List[RAGChunk]:
+        """
+        Reciprocal-rank fusion: score(d) = sum(1 / (k + rank)), deduplicando por
+        chunk_id. El score fusionado se normaliza a [0, 1] dividiendo por el máximo
+        posible (primer puesto en todas las listas donde el documento puede
+        aparecer); la mejor similitud densa se conserva en `metadata.dense_score`.
+        """
+        fused: Dict[str, float] = {}
+        hits: Dict[str, Any] = {}
+        dense_scores: Dict[str, float] = {}
         
-        # Ordenar por score
-        all_results.sort(key=lambda x: x.similarity_score, reverse=True)
+        for results, is_dense in zip(result_lists, dense_flags):
+            for rank, hit in enumerate(results, start=1):
+                point_id = str(hit.id)
+                fused[point_id] = fused.get(point_id, 0.0) + 1.0 / (self.rrf_k + rank)
+                hits.setdefault(point_id, hit)
+                if is_dense:
+                    dense_scores[point_id] = max(hit.score, dense_scores.get(point_id, 0.0))
         
-        self.logger.info(f"Found {len(all_results)} chunks for agent_id={agent_id}")
+        max_score = max_lists_per_doc / (self.rrf_k + 1)
+        chunks = []
+        for point_id in sorted(fused, key=fused.get, reverse=True):
+            chunk = self._to_chunk(hits[point_id], min(fused[point_id] / max_score, 1.0), tenant_id, agent_id)
+            chunk.metadata["dense_score"] = dense_scores.get(point_id)
+            chunks.append(chunk)
+        return chunks
+    
+    @staticmethod
+    def _apply_collection_quotas(chunks: List[RAGChunk], top_k: int, collection_count: int) -> List[RAGChunk]:
+        """
+        Primero toma hasta ceil(top_k / colecciones) chunks de cada colección por
+        score; los huecos que dejen colecciones con pocos resultados se rellenan
+        con los mejores restantes. `chunks` debe venir ordenado por score.
+        """
+        quota = -(-top_k // max(collection_count, 1))
+        taken_per_collection: Dict[str, int] = {}
+        selected: List[RAGChunk] = []
+        overflow: List[RAGChunk] = []
         
-        # Retornar solo top_k globales
-        return all_results[:top_k]
+        for chunk in chunks:
+            collection_id = str(chunk.collection_id)
+            if taken_per_collection.get(collection_id, 0) < quota:
+                taken_per_collection[collection_id] = taken_per_collection.get(collection_id, 0) + 1
+                selected.append(chunk)
+            else:
+                overflow.append(chunk)
+        
+        selected.sort(key=lambda c: c.similarity_score, reverse=True)
+        if len(selected) > top_k:
+            return selected[:top_k]
+        return selected + overflow[:top_k - len(selected)]
+    
+    def _to_chunk(self, hit: Any, score: float, tenant_id: UUID, agent_id: str) -> RAGChunk:
+        """Convierte un hit de Qdrant a RAGChunk CON agent_id y collection_id del payload."""
+        return RAGChunk(
+            chunk_id=str(hit.id),
+            content=hit.payload.get("content", ""),  # Ya usa 'content' 
+            document_id=UUID(hit.payload.get("document_id", str(UUID(int=0)))),
+            collection_id=hit.payload.get("collection_id", ""),  # Del payload, no parámetro
+            similarity_score=score,
+            metadata={
+                **hit.payload.get("metadata", {}),
+                "agent_id": hit.payload.get("agent_id", agent_id),  # Incluir agent_id
+                "tenant_id": hit.payload.get("tenant_id", str(tenant_id)),
+                "chunk_index": hit.payload.get("chunk_index")  # Para fusionar chunks contiguos
+            }
+        )
     
     async def close(self):
         """Cierra el cliente."""
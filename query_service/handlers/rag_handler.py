@@ -11,12 +11,12 @@ from common.errors.exceptions import ExternalServiceError
 from common.models.chat_models import (
     RAGConfig,
     RAGChunk,
-    RAGSearchResult,
-    EmbeddingRequest
+    RAGSearchResult
 )
 
 from ..clients.qdrant_client import QdrantClient
 from ..clients.embedding_client import EmbeddingClient
+from ..utils.context_packer import ContextPacker
 
 
 class RAGHandler(BaseHandler):
@@ -43,6 +43,7 @@ class RAGHandler(BaseHandler):
         # Asignar los clientes recibidos como dependencias
         self.embedding_client = embedding_client
         self.qdrant_client = qdrant_client
+        self.context_packer = ContextPacker(encoding_name=app_settings.context_tokenizer_encoding)
         
         self._logger.info("RAGHandler inicializado con inyección de clientes")
     
@@ -55,9 +56,18 @@ class RAGHandler(BaseHandler):
         task_id: UUID,
         trace_id: UUID,
         correlation_id: UUID,
-        agent_id: UUID
+        agent_id: UUID,
+        enable_parallel_search: bool = False,
+        max_context_tokens: Optional[int] = None
     ) -> RAGSearchResult:
-        """Procesa una búsqueda RAG (knowledge tool)."""
+        """
+        Procesa una búsqueda RAG (knowledge tool).
+        
+        Con `enable_parallel_search` se lanza una sub-consulta por colección en un
+        único search_batch, con cuota por colección en el resultado. Los chunks se
+        empaquetan (sin duplicados, contiguos fusionados) dentro de
+        `max_context_tokens`, ya que el resultado acaba en el prompt del agente.
+        """
         start_time = time.time()
         query_id = str(correlation_id) if correlation_id else str(uuid4())
         
@@ -72,16 +82,9 @@ class RAGHandler(BaseHandler):
         )
         
         try:
-            # Usar configuración RAG centralizada
-            embedding_request = EmbeddingRequest(
-                input=query_text,
-                model=rag_config.embedding_model,
-                dimensions=rag_config.embedding_dimensions
-            )
-            
             # Obtener embedding de la consulta
-            query_embedding = await self._get_query_embedding(
-                embedding_request=embedding_request,
+            query_embeddings = await self._get_query_embeddings(
+                texts=[query_text],
                 rag_config=rag_config,
                 tenant_id=tenant_id,
                 session_id=session_id,
@@ -92,15 +95,28 @@ class RAGHandler(BaseHandler):
             
             # 2. Buscar en vector store CON agent_id obligatorio
             try:
-                search_results = await self.qdrant_client.search(
-                    query_embedding=query_embedding,
-                    collection_ids=rag_config.collection_ids,
-                    top_k=rag_config.top_k,
-                    similarity_threshold=rag_config.similarity_threshold,
-                    tenant_id=tenant_id,
-                    agent_id=str(agent_id),  # NUEVO: agent_id obligatorio para filtrado
-                    filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None
-                )
+                if enable_parallel_search:
+                    search_results = await self.qdrant_client.search_parallel(
+                        query_embeddings=query_embeddings,
+                        query_texts=[query_text],
+                        collection_ids=rag_config.collection_ids,
+                        top_k=rag_config.top_k,
+                        similarity_threshold=rag_config.similarity_threshold,
+                        tenant_id=tenant_id,
+                        agent_id=str(agent_id),
+                        filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None
+                    )
+                else:
+                    search_results = await self.qdrant_client.search(
+                        query_embedding=query_embeddings[0],
+                        collection_ids=rag_config.collection_ids,
+                        top_k=rag_config.top_k,
+                        similarity_threshold=rag_config.similarity_threshold,
+                        tenant_id=tenant_id,
+                        agent_id=str(agent_id),  # NUEVO: agent_id obligatorio para filtrado
+                        filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None,
+                        query_text=query_text
+                    )
             except Exception as e:
                 self._logger.error(
                     f"Error during vector search for query_id {query_id}: {e}",
@@ -126,6 +142,10 @@ class RAGHandler(BaseHandler):
                 )
                 chunks.append(chunk)
             
+            chunks = self.context_packer.pack_chunks(
+                chunks, max_context_tokens or self.app_settings.rag_max_context_tokens
+            )
+            
             search_time_ms = int((time.time() - start_time) * 1000)
             
             return RAGSearchResult(
@@ -138,19 +158,19 @@ class RAGHandler(BaseHandler):
             self._logger.error(f"Error en RAG search: {e}", exc_info=True)
             raise ExternalServiceError(f"Error procesando búsqueda RAG: {str(e)}")
     
-    async def _get_query_embedding(
+    async def _get_query_embeddings(
         self,
-        embedding_request: EmbeddingRequest,
+        texts: List[str],
         rag_config: RAGConfig,
         tenant_id: UUID,
         session_id: UUID,
         task_id: UUID,
         trace_id: UUID,
         agent_id: UUID,
-    ) -> List[float]:
-        """Obtiene el embedding usando el Embedding Service con configuración RAG."""
+    ) -> List[List[float]]:
+        """Obtiene los embeddings usando el Embedding Service con configuración RAG."""
         response = await self.embedding_client.get_embeddings(
-            texts=[embedding_request.input],
+            texts=texts,
             rag_config=rag_config,
             tenant_id=tenant_id,
             session_id=session_id,
@@ -164,17 +184,18 @@ class RAGHandler(BaseHandler):
         
         # CORRECCIÓN 4: Manejar la estructura correcta de respuesta de embeddings
         embeddings_data = response.data.get("embeddings", [])
-        if not embeddings_data:
+        if len(embeddings_data) != len(texts):
             raise ExternalServiceError("No se recibieron embeddings del Embedding Service")
         
         # Manejar la estructura correcta: lista de objetos con chunk_id, embedding, error
-        first_result = embeddings_data[0]
-        if "error" in first_result and first_result["error"]:
-            raise ExternalServiceError(f"Error en embedding: {first_result['error']}")
-        
-        # Extraer el embedding del primer resultado
-        embedding = first_result.get("embedding", [])
-        if not embedding:
-            raise ExternalServiceError("No se recibió embedding válido del Embedding Service")
+        embeddings = []
+        for result in embeddings_data:
+            if "error" in result and result["error"]:
+                raise ExternalServiceError(f"Error en embedding: {result['error']}")
+            
+            embedding = result.get("embedding", [])
+            if not embedding:
+                raise ExternalServiceError("No se recibió embedding válido del Embedding Service")
+            embeddings.append(embedding)
         
-        return embedding
\ No newline at end of file
+        return embeddings
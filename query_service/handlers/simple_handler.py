@@ -3,16 +3,17 @@ Handler para chat simple con RAG automático.
 """
 import logging
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from uuid import UUID, uuid4
 
 from common.handlers import BaseHandler
+from common.clients.queue_manager import QueueManager
+from common.clients.token_stream import TokenStreamPublisher
 from common.errors.exceptions import ExternalServiceError, AppValidationError
 from common.models.chat_models import (
     ChatRequest,
     ChatResponse,
     ChatMessage,
-    EmbeddingRequest,
     TokenUsage
 )
 from common.models.config_models import RAGConfig
@@ -20,6 +21,7 @@ from common.models.config_models import RAGConfig
 from ..clients.groq_client import GroqClient
 from ..clients.qdrant_client import QdrantClient
 from ..clients.embedding_client import EmbeddingClient
+from ..utils.context_packer import ContextPacker, ContextSpan
 
 
 class SimpleHandler(BaseHandler):
@@ -51,6 +53,8 @@ class SimpleHandler(BaseHandler):
         self.embedding_client = embedding_client
         self.qdrant_client = qdrant_client
         self.groq_client = groq_client
+        self.queue_manager = QueueManager(environment=app_settings.environment)
+        self.context_packer = ContextPacker(encoding_name=app_settings.context_tokenizer_encoding)
         
         self._logger.info("SimpleHandler inicializado con inyección de clientes")
     
@@ -120,15 +124,12 @@ class SimpleHandler(BaseHandler):
             
             # ORQUESTACIÓN RAG: Si hay configuración RAG, hacer búsqueda
             if rag_config:
-                # 1. Obtener embedding de la consulta
-                embedding_request = EmbeddingRequest(
-                    input=user_message,
-                    model=rag_config.embedding_model,
-                    dimensions=rag_config.embedding_dimensions
-                )
+                # 1. Obtener embeddings de la consulta (y sus variantes en modo paralelo)
+                parallel_search = query_config.enable_parallel_search
+                query_texts = self._build_query_variants(messages, user_message) if parallel_search else [user_message]
                 
-                query_embedding = await self._get_query_embedding(
-                    embedding_request=embedding_request,
+                query_embeddings = await self._get_query_embeddings(
+                    texts=query_texts,
                     rag_config=rag_config,
                     tenant_id=tenant_id,
                     session_id=session_id,
@@ -138,18 +139,35 @@ class SimpleHandler(BaseHandler):
                 )
                 
                 # 2. Buscar en vector store
-                search_results = await self.qdrant_client.search(
-                    query_embedding=query_embedding,
-                    collection_ids=rag_config.collection_ids,
-                    top_k=rag_config.top_k,
-                    similarity_threshold=rag_config.similarity_threshold,
-                    tenant_id=str(tenant_id),
-                    filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None
-                )
+                if parallel_search:
+                    # Una sub-consulta por colección y variante en un único search_batch
+                    search_results = await self.qdrant_client.search_parallel(
+                        query_embeddings=query_embeddings,
+                        query_texts=query_texts,
+                        collection_ids=rag_config.collection_ids,
+                        top_k=rag_config.top_k,
+                        similarity_threshold=rag_config.similarity_threshold,
+                        tenant_id=str(tenant_id),
+                        agent_id=str(agent_id),
+                        filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None
+                    )
+                else:
+                    search_results = await self.qdrant_client.search(
+                        query_embedding=query_embeddings[0],
+                        collection_ids=rag_config.collection_ids,
+                        top_k=rag_config.top_k,
+                        similarity_threshold=rag_config.similarity_threshold,
+                        tenant_id=str(tenant_id),
+                        agent_id=str(agent_id),
+                        filters={"document_ids": rag_config.document_ids} if rag_config.document_ids else None,
+                        query_text=user_message
+                    )
                 
                 # 3. FORMATO GROQ: Inyectar contexto como ChatMessage con role="system" antes del último user message
-                if search_results:
-                    context = self._build_context(search_results, max_results=rag_config.top_k)
+                # Deduplicar, fusionar chunks contiguos y ajustar al presupuesto de tokens
+                context_spans = self.context_packer.pack(search_results, query_config.max_context_tokens)
+                if context_spans:
+                    context = self._build_context(context_spans)
                     
                     # Crear mensaje de contexto siguiendo las mejores prácticas del SDK de Groq
                     context_msg = ChatMessage(
@@ -173,7 +191,7 @@ class SimpleHandler(BaseHandler):
                         final_messages.append(context_msg)
                     
                     # Extraer sources para la respuesta
-                    sources = [UUID(chunk.chunk_id) for chunk in search_results]
+                    sources = [UUID(chunk_id) for span in context_spans for chunk_id in span.chunk_ids]
             
             # CONSTRUCCIÓN DEL SYSTEM PROMPT desde query_config
             # Si ya hay un system message, lo actualizamos. Si no, lo creamos
@@ -219,7 +237,22 @@ class SimpleHandler(BaseHandler):
                 groq_client_instance = self.groq_client.with_options(**options)
             
             # Llamar al cliente de Groq (original o con opciones específicas)
-            response_text, token_usage = await groq_client_instance.generate(**groq_payload)
+            token_publisher = self._create_token_publisher(task_id)
+            if token_publisher:
+                # Los fragmentos llegan al orquestador mientras se genera; la respuesta
+                # final sigue incluyendo el texto completo y el uso de tokens
+                try:
+                    response_text, token_usage = await groq_client_instance.generate_stream(
+                        **groq_payload,
+                        on_delta=token_publisher.publish
+                    )
+                except Exception as e:
+                    await token_publisher.close(error=str(e))
+                    raise
+                await token_publisher.close(usage=token_usage)
+                token_usage = TokenUsage.model_validate(token_usage)
+            else:
+                response_text, token_usage = await groq_client_instance.generate(**groq_payload)
             
             # Construir respuesta
             end_time = time.time()
@@ -255,20 +288,30 @@ class SimpleHandler(BaseHandler):
                 raise
             raise ExternalServiceError(f"Error interno en simple query: {str(e)}")
     
-    async def _get_query_embedding(
+    def _create_token_publisher(self, task_id: UUID) -> Optional[TokenStreamPublisher]:
+        """Crea el publisher del stream de tokens de la tarea si el streaming está habilitado."""
+        if not task_id or not self.direct_redis_conn or not self.app_settings.token_streaming_enabled:
+            return None
+        return TokenStreamPublisher(
+            redis_conn=self.direct_redis_conn,
+            stream_name=self.queue_manager.get_task_token_stream(self.app_settings.domain_name, str(task_id)),
+            flush_interval_ms=self.app_settings.token_stream_flush_interval_ms,
+            ttl_seconds=self.app_settings.token_stream_ttl_seconds
+        )
+    
+    async def _get_query_embeddings(
         self,
-        embedding_request: EmbeddingRequest,
+        texts: List[str],
         rag_config: RAGConfig,
         tenant_id: UUID,
         session_id: UUID,
         task_id: UUID,
         trace_id: UUID,
         agent_id: UUID,
-    ) -> List[float]:
-        """Obtiene el embedding de la consulta usando el Embedding Service con configuración RAG."""
-        # Usar el embedding client refactorizado para obtener el embedding
+    ) -> List[List[float]]:
+        """Obtiene los embeddings de la consulta (y sus variantes) en una sola llamada al Embedding Service."""
         response = await self.embedding_client.get_embeddings(
-            texts=[embedding_request.input],
+            texts=texts,
             rag_config=rag_config,
             tenant_id=tenant_id,
             session_id=session_id,
@@ -282,34 +325,47 @@ class SimpleHandler(BaseHandler):
         
         # CORRECCIÓN 4: Manejar la estructura correcta de respuesta de embeddings
         embeddings_data = response.data.get("embeddings", [])
-        if not embeddings_data:
+        if len(embeddings_data) != len(texts):
             raise ExternalServiceError("No se recibieron embeddings del Embedding Service")
         
         # Manejar la estructura correcta: lista de objetos con chunk_id, embedding, error
-        first_result = embeddings_data[0]
-        if "error" in first_result and first_result["error"]:
-            raise ExternalServiceError(f"Error en embedding: {first_result['error']}")
-        
-        # Extraer el embedding del primer resultado
-        embedding = first_result.get("embedding", [])
-        if not embedding:
-            raise ExternalServiceError("No se recibió embedding válido del Embedding Service")
+        embeddings = []
+        for result in embeddings_data:
+            if "error" in result and result["error"]:
+                raise ExternalServiceError(f"Error en embedding: {result['error']}")
+            
+            embedding = result.get("embedding", [])
+            if not embedding:
+                raise ExternalServiceError("No se recibió embedding válido del Embedding Service")
+            embeddings.append(embedding)
         
-        return embedding
+        return embeddings
     
-    def _build_context(self, search_results, max_results: int = 5) -> str:
-        """Construye el contexto a partir de los resultados de búsqueda."""
-        if not search_results:
-            return ""
-        
+    def _build_query_variants(self, messages: List[ChatMessage], user_message: str) -> List[str]:
+        """
+        Variantes de la consulta para la búsqueda paralela: la pregunta original y,
+        si hay un turno previo del usuario, la pregunta con ese contexto (las
+        preguntas de seguimiento suelen omitir el tema).
+        """
+        variants = [user_message]
+        previous_user_messages = [
+            msg.content for msg in messages
+            if msg.role == "user" and msg.content and msg.content != user_message
+        ]
+        if previous_user_messages and self.app_settings.parallel_search_max_variants > 1:
+            variants.append(f"{previous_user_messages[-1]}\n{user_message}")
+        return variants[:self.app_settings.parallel_search_max_variants]
+    
+    def _build_context(self, context_spans: List[ContextSpan]) -> str:
+        """Construye el contexto a partir de los spans empaquetados."""
         context_parts = []
-        for i, result in enumerate(search_results[:max_results]):
-            source_info = f"[Source {i+1}: {result.collection_id}"
-            if hasattr(result, 'document_id') and result.document_id:
-                source_info += f"/{result.document_id}"
-            source_info += f", Score: {result.similarity_score:.3f}]"
+        for i, span in enumerate(context_spans):
+            source_info = f"[Source {i+1}: {span.collection_id}"
+            if span.document_id:
+                source_info += f"/{span.document_id}"
+            source_info += f", Score: {span.score:.3f}]"
             
-            context_parts.append(f"{source_info}\n{result.content}")
+            context_parts.append(f"{source_info}\n{span.content}")
         
         return "\n\n".join(context_parts)
     
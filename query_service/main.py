@@ -14,7 +14,7 @@ import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
-from common.clients import RedisManager
+from common.clients import RedisManager, ReplyListener
 from common.utils import init_logging
 
 from common.config import QueryServiceSettings
@@ -93,6 +93,9 @@ async def lifespan(app: FastAPI):
             except asyncio.CancelledError:
                 pass
         
+        # Detener el canal de respuestas pseudo-síncronas antes de cerrar Redis
+        await ReplyListener.shutdown_all()
+
         # Cerrar Redis Manager
         if redis_manager:
             await redis_manager.close()
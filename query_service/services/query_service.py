@@ -49,7 +49,10 @@ class QueryService(BaseService):
         # 2. Cliente de vectores para búsqueda en Qdrant
         self.qdrant_client = QdrantClient(
             url=str(app_settings.qdrant_url) if hasattr(app_settings, 'qdrant_url') and app_settings.qdrant_url else "http://localhost:6333",
-            api_key=app_settings.qdrant_api_key
+            api_key=app_settings.qdrant_api_key,
+            hybrid_enabled=app_settings.hybrid_search_enabled,
+            rrf_k=app_settings.hybrid_rrf_k,
+            candidate_multiplier=app_settings.hybrid_candidate_multiplier
         )
         
         # 3. Cliente de Groq para consultas LLM
@@ -220,7 +223,12 @@ class QueryService(BaseService):
             task_id=action.task_id,
             trace_id=action.trace_id,
             correlation_id=action.correlation_id,
-            agent_id=action.agent_id
+            agent_id=action.agent_id,
+            enable_parallel_search=(
+                action.query_config.enable_parallel_search
+                if action.query_config else self.app_settings.parallel_search_default
+            ),
+            max_context_tokens=action.query_config.max_context_tokens if action.query_config else None
         )
         
         # Retornar resultado serializado
@@ -4,4 +4,6 @@ Utilidades para Query Service.
 Este módulo está reservado para funciones de utilidad y helpers.
 """
 
-__all__ = []
+from .context_packer import ContextPacker, ContextSpan
+
+__all__ = ['ContextPacker', 'ContextSpan']
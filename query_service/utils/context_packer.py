@@ -0,0 +1,214 @@
+"""
+Empaquetado del contexto RAG dentro de un presupuesto de tokens.
+
+Los chunks recuperados se deduplican (casi-duplicados y solapes del
+`chunk_overlap` de ingestión), se fusionan los adyacentes del mismo documento y
+se rellenan por score hasta `QueryConfig.max_context_tokens`.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from common.models.chat_models import RAGChunk
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dependencia opcional
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\S+")
+
+# Solape mínimo para fusionar chunks contiguos: coincidencias más cortas pueden
+# ser casuales ("I saw the" + "the cat") y quitarlas perdería texto real
+_MIN_OVERLAP_WORDS = 4
+_MIN_OVERLAP_CHARS = 20
+
+
+@dataclass
+class ContextSpan:
+    """Fragmento de contexto final: uno o varios chunks contiguos de un documento."""
+    content: str
+    document_id: str
+    collection_id: str
+    score: float
+    chunk_ids: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    first_index: Optional[int] = None
+    last_index: Optional[int] = None
+    tokens: int = 0
+
+
+class ContextPacker:
+    """
+    Selecciona y compacta chunks para el prompt.
+
+    Args:
+        encoding_name: Encoding de tiktoken usado para contar tokens. Sin tiktoken
+            instalado se aproxima con 4 caracteres por token.
+        duplicate_threshold: Jaccard de shingles a partir del cual dos chunks se
+            consideran casi-duplicados.
+        shingle_size: Palabras por shingle.
+        max_overlap_words: Solape máximo buscado entre chunks contiguos.
+    """
+
+    def __init__(
+        self,
+        encoding_name: str = "cl100k_base",
+        duplicate_threshold: float = 0.8,
+        shingle_size: int = 5,
+        max_overlap_words: int = 200
+    ):
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+        self.max_overlap_words = max_overlap_words
+        self._encoder = None
+        if tiktoken is not None:
+            try:
+                self._encoder = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                logger.warning(f"No se pudo inicializar tokenizer '{encoding_name}': {e}. Usando aproximación por caracteres.")
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoder:
+            return len(self._encoder.encode(text))
+        return len(text) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self._encoder:
+            return self._encoder.decode(self._encoder.encode(text)[:max_tokens])
+        return text[:max_tokens * 4]
+
+    def pack(self, chunks: List[RAGChunk], max_tokens: int, header_tokens: int = 20) -> List[ContextSpan]:
+        """
+        Devuelve los spans seleccionados, ordenados por score descendente.
+
+        Args:
+            chunks: Resultados de búsqueda (cualquier orden).
+            max_tokens: Presupuesto total de tokens para el contexto.
+            header_tokens: Reserva por span para la cabecera de fuente del prompt.
+        """
+        ranked = sorted(chunks, key=lambda c: c.similarity_score, reverse=True)
+        unique = self._drop_near_duplicates(ranked)
+        spans = self._merge_adjacent(unique)
+
+        selected: List[ContextSpan] = []
+        remaining = max_tokens
+        for span in sorted(spans, key=lambda s: s.score, reverse=True):
+            span.tokens = self.count_tokens(span.content) + header_tokens
+            if span.tokens <= remaining:
+                selected.append(span)
+                remaining -= span.tokens
+            elif not selected and remaining > header_tokens:
+                # El mejor span no cabe entero: se recorta en lugar de no enviar contexto
+                span.content = self.truncate(span.content, remaining - header_tokens)
+                span.tokens = remaining
+                selected.append(span)
+                remaining = 0
+            # Spans que no caben se saltan; alguno menor puede aprovechar el hueco
+
+        logger.debug(
+            f"Contexto empaquetado: {len(chunks)} chunks -> {len(unique)} únicos -> {len(spans)} spans, "
+            f"{len(selected)} seleccionados ({max_tokens - remaining}/{max_tokens} tokens)"
+        )
+        return selected
+
+    def pack_chunks(self, chunks: List[RAGChunk], max_tokens: int) -> List[RAGChunk]:
+        """
+        Igual que `pack`, pero devuelve RAGChunk (para respuestas de query.rag). Un
+        span fusionado conserva el id de su primer chunk y lista todos en
+        `metadata.merged_chunk_ids`.
+        """
+        packed = []
+        for span in self.pack(chunks, max_tokens, header_tokens=0):
+            metadata = dict(span.metadata)
+            if len(span.chunk_ids) > 1:
+                metadata["merged_chunk_ids"] = span.chunk_ids
+            packed.append(RAGChunk(
+                chunk_id=span.chunk_ids[0],
+                content=span.content,
+                document_id=span.document_id,
+                collection_id=span.collection_id,
+                similarity_score=span.score,
+                metadata=metadata
+            ))
+        return packed
+
+    def _shingles(self, text: str) -> Set[tuple]:
+        words = [w.lower() for w in _WORD_RE.findall(text)]
+        if len(words) <= self.shingle_size:
+            return {tuple(words)}
+        return {tuple(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def _drop_near_duplicates(self, ranked: List[RAGChunk]) -> List[RAGChunk]:
+        """Descarta chunks casi idénticos a otro de mayor score (mismo texto en varios documentos)."""
+        kept: List[RAGChunk] = []
+        kept_shingles: List[Set[tuple]] = []
+        for chunk in ranked:
+            shingles = self._shingles(chunk.content)
+            is_duplicate = any(
+                len(shingles & other) / (len(shingles | other) or 1) >= self.duplicate_threshold
+                for other in kept_shingles
+            )
+            if not is_duplicate:
+                kept.append(chunk)
+                kept_shingles.append(shingles)
+        return kept
+
+    def _merge_adjacent(self, chunks: List[RAGChunk]) -> List[ContextSpan]:
+        """Fusiona chunks con chunk_index consecutivo del mismo documento, quitando el solape."""
+        by_document = {}
+        loose: List[ContextSpan] = []
+        for chunk in chunks:
+            span = ContextSpan(
+                content=chunk.content,
+                document_id=str(chunk.document_id),
+                collection_id=str(chunk.collection_id),
+                score=chunk.similarity_score,
+                chunk_ids=[str(chunk.chunk_id)],
+                metadata=dict(chunk.metadata),
+                first_index=chunk.metadata.get("chunk_index"),
+                last_index=chunk.metadata.get("chunk_index")
+            )
+            if span.first_index is None:
+                loose.append(span)
+            else:
+                by_document.setdefault(span.document_id, []).append(span)
+
+        merged: List[ContextSpan] = []
+        for spans in by_document.values():
+            spans.sort(key=lambda s: s.first_index)
+            current = spans[0]
+            for span in spans[1:]:
+                if span.first_index == current.last_index + 1:
+                    current.content = self._join_without_overlap(current.content, span.content)
+                    current.score = max(current.score, span.score)
+                    current.chunk_ids.extend(span.chunk_ids)
+                    current.last_index = span.last_index
+                else:
+                    merged.append(current)
+                    current = span
+            merged.append(current)
+        return merged + loose
+
+    def _join_without_overlap(self, left: str, right: str) -> str:
+        """
+        Une dos textos contiguos eliminando el sufijo de `left` repetido al inicio
+        de `right`. Se corta `right` en el offset donde termina el solape, de modo
+        que ambos textos conservan sus saltos de línea y espacios originales.
+        """
+        left_words = left.split()
+        right_matches = list(_WORD_RE.finditer(right))
+        right_words = [match.group() for match in right_matches]
+        limit = min(len(left_words), len(right_words), self.max_overlap_words)
+        for size in range(limit, _MIN_OVERLAP_WORDS - 1, -1):
+            if left_words[-size:] != right_words[:size]:
+                continue
+            overlap_end = right_matches[size - 1].end()
+            if overlap_end - right_matches[0].start() < _MIN_OVERLAP_CHARS:
+                break
+            return left + right[overlap_end:]
+        return f"{left}\n{right}"